@@ -1,8 +1,29 @@
-from flask import Flask, jsonify, request, send_file
+from flask import Flask, jsonify, request, send_file, Response, stream_with_context, g
 from flask_cors import CORS
 import os
+import json
+import time
 import logging
-from llm_service import get_llm_service
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import config
+from llm_service import get_llm_service, measure_usage
+from jobs import JobStore, JobManager
+from folder_cache import FolderListingCache, compute_etag
+from catalog import LiteratureCatalog, SearchUnavailableError
+from near_duplicates import minhash_signature, registry_key
+from fulltext import make_snippet
+from llm_cache import LLMCache
+from batch_extraction import BatchExtractionManager, is_valid_batch_id
+from prewarm import PrewarmWorker
+from tracing import TraceRecorder, span, propagate
+from io import BytesIO
+from urllib.parse import quote
+from summary_export import (DOCX_MIMETYPE, render_summary_docx, render_combined_docx, iter_summary_zip,
+                            get_render_pool, shutdown_render_pool)
+from extraction_export import CSV_MIMETYPE, XLSX_MIMETYPE, export_columns, iter_csv, iter_xlsx
+import threading
+import metrics
+import rate_limit
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -11,11 +32,113 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # 允许跨域请求
 
+# 文献数据根目录，各区域为其下的同名子文件夹
+DATA_ROOT = config.get_setting('data_root', 'E:\\temp\\氨氯地平缬沙坦氢氯噻嗪片-demo')
+
 # 配置允许访问的基础路径（出于安全考虑）
 ALLOWED_BASE_PATHS = [
-    'E:\\temp\\氨氯地平缬沙坦氢氯噻嗪片-demo'
+    DATA_ROOT
 ]
 
+# 首页展示的所有区域及其路径
+SECTION_PATHS = {
+    name: os.path.join(DATA_ROOT, name)
+    for name in ('CDE同类品种-临床备案公示平台试验信息', '国外试验文献调研', '法规_指导原则_用药指南', '说明书')
+}
+
+# 支持提取关键信息的文献类型及其基础路径
+EXTRACTION_BASE_PATHS = {
+    name: SECTION_PATHS[name]
+    for name in ('CDE同类品种-临床备案公示平台试验信息', '国外试验文献调研')
+}
+
+# 单个提取请求内并发处理文献的最大线程数
+EXTRACT_CONCURRENCY = config.get_setting('extract_concurrency', 4, int)
+
+# 提取关键信息时是否默认同时生成方案摘要
+INCLUDE_SUMMARY = config.get_setting('include_summary', False, bool)
+
+# 后台批量提取任务的工作线程数
+JOB_CONCURRENCY = config.get_setting('job_concurrency', 4, int)
+
+# 提取时对近似重复文献的处理：off 不检测，flag 在结果中标注，reuse 复用已提取的重复文献的结果
+DUPLICATE_ACTION = config.get_setting('duplicate_action', 'flag')
+# MinHash估算的相似度不低于该值时视为近似重复
+DUPLICATE_THRESHOLD = config.get_setting('duplicate_threshold', 0.85, float)
+
+# 空闲时后台预提取新增或变化的文献（关键信息和方案摘要），按估算token数限制每个周期的消耗
+PREWARM_ENABLED = config.get_setting('prewarm_enabled', False, bool)
+
+# 监控类接口（按路径前缀匹配）不算作用户活动，不影响预提取的空闲判断，也不记录请求追踪
+MONITORING_PATHS = ('/api/health', '/api/metrics', '/api/prewarm', '/api/debug/traces')
+
+# 请求追踪：记录每个请求各阶段（查找/读取MD、构建提示词、模型调用、解析JSON等）的耗时，
+# 保留最近 trace_buffer_size 个请求，耗时超过 slow_request_ms 毫秒的请求输出各阶段耗时日志（0为不输出）
+trace_recorder = TraceRecorder(
+    enabled=config.get_setting('tracing_enabled', True, bool),
+    slow_request_ms=config.get_setting('slow_request_ms', 5000, float),
+    buffer_size=config.get_setting('trace_buffer_size', 200, int)
+)
+
+# 批量导出方案摘要时渲染DOCX的进程数
+EXPORT_WORKERS = config.get_setting('export_workers', min(4, os.cpu_count() or 1), int)
+
+# 子文件夹列表缓存，按目录mtime失效
+folder_cache = FolderListingCache(ttl=config.get_setting('folder_cache_ttl', 0, float))
+
+# 延迟创建的单例，各自加锁，避免并发的首个请求重复创建
+literature_catalog = None
+literature_catalog_lock = threading.Lock()
+prewarm_worker = None
+prewarm_worker_lock = threading.Lock()
+
+def get_catalog():
+    """获取文献目录索引"""
+    global literature_catalog
+    with literature_catalog_lock:
+        if literature_catalog is None:
+            literature_catalog = LiteratureCatalog(os.path.join(config.get_data_dir(), 'catalog.db'), SECTION_PATHS)
+        return literature_catalog
+
+@app.before_request
+def start_request_timer():
+    """记录请求开始时间，用于统计接口耗时"""
+    g.request_start_time = time.time()
+    notify_user_activity(request.path)
+    g.trace, g.trace_tokens = start_request_trace(request.method, request.path, request.headers.get('X-Request-ID'))
+
+def notify_user_activity(path):
+    """记录用户请求，预提取只在一段时间没有用户请求后进行"""
+    if prewarm_worker is not None and not path.startswith(MONITORING_PATHS):
+        prewarm_worker.notify_activity()
+
+def start_request_trace(method, path, request_id=None):
+    """开始记录请求追踪（监控类接口不记录），客户端传入的X-Request-ID作为请求标识"""
+    if request_id:
+        request_id = request_id.strip()[:64]
+    return trace_recorder.start(method, path, request_id, record=not path.startswith(MONITORING_PATHS))
+
+@app.after_request
+def record_request_metrics(response):
+    """记录各接口的请求数和耗时（流式响应记录到开始输出为止）"""
+    start_time = getattr(g, 'request_start_time', None)
+    if start_time is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        metrics.HTTP_LATENCY.observe(time.time() - start_time, route=route, method=request.method)
+    trace = getattr(g, 'trace', None)
+    if trace is not None:
+        g.response_status = response.status_code
+        response.headers['X-Request-ID'] = trace.request_id
+    return response
+
+@app.teardown_request
+def finish_request_trace(error=None):
+    """请求结束（流式响应输出完毕）时保存请求追踪"""
+    if 'trace_tokens' in g:
+        status = 500 if error is not None else g.get('response_status')
+        trace_recorder.finish(g.trace, g.pop('trace_tokens'), status)
+
 def is_path_allowed(path):
     """检查路径是否在允许的范围内"""
     normalized_path = os.path.normpath(path)
@@ -24,6 +147,13 @@ def is_path_allowed(path):
             return True
     return False
 
+def conditional_json(data):
+    """返回带ETag的JSON响应，客户端缓存仍有效时返回304"""
+    response = jsonify(data)
+    response.set_etag(compute_etag(data))
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
 @app.route('/api/folders', methods=['GET'])
 def get_subfolders():
     """获取指定路径下的子文件夹"""
@@ -46,17 +176,13 @@ def get_subfolders():
             return jsonify({'error': '指定路径不是目录'}), 400
         
         # 读取子文件夹
-        subfolders = []
         try:
-            for item in os.listdir(folder_path):
-                item_path = os.path.join(folder_path, item)
-                if os.path.isdir(item_path):
-                    subfolders.append(item)
+            subfolders = folder_cache.list_subfolders(folder_path)
         except PermissionError:
             return jsonify({'error': '没有权限访问此目录'}), 403
         
         logger.info(f"成功读取路径 {folder_path}, 找到 {len(subfolders)} 个子文件夹")
-        return jsonify({'subfolders': sorted(subfolders)})
+        return conditional_json({'subfolders': subfolders})
         
     except Exception as e:
         logger.error(f"读取文件夹时发生错误: {str(e)}")
@@ -86,46 +212,289 @@ def health_check():
     """健康检查接口"""
     return jsonify({'status': 'healthy', 'message': '文件系统API服务正常运行'})
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus文本格式的运行指标"""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/api/folders/all', methods=['GET'])
 def get_all_folders():
     """获取所有配置路径的子文件夹"""
     try:
-        # 定义所有需要读取的路径
-        paths = {
-            'CDE同类品种-临床备案公示平台试验信息': 'E:\\temp\\氨氯地平缬沙坦氢氯噻嗪片-demo\\CDE同类品种-临床备案公示平台试验信息',
-            '国外试验文献调研': 'E:\\temp\\氨氯地平缬沙坦氢氯噻嗪片-demo\\国外试验文献调研',
-            '法规_指导原则_用药指南': 'E:\\temp\\氨氯地平缬沙坦氢氯噻嗪片-demo\\法规_指导原则_用药指南',
-            '说明书': 'E:\\temp\\氨氯地平缬沙坦氢氯噻嗪片-demo\\说明书'
-        }
-        
         result = {}
-        for section_name, folder_path in paths.items():
+        for section_name, folder_path in SECTION_PATHS.items():
             if not is_path_allowed(folder_path):
                 result[section_name] = []
                 continue
             
-            if not os.path.exists(folder_path) or not os.path.isdir(folder_path):
-                result[section_name] = []
-                continue
-            
             try:
-                subfolders = []
-                for item in os.listdir(folder_path):
-                    item_path = os.path.join(folder_path, item)
-                    if os.path.isdir(item_path):
-                        subfolders.append(item)
-                result[section_name] = sorted(subfolders)
+                result[section_name] = folder_cache.list_subfolders(folder_path)
+            except (FileNotFoundError, NotADirectoryError):
+                result[section_name] = []
             except PermissionError:
                 logger.warning(f"没有权限访问目录: {folder_path}")
                 result[section_name] = []
         
         logger.info(f"成功读取所有文件夹，共返回 {len(result)} 个区域的数据")
-        return jsonify(result)
+        return conditional_json(result)
         
     except Exception as e:
         logger.error(f"读取所有文件夹时发生错误: {str(e)}")
         return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
 
+def resolve_md_file_path(llm_service, section_name, literature_name):
+    """优先从文献目录中获取MD文件路径，未收录时按约定路径查找"""
+    with span('resolve_md_path', section=section_name):
+        md_file_path = get_catalog().resolve_md_path(section_name, literature_name)
+    if md_file_path is None:
+        literature_folder = os.path.join(EXTRACTION_BASE_PATHS[section_name], literature_name)
+        md_file_path = llm_service.find_md_file_path(literature_folder, literature_name)
+    return md_file_path
+
+def load_literature_item(llm_service, item):
+    """解析选中项并读取MD文件，返回 (文献类型, 文献名称, MD文件路径, MD内容)，不支持的文献类型返回None"""
+    # 解析section和literature_name
+    section_name, literature_name = item.split('/', 1)
+    
+    # 检查是否为支持的类型
+    if section_name not in EXTRACTION_BASE_PATHS:
+        return None
+    
+    md_file_path = resolve_md_file_path(llm_service, section_name, literature_name)
+    
+    # 读取MD文件内容
+    content = llm_service.read_md_file(md_file_path)
+    return section_name, literature_name, md_file_path, content
+
+def save_literature_result(llm_service, loaded, extracted_info, summary=None):
+    """保存提取结果（及同时生成的方案摘要）到文献目录，并添加文献标识信息"""
+    section_name, literature_name, md_file_path, content = loaded
+    content_hash = LLMCache.content_hash(content)
+    with span('save_result'):
+        if summary is not None:
+            get_catalog().record_extraction(md_file_path, 'summary_extraction', content_hash, summary)
+        
+        # 保存提取结果，记录最近提取时间
+        schema_name = llm_service.get_extraction_spec(section_name)[0]
+        get_catalog().record_extraction(md_file_path, schema_name, content_hash, extracted_info)
+    
+    # 添加文献标识信息
+    extracted_info['literature_name'] = literature_name
+    extracted_info['section_name'] = section_name
+    extracted_info['md_file_path'] = md_file_path
+    
+    logger.info(f"成功提取文献 {literature_name} ({section_name}) 的关键信息")
+    return extracted_info
+
+def get_previous_results(llm_service, loaded, include_summary=False):
+    """返回文献目录中该文献上次的 (提取结果, 方案摘要)，MD内容变化后据此增量提取"""
+    section_name, _, md_file_path, _ = loaded
+    schema_name = llm_service.get_extraction_spec(section_name)[0]
+    with span('load_previous'):
+        stored = get_catalog().get_extraction(md_file_path, schema_name)
+        stored_summary = get_catalog().get_extraction(md_file_path, 'summary_extraction') if include_summary else None
+    return (stored and stored['result']), (stored_summary and stored_summary['result'])
+
+def find_literature_duplicates(llm_service, loaded, include_summary=False):
+    """在文献目录中查找该文献的近似重复文献
+
+    返回 (重复文献列表, 可复用的 (提取结果, 方案摘要))。duplicate_action 为 reuse 且文本近似重复的文献
+    已有同类型的提取结果（需要摘要时也已有摘要）时复用其结果；仅注册号一致的文献只标注不复用
+    """
+    if DUPLICATE_ACTION == 'off':
+        return [], None
+    section_name, _, md_file_path, content = loaded
+    catalog = get_catalog()
+    
+    # 目录中的签名与当前内容一致时直接使用，否则现算
+    stored = catalog.get_signature(md_file_path)
+    if stored and stored[0] == LLMCache.content_hash(content):
+        _, signature, registry = stored
+    else:
+        with span('minhash_signature', chars=len(content)):
+            signature, registry = minhash_signature(content), registry_key(content)
+    with span('find_duplicates') as stage:
+        duplicates = catalog.find_duplicates(signature, registry, DUPLICATE_THRESHOLD, exclude=md_file_path)
+        stage.set(found=len(duplicates))
+    if not duplicates or DUPLICATE_ACTION != 'reuse':
+        if duplicates:
+            metrics.LITERATURE_DUPLICATES.inc(action='flagged')
+        return duplicates, None
+    
+    schema_name = llm_service.get_extraction_spec(section_name)[0]
+    for duplicate in duplicates:
+        if duplicate['reason'] != 'text':
+            continue
+        stored_extraction = catalog.get_extraction(duplicate['md_file_path'], schema_name)
+        stored_summary = catalog.get_extraction(duplicate['md_file_path'], 'summary_extraction') \
+            if include_summary else None
+        if stored_extraction is None or (include_summary and stored_summary is None):
+            continue
+        
+        source = {key: duplicate[key] for key in ('md_file_path', 'literature_name', 'similarity')}
+        reused = []
+        for stored_result in (stored_extraction, stored_summary):
+            if stored_result is None:
+                reused.append(None)
+                continue
+            result = {key: value for key, value in stored_result['result'].items() if not key.startswith('_')}
+            result['_duplicate_of'] = source
+            reused.append(result)
+        metrics.LITERATURE_DUPLICATES.inc(action='reused')
+        logger.info(f"{md_file_path} 与已提取的 {duplicate['md_file_path']} 近似重复（{duplicate['similarity']}），复用其结果")
+        return duplicates, tuple(reused)
+    
+    metrics.LITERATURE_DUPLICATES.inc(action='flagged')
+    return duplicates, None
+
+def literature_error(item, error):
+    """单个文献处理失败时返回的结果"""
+    error_msg = f"处理文献 {item} 时发生错误: {str(error)}"
+    logger.error(error_msg)
+    return {
+        'literature_name': item,
+        'error': error_msg
+    }
+
+def process_literature_item(llm_service, item, use_cache=True, include_summary=False):
+    """处理单个选中项：查找并读取MD文件，调用LLM提取关键信息
+
+    include_summary为真时同一次调用同时生成方案摘要并保存，后续生成摘要无需再请求模型。
+    不支持的文献类型返回None，处理失败时返回包含error字段的结果，
+    保证单个文献的错误不会影响其他文献
+    """
+    try:
+        with span('literature', item=item):
+            loaded = load_literature_item(llm_service, item)
+            if loaded is None:
+                return None
+            section_name, _, _, content = loaded
+            
+            # 不绕过缓存时先查找已提取过的近似重复文献
+            duplicates, reused = find_literature_duplicates(llm_service, loaded, include_summary) \
+                if use_cache else ([], None)
+            
+            summary = None
+            if reused is not None:
+                extracted_info, summary = reused
+            else:
+                # 不绕过缓存时以上次的结果为基础，只重新提取MD中有变化的部分
+                previous, previous_summary = get_previous_results(llm_service, loaded, include_summary) \
+                    if use_cache else (None, None)
+                
+                # 使用LLM提取关键信息，传入文献类型
+                if include_summary:
+                    extracted_info, summary = llm_service.extract_with_summary(
+                        content, section_name, use_cache=use_cache, previous=previous, previous_summary=previous_summary
+                    )
+                else:
+                    extracted_info = llm_service.extract_key_info(
+                        content, section_name, use_cache=use_cache, previous=previous
+                    )
+            
+            result = save_literature_result(llm_service, loaded, extracted_info, summary)
+            if duplicates:
+                result['_duplicates'] = duplicates
+            return result
+            
+    except Exception as e:
+        return literature_error(item, e)
+
+def get_bool_option(data, key, default=False):
+    """读取请求体中的布尔参数，接受 true/false、0/1 以及 "true"/"false"、"1"/"0"、"yes"/"no"、"on"/"off" 字符串
+
+    未传入时返回默认值，无法识别时抛出ValueError
+    """
+    value = data.get(key)
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        normalized = value.strip().lower()
+        if normalized in ('1', 'true', 'yes', 'on'):
+            return True
+        if normalized in ('0', 'false', 'no', 'off'):
+            return False
+    raise ValueError(f"参数 {key} 的值无效: {value}")
+
+def get_extraction_options(data):
+    """解析提取请求的 bypass_cache 和 include_summary 参数，返回 (是否使用缓存, 是否同时生成方案摘要)"""
+    return (
+        not get_bool_option(data, 'bypass_cache'),
+        get_bool_option(data, 'include_summary', INCLUDE_SUMMARY)
+    )
+
+def get_stream_format(data, accept=''):
+    """根据请求体的stream参数或Accept头确定流式输出格式，非流式返回None"""
+    stream = data.get('stream')
+    if stream in ('ndjson', 'sse'):
+        return stream
+    if stream is True:
+        return 'ndjson'
+    
+    if 'text/event-stream' in accept:
+        return 'sse'
+    if 'application/x-ndjson' in accept:
+        return 'ndjson'
+    return None
+
+def encode_stream_record(record, stream_format):
+    """按流式格式编码一条记录"""
+    payload = json.dumps(record, ensure_ascii=False)
+    if stream_format == 'sse':
+        return f"event: {record['type']}\ndata: {payload}\n\n"
+    return payload + '\n'
+
+def stream_extraction(llm_service, selected_items, use_cache, include_summary, stream_format):
+    """流式返回提取结果，每个文献完成后立即输出一条记录，最后输出汇总记录"""
+    def timed_process(item):
+        item_start = time.time()
+        result = process_literature_item(llm_service, item, use_cache, include_summary)
+        return result, round((time.time() - item_start) * 1000, 1)
+    
+    start_time = time.time()
+    first_result_ms = None
+    total_processed = 0
+    error_count = 0
+    
+    max_workers = max(1, min(EXTRACT_CONCURRENCY, len(selected_items)))
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        process = propagate(timed_process)
+        futures = {executor.submit(process, item): index for index, item in enumerate(selected_items)}
+        for future in as_completed(futures):
+            result, elapsed_ms = future.result()
+            if result is None:
+                continue
+            
+            total_processed += 1
+            if 'error' in result:
+                error_count += 1
+            if first_result_ms is None:
+                first_result_ms = round((time.time() - start_time) * 1000, 1)
+            
+            yield encode_stream_record({
+                'type': 'error' if 'error' in result else 'result',
+                'index': futures[future],
+                'elapsed_ms': elapsed_ms,
+                'result': result
+            }, stream_format)
+        
+        yield encode_stream_record({
+            'type': 'summary',
+            'success': True,
+            'total_processed': total_processed,
+            'error_count': error_count,
+            'first_result_ms': first_result_ms,
+            'total_ms': round((time.time() - start_time) * 1000, 1)
+        }, stream_format)
+    finally:
+        # 客户端断开时取消尚未开始的任务
+        executor.shutdown(wait=False, cancel_futures=True)
+
 @app.route('/api/extract-info', methods=['POST'])
 def extract_key_info():
     """提取关键信息API"""
@@ -138,13 +507,11 @@ def extract_key_info():
         if not selected_items:
             return jsonify({'error': '没有选择任何项目'}), 400
         
-        # 定义基础路径映射
-        base_paths = {
-            'CDE同类品种-临床备案公示平台试验信息': 'E:\\temp\\氨氯地平缬沙坦氢氯噻嗪片-demo\\CDE同类品种-临床备案公示平台试验信息',
-            '国外试验文献调研': 'E:\\temp\\氨氯地平缬沙坦氢氯噻嗪片-demo\\国外试验文献调研'
-        }
-        
-        results = []
+        # bypass_cache为真时忽略已有缓存，重新调用LLM；include_summary为真时同时生成方案摘要
+        try:
+            use_cache, include_summary = get_extraction_options(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # 获取LLM服务实例
         try:
@@ -152,44 +519,24 @@ def extract_key_info():
         except Exception as e:
             return jsonify({'error': f'LLM服务初始化失败: {str(e)}'}), 500
         
-        for item in selected_items:
-            try:
-                # 解析section和literature_name
-                section_name, literature_name = item.split('/', 1)
-                
-                # 检查是否为支持的类型
-                if section_name not in ['CDE同类品种-临床备案公示平台试验信息', '国外试验文献调研']:
-                    continue
-                
-                # 构建文献文件夹路径
-                base_path = base_paths[section_name]
-                literature_folder = os.path.join(base_path, literature_name)
-                
-                # 查找MD文件
-                md_file_path = llm_service.find_md_file_path(literature_folder, literature_name)
-                
-                # 读取MD文件内容
-                content = llm_service.read_md_file(md_file_path)
-                
-                # 使用LLM提取关键信息，传入文献类型
-                extracted_info = llm_service.extract_key_info(content, section_name)
-                
-                # 添加文献标识信息
-                extracted_info['literature_name'] = literature_name
-                extracted_info['section_name'] = section_name
-                extracted_info['md_file_path'] = md_file_path
-                
-                results.append(extracted_info)
-                
-                logger.info(f"成功提取文献 {literature_name} ({section_name}) 的关键信息")
-                
-            except Exception as e:
-                error_msg = f"处理文献 {item} 时发生错误: {str(e)}"
-                logger.error(error_msg)
-                results.append({
-                    'literature_name': item,
-                    'error': error_msg
-                })
+        # 流式模式：每个文献完成后立即返回其结果
+        stream_format = get_stream_format(data, request.headers.get('Accept', ''))
+        if stream_format:
+            mimetype = 'text/event-stream' if stream_format == 'sse' else 'application/x-ndjson'
+            return Response(
+                stream_with_context(stream_extraction(llm_service, selected_items, use_cache, include_summary, stream_format)),
+                mimetype=mimetype,
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+        
+        # 使用有界线程池并发处理各文献，map保证结果顺序与选中顺序一致
+        max_workers = max(1, min(EXTRACT_CONCURRENCY, len(selected_items)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            processed = executor.map(
+                propagate(lambda item: process_literature_item(llm_service, item, use_cache, include_summary)),
+                selected_items
+            )
+            results = [result for result in processed if result is not None]
         
         return jsonify({
             'success': True,
@@ -201,6 +548,341 @@ def extract_key_info():
         logger.error(f"提取关键信息时发生错误: {str(e)}")
         return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
 
+job_manager = None
+job_manager_lock = threading.Lock()
+
+def get_job_manager():
+    """获取后台任务管理器，首次调用时启动并恢复未完成的任务"""
+    global job_manager
+    with job_manager_lock:
+        if job_manager is None:
+            store = JobStore(os.path.join(config.get_data_dir(), 'jobs.db'))
+            job_manager = JobManager(
+                store,
+                lambda item, options: process_literature_item(
+                    get_llm_service(), item, not options.get('bypass_cache', False),
+                    options.get('include_summary', INCLUDE_SUMMARY)
+                ),
+                max_workers=JOB_CONCURRENCY
+            )
+            job_manager.start()
+        return job_manager
+
+@app.route('/api/catalog', methods=['GET'])
+def list_catalog():
+    """分页查询文献目录API"""
+    try:
+        def optional_bool(name):
+            value = request.args.get(name)
+            if value is None:
+                return None
+            return value.lower() in ('1', 'true', 'yes')
+        
+        page = max(1, request.args.get('page', 1, type=int))
+        page_size = min(500, max(1, request.args.get('page_size', 50, type=int)))
+        catalog = get_catalog()
+        total, items = catalog.list_entries(
+            section_name=request.args.get('section'),
+            query=request.args.get('q'),
+            has_md=optional_bool('has_md'),
+            extracted=optional_bool('extracted'),
+            offset=(page - 1) * page_size,
+            limit=page_size
+        )
+        
+        return jsonify({
+            'total': total,
+            'page': page,
+            'page_size': page_size,
+            'items': items,
+            'sections': catalog.summary(),
+            'last_refresh': catalog.last_refresh
+        })
+        
+    except Exception as e:
+        logger.error(f"查询文献目录时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+@app.route('/api/catalog/refresh', methods=['POST'])
+def refresh_catalog():
+    """增量更新文献目录API"""
+    try:
+        stats = get_catalog().refresh()
+        return jsonify({'success': True, **stats})
+        
+    except Exception as e:
+        logger.error(f"更新文献目录时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+@app.route('/api/search', methods=['GET'])
+def search_literature():
+    """全文检索API：在四个区域的全部MD文件中检索，按相关度分页返回带高亮摘要的结果"""
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': '缺少q参数'}), 400
+        
+        start_time = time.time()
+        page = max(1, request.args.get('page', 1, type=int))
+        page_size = min(100, max(1, request.args.get('page_size', 20, type=int)))
+        try:
+            total, results, terms = get_catalog().search(
+                query, section_name=request.args.get('section'),
+                offset=(page - 1) * page_size, limit=page_size
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except SearchUnavailableError as e:
+            return jsonify({'error': str(e)}), 503
+        
+        # 摘要从原文中截取，只读取当前页的MD文件
+        for result in results:
+            try:
+                with open(result['md_file_path'], 'r', encoding='utf-8', errors='replace') as f:
+                    result['snippet'] = make_snippet(f.read(), terms)
+            except OSError:
+                result['snippet'] = ''
+        
+        return jsonify({
+            'success': True,
+            'query': query,
+            'total': total,
+            'page': page,
+            'page_size': page_size,
+            'took_ms': round((time.time() - start_time) * 1000, 1),
+            'results': results
+        })
+        
+    except Exception as e:
+        logger.error(f"全文检索时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+@app.route('/api/catalog/duplicates', methods=['GET'])
+def list_duplicate_clusters():
+    """近似重复文献簇报告API"""
+    try:
+        threshold = request.args.get('threshold', DUPLICATE_THRESHOLD, type=float)
+        clusters = get_catalog().duplicate_clusters(threshold, section_name=request.args.get('section'))
+        
+        return jsonify({
+            'success': True,
+            'threshold': threshold,
+            'cluster_count': len(clusters),
+            'duplicate_count': sum(cluster['size'] - 1 for cluster in clusters),
+            'clusters': clusters
+        })
+        
+    except Exception as e:
+        logger.error(f"查询近似重复文献时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """提交批量提取任务API"""
+    try:
+        data = request.get_json()
+        if not data or 'selected_items' not in data:
+            return jsonify({'error': '缺少selected_items参数'}), 400
+        
+        selected_items = data['selected_items']
+        if not selected_items:
+            return jsonify({'error': '没有选择任何项目'}), 400
+        
+        try:
+            use_cache, include_summary = get_extraction_options(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        options = {'bypass_cache': not use_cache, 'include_summary': include_summary}
+        job_id = get_job_manager().submit(selected_items, options)
+        
+        return jsonify({'success': True, 'job_id': job_id, 'total': len(selected_items)}), 202
+        
+    except Exception as e:
+        logger.error(f"提交批量任务时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """列出最近的批量任务API"""
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        return jsonify({'jobs': get_job_manager().store.list_jobs(limit)})
+        
+    except Exception as e:
+        logger.error(f"获取任务列表时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """查询批量任务进度API"""
+    try:
+        store = get_job_manager().store
+        job = store.get_job(job_id)
+        if job is None:
+            return jsonify({'error': '任务不存在'}), 404
+        
+        job['items'] = store.get_items(job_id)
+        return jsonify(job)
+        
+    except Exception as e:
+        logger.error(f"查询任务进度时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+@app.route('/api/jobs/<job_id>/results', methods=['GET'])
+def get_job_results(job_id):
+    """获取批量任务结果API，结果按提交顺序返回"""
+    try:
+        store = get_job_manager().store
+        job = store.get_job(job_id)
+        if job is None:
+            return jsonify({'error': '任务不存在'}), 404
+        
+        results = [
+            item['result'] for item in store.get_items(job_id, include_results=True)
+            if item['result'] is not None
+        ]
+        return jsonify({
+            'success': True,
+            'status': job['status'],
+            'results': results,
+            'total_processed': len(results)
+        })
+        
+    except Exception as e:
+        logger.error(f"获取任务结果时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """取消批量任务API"""
+    try:
+        manager = get_job_manager()
+        if manager.store.get_job(job_id) is None:
+            return jsonify({'error': '任务不存在'}), 404
+        
+        cancelled = manager.cancel(job_id)
+        return jsonify({'success': True, 'cancelled': cancelled})
+        
+    except Exception as e:
+        logger.error(f"取消任务时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+batch_manager = None
+batch_manager_lock = threading.Lock()
+
+def get_batch_manager():
+    """获取离线批量提取管理器"""
+    global batch_manager
+    with batch_manager_lock:
+        if batch_manager is None:
+            batch_manager = BatchExtractionManager(
+                get_llm_service(), get_catalog(), os.path.join(config.get_data_dir(), 'batches')
+            )
+        return batch_manager
+
+@app.route('/api/batches', methods=['POST'])
+def submit_batch():
+    """提交离线批量提取API：传入selected_items，或传入section提取整个区域"""
+    try:
+        data = request.get_json() or {}
+        llm_service = get_llm_service()
+        
+        entries = []
+        errors = []
+        if data.get('section'):
+            section_name = data['section']
+            if section_name not in EXTRACTION_BASE_PATHS:
+                return jsonify({'error': f'不支持提取的区域: {section_name}'}), 400
+            catalog = get_catalog()
+            catalog.refresh()
+            total, _ = catalog.list_entries(section_name=section_name, has_md=True, limit=0)
+            _, catalog_entries = catalog.list_entries(section_name=section_name, has_md=True, limit=total)
+            entries = [
+                {key: entry[key] for key in ('section_name', 'literature_name', 'md_file_path')}
+                for entry in catalog_entries
+            ]
+        elif data.get('selected_items'):
+            for item in data['selected_items']:
+                try:
+                    section_name, literature_name = item.split('/', 1)
+                    if section_name not in EXTRACTION_BASE_PATHS:
+                        continue
+                    entries.append({
+                        'section_name': section_name,
+                        'literature_name': literature_name,
+                        'md_file_path': resolve_md_file_path(llm_service, section_name, literature_name)
+                    })
+                except Exception as e:
+                    errors.append({'literature_name': item, 'error': f"处理文献 {item} 时发生错误: {str(e)}"})
+        else:
+            return jsonify({'error': '缺少selected_items或section参数'}), 400
+        
+        if not entries:
+            return jsonify({'error': '没有可提取的文献', 'errors': errors}), 400
+        
+        manifest = get_batch_manager().submit(entries)
+        return jsonify({
+            'success': True,
+            'batch_id': manifest['batch_id'],
+            'remote_batch_id': manifest['remote_batch_id'],
+            'status': manifest['status'],
+            'total': len(entries),
+            'errors': errors
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"提交离线批量提取时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+@app.route('/api/batches', methods=['GET'])
+def list_batches():
+    """列出离线批量提取任务API"""
+    try:
+        return jsonify({'batches': get_batch_manager().list_batches()})
+        
+    except Exception as e:
+        logger.error(f"获取批任务列表时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+@app.route('/api/batches/<batch_id>', methods=['GET'])
+def get_batch(batch_id):
+    """查询离线批量提取状态API，服务商批任务完成后自动导入结果"""
+    try:
+        if not is_valid_batch_id(batch_id):
+            return jsonify({'error': '批任务不存在'}), 404
+        summary = get_batch_manager().refresh(batch_id)
+        if summary is None:
+            return jsonify({'error': '批任务不存在'}), 404
+        return jsonify(summary)
+        
+    except Exception as e:
+        logger.error(f"查询批任务状态时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+@app.route('/api/batches/<batch_id>/cancel', methods=['POST'])
+def cancel_batch(batch_id):
+    """取消离线批量提取API"""
+    try:
+        if not is_valid_batch_id(batch_id):
+            return jsonify({'error': '批任务不存在或尚未提交'}), 404
+        cancelled = get_batch_manager().cancel(batch_id)
+        if not cancelled:
+            return jsonify({'error': '批任务不存在或尚未提交'}), 404
+        return jsonify({'success': True})
+        
+    except Exception as e:
+        logger.error(f"取消批任务时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+def get_stored_summary(md_file_path, content_hash):
+    """返回文献目录中该文献的方案摘要：(与当前MD内容一致的摘要, 上次的摘要)，没有时为None"""
+    stored = get_catalog().get_extraction(md_file_path, 'summary_extraction')
+    if stored is None:
+        return None, None
+    if stored['content_hash'] == content_hash:
+        return stored['result'], stored['result']
+    return None, stored['result']
+
 @app.route('/api/generate-summary', methods=['POST'])
 def generate_summary():
     """生成方案摘要API"""
@@ -222,9 +904,15 @@ def generate_summary():
         # 读取MD文件内容
         md_file_path = literature_info['md_file_path']
         content = llm_service.read_md_file(md_file_path)
+        content_hash = LLMCache.content_hash(content)
+        use_cache = not data.get('bypass_cache', False)
         
-        # 使用LLM生成方案摘要
-        summary = llm_service.generate_summary(content)
+        # 提取时已随关键信息一并生成且内容未变化的摘要直接返回，内容变化时以上次的摘要为基础增量提取
+        summary, previous = get_stored_summary(md_file_path, content_hash) if use_cache else (None, None)
+        if summary is None:
+            # 使用LLM生成方案摘要
+            summary = llm_service.generate_summary(content, use_cache=use_cache, previous=previous)
+            get_catalog().record_extraction(md_file_path, 'summary_extraction', content_hash, summary)
         
         # 添加文献信息
         summary['literature_name'] = literature_info.get('literature_name', '')
@@ -241,108 +929,299 @@ def generate_summary():
         logger.error(f"生成方案摘要时发生错误: {str(e)}")
         return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
 
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """LLM结果缓存统计API"""
+    try:
+        llm_service = get_llm_service()
+        if llm_service.cache is None:
+            return jsonify({'enabled': False})
+        
+        stats = llm_service.cache.stats()
+        stats['enabled'] = True
+        return jsonify(stats)
+        
+    except Exception as e:
+        logger.error(f"获取缓存统计时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+@app.route('/api/llm/limiter', methods=['GET'])
+def get_limiter_state():
+    """LLM限流排队和熔断状态API"""
+    try:
+        get_llm_service()
+        return jsonify({'providers': rate_limit.snapshot()})
+        
+    except Exception as e:
+        logger.error(f"获取限流状态时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+@app.route('/api/llm/providers', methods=['GET'])
+def get_provider_state():
+    """服务商连接池状态API：权重、并发、延迟、错误率和熔断状态"""
+    try:
+        llm_service = get_llm_service()
+        return jsonify({
+            'primary': llm_service.pool.primary.name,
+            'providers': llm_service.pool.snapshot()
+        })
+        
+    except Exception as e:
+        logger.error(f"获取服务商状态时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+@app.route('/api/llm/cascade', methods=['GET'])
+def get_cascade_stats():
+    """模型级联统计API：各schema逐字段的升级次数、升级原因、大模型改写次数和平均置信度"""
+    try:
+        llm_service = get_llm_service()
+        return jsonify({
+            'enabled': llm_service.cascade_enabled,
+            'model': llm_service.cascade_model,
+            'escalation_model': llm_service.model,
+            'min_confidence': llm_service.cascade_min_confidence,
+            'escalate_fields': sorted(llm_service.cascade_escalate_fields),
+            'schemas': llm_service.cascade_stats.snapshot()
+        })
+        
+    except Exception as e:
+        logger.error(f"获取模型级联统计时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+@app.route('/api/debug/traces', methods=['GET'])
+def list_traces():
+    """最近请求的追踪API：按完成时间倒序返回各请求的阶段耗时，可按最小耗时和路径筛选"""
+    try:
+        traces = trace_recorder.recent(
+            limit=request.args.get('limit', 50, type=int),
+            min_duration_ms=request.args.get('min_ms', 0, type=float),
+            path=request.args.get('path'),
+            include_spans=request.args.get('spans', 'true').lower() != 'false'
+        )
+        return jsonify({
+            'enabled': trace_recorder.enabled,
+            'slow_request_ms': trace_recorder.slow_request_ms,
+            'count': len(traces),
+            'traces': traces
+        })
+        
+    except Exception as e:
+        logger.error(f"获取请求追踪时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+@app.route('/api/debug/traces/<request_id>', methods=['GET'])
+def get_trace(request_id):
+    """单个请求的追踪API，返回各阶段的起止时间和父子关系，可用于绘制火焰图"""
+    try:
+        trace = trace_recorder.get(request_id)
+        if trace is None:
+            return jsonify({'error': '请求追踪不存在'}), 404
+        return jsonify(trace)
+        
+    except Exception as e:
+        logger.error(f"获取请求追踪时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
 @app.route('/api/download-summary', methods=['POST'])
 def download_summary():
     """下载方案摘要Word文档API"""
     try:
-        from io import BytesIO
-        import tempfile
-        
         data = request.get_json()
         if not data or 'summary' not in data:
             return jsonify({'error': '缺少summary参数'}), 400
         
-        summary = data['summary']
+        # 在内存中生成Word文档，不写临时文件
+        try:
+            content = render_summary_docx(data['summary'])
+        except ImportError:
+            return jsonify({'error': '缺少python-docx依赖，请安装: pip install python-docx'}), 500
+        
+        return send_file(
+            BytesIO(content),
+            as_attachment=True,
+            download_name='方案摘要.docx',
+            mimetype=DOCX_MIMETYPE
+        )
+        
+    except Exception as e:
+        logger.error(f"下载方案摘要时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+def attachment_headers(filename):
+    """流式下载的Content-Disposition头，文件名按RFC 5987编码"""
+    return {'Content-Disposition': f"attachment; filename*=UTF-8''{quote(filename)}"}
+
+@app.route('/api/export-summaries', methods=['POST'])
+def export_summaries():
+    """批量导出方案摘要API
+
+    请求体中的 summaries 为方案摘要列表，或 md_file_paths 为已生成摘要的MD文件路径列表（从文献目录读取）；
+    format 为 zip（默认，每份摘要一个DOCX，流式返回）或 docx（合并为一个文档，每份摘要从新的一页开始）
+    """
+    try:
+        data = request.get_json()
+        if not data or not (data.get('summaries') or data.get('md_file_paths')):
+            return jsonify({'error': '缺少summaries或md_file_paths参数'}), 400
+        
+        export_format = data.get('format', 'zip')
+        if export_format not in ('zip', 'docx'):
+            return jsonify({'error': f'不支持的导出格式: {export_format}'}), 400
+        
+        summaries = list(data.get('summaries') or [])
+        missing = []
+        for md_file_path in data.get('md_file_paths') or []:
+            stored = get_catalog().get_extraction(md_file_path, 'summary_extraction')
+            if stored is None:
+                missing.append(md_file_path)
+                continue
+            summary = dict(stored['result'])
+            # MD文件名与文献名称一致（文献文件夹/auto/文献名.md）
+            summary.setdefault('literature_name', os.path.splitext(os.path.basename(md_file_path))[0])
+            summaries.append(summary)
+        if missing:
+            return jsonify({'error': '以下文献尚未生成方案摘要', 'missing': missing}), 404
         
-        # 生成Word文档
         try:
-            from docx import Document
-            from docx.shared import Inches
+            import docx  # noqa: F401
         except ImportError:
             return jsonify({'error': '缺少python-docx依赖，请安装: pip install python-docx'}), 500
         
-        # 创建Word文档
-        doc = Document()
-        
-        # 添加标题
-        doc.add_heading('关键文献方案摘要', 0)
-        
-        # 添加基本信息表格
-        basic_info = [
-            ('研究题目', summary.get('study_title', '')),
-            ('申办者', summary.get('sponsor', '')),
-            ('方案编号', summary.get('protocol_number', '')),
-            ('组长单位/主要研究者', summary.get('principal_investigator', '')),
-            ('试验药物名称及规格', summary.get('drug_name_specification', '')),
-            ('适应症', summary.get('indication', '')),
-            ('试验分期', summary.get('trial_phase', '')),
-            ('研究中心数', summary.get('center_count', '')),
-            ('研究周期', summary.get('study_period', ''))
-        ]
+        executor = get_render_pool(EXPORT_WORKERS)
+        if export_format == 'docx':
+            # 合并文档只能在一个进程中渲染，放到进程池中执行以免占用服务进程的GIL
+            content = executor.submit(render_combined_docx, summaries).result()
+            return send_file(
+                BytesIO(content),
+                as_attachment=True,
+                download_name='方案摘要汇总.docx',
+                mimetype=DOCX_MIMETYPE
+            )
         
-        table = doc.add_table(rows=len(basic_info), cols=2)
-        table.style = 'Table Grid'
-        
-        for i, (label, value) in enumerate(basic_info):
-            table.cell(i, 0).text = label
-            table.cell(i, 1).text = value
-        
-        # 添加研究目的
-        doc.add_heading('研究目的', level=1)
-        objectives = summary.get('study_objectives', {})
-        doc.add_paragraph(f"主要目的: {objectives.get('primary_objective', '')}")
-        doc.add_paragraph(f"次要目的: {objectives.get('secondary_objective', '')}")
-        
-        # 添加疗效指标
-        doc.add_heading('疗效指标', level=1)
-        endpoints = summary.get('efficacy_endpoints', {})
-        doc.add_paragraph(f"主要终点: {endpoints.get('primary_endpoint', '')}")
-        doc.add_paragraph(f"次要终点: {endpoints.get('secondary_endpoint', '')}")
-        doc.add_paragraph(f"探索性终点: {endpoints.get('exploratory_endpoint', '')}")
-        doc.add_paragraph(f"安全性评价: {endpoints.get('safety_evaluation', '')}")
-        
-        # 添加试验设计
-        doc.add_heading('试验设计', level=1)
-        design = summary.get('trial_design', {})
-        doc.add_paragraph(f"研究人群选择及导入期设计依据: {design.get('study_population_selection', '')}")
-        doc.add_paragraph(f"阳性对照药品选择及依据: {design.get('positive_control_selection', '')}")
-        doc.add_paragraph(f"主要疗效终点的选择及依据: {design.get('primary_endpoint_selection', '')}")
-        
-        # 添加其他信息
-        other_info = [
-            ('试验流程', summary.get('trial_process', '')),
-            ('样本量', summary.get('sample_size', '')),
-            ('试验用药品，规格，用法用量', summary.get('investigational_drug', '')),
-            ('合并治疗', summary.get('concomitant_treatment', '')),
-            ('挽救治疗', summary.get('rescue_treatment', '')),
-            ('入排标准', summary.get('inclusion_exclusion_criteria', '')),
-            ('退出和中止/终止标准', summary.get('withdrawal_termination_criteria', '')),
-            ('统计分析', summary.get('statistical_analysis', ''))
-        ]
+        logger.info(f"开始导出 {len(summaries)} 份方案摘要")
+        return Response(
+            stream_with_context(iter_summary_zip(summaries, executor, window=EXPORT_WORKERS * 2)),
+            mimetype='application/zip',
+            headers=attachment_headers('方案摘要.zip')
+        )
         
-        for label, value in other_info:
-            doc.add_heading(label, level=1)
-            doc.add_paragraph(value)
+    except Exception as e:
+        logger.error(f"批量导出方案摘要时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+@app.route('/api/export-extractions', methods=['GET'])
+def export_extractions():
+    """导出关键信息提取结果API
+
+    查询参数: section 为文献类型（决定导出的字段），format 为 csv（默认）或 xlsx；
+    提供 job_id 时导出该批量任务的结果，follow=true 时随任务进度持续输出直到任务结束，
+    否则导出文献目录中保存的该类型全部提取结果。结果逐行流式输出
+    """
+    try:
+        section_name = request.args.get('section', '')
+        if section_name not in EXTRACTION_BASE_PATHS:
+            return jsonify({'error': f'不支持导出的文献类型: {section_name}'}), 400
         
-        # 保存到临时文件
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.docx')
-        doc.save(temp_file.name)
-        temp_file.close()
+        export_format = request.args.get('format', 'csv')
+        if export_format not in ('csv', 'xlsx'):
+            return jsonify({'error': f'不支持的导出格式: {export_format}'}), 400
         
-        # 返回文件
-        return send_file(
-            temp_file.name,
-            as_attachment=True,
-            download_name='方案摘要.docx',
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+        schema_name, schema, _ = get_llm_service().get_extraction_spec(section_name)
+        columns = export_columns(schema)
+        
+        job_id = request.args.get('job_id')
+        if job_id:
+            store = get_job_manager().store
+            if store.get_job(job_id) is None:
+                return jsonify({'error': '任务不存在'}), 404
+            follow = request.args.get('follow', '').lower() in ('1', 'true', 'yes')
+            results = (
+                result for result in store.iter_results(job_id, follow=follow)
+                if result.get('section_name') == section_name and 'error' not in result
+            )
+        else:
+            # 每种文献类型使用独立的schema，按schema筛选即可；目录中已不存在的文献补充文献类型
+            results = (
+                dict(result, section_name=result['section_name'] or section_name)
+                for result in get_catalog().iter_extractions(schema_name)
+            )
+        
+        if export_format == 'xlsx':
+            chunks = iter_xlsx(results, columns, section_name)
+            mimetype = XLSX_MIMETYPE
+        else:
+            chunks = iter_csv(results, columns)
+            mimetype = CSV_MIMETYPE
+        
+        return Response(
+            stream_with_context(chunks),
+            content_type=mimetype,
+            headers=attachment_headers(f'{section_name}-提取结果.{export_format}')
         )
         
     except Exception as e:
-        logger.error(f"下载方案摘要时发生错误: {str(e)}")
+        logger.error(f"导出提取结果时发生错误: {str(e)}")
+        return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
+
+def get_prewarm_worker():
+    """获取后台预提取线程（未启动），预提取的文献同时生成方案摘要"""
+    global prewarm_worker
+    with prewarm_worker_lock:
+        if prewarm_worker is None:
+            llm_service = get_llm_service()
+            prewarm_worker = PrewarmWorker(
+                get_catalog(),
+                {
+                    section_name: [llm_service.get_extraction_spec(section_name)[0], 'summary_extraction']
+                    for section_name in EXTRACTION_BASE_PATHS
+                },
+                lambda item: process_literature_item(llm_service, item, use_cache=True, include_summary=True),
+                lambda: any(provider.in_flight for provider in llm_service.pool.providers),
+                token_budget=config.get_setting('prewarm_token_budget', 2000000, int),
+                budget_window=config.get_setting('prewarm_budget_window', 86400, float),
+                scan_interval=config.get_setting('prewarm_scan_interval', 300, float),
+                idle_seconds=config.get_setting('prewarm_idle_seconds', 60, float),
+                completion_reserve=llm_service.completion_token_reserve,
+                measure_usage=measure_usage
+            )
+        return prewarm_worker
+
+@app.route('/api/prewarm', methods=['GET'])
+def get_prewarm_state():
+    """后台预提取状态API：队列长度、已处理数、预算消耗和最近处理的文献"""
+    try:
+        if prewarm_worker is None:
+            return jsonify({'enabled': PREWARM_ENABLED, 'running': False})
+        
+        state = prewarm_worker.snapshot()
+        state['enabled'] = PREWARM_ENABLED
+        return jsonify(state)
+        
+    except Exception as e:
+        logger.error(f"获取预提取状态时发生错误: {str(e)}")
         return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
 
+def start_background_services():
+    """启动后台服务：恢复未完成的批量任务，在后台增量更新文献目录，启用时开始空闲预提取"""
+    get_job_manager()
+    if PREWARM_ENABLED:
+        # 预提取线程每轮扫描前会先增量更新目录
+        get_prewarm_worker().start()
+    else:
+        threading.Thread(target=get_catalog().refresh, name='catalog-refresh', daemon=True).start()
+
+def stop_background_services():
+    """停止后台服务：等待正在处理的批量任务条目和预提取完成，未开始的条目下次启动时恢复"""
+    if prewarm_worker is not None:
+        prewarm_worker.shutdown(wait=True)
+    if job_manager is not None:
+        job_manager.shutdown(wait=True)
+    shutdown_render_pool()
+
 if __name__ == '__main__':
     print("启动文件系统API服务...")
     print("访问地址: http://localhost:5000")
     print("健康检查: http://localhost:5000/api/health")
+    # debug模式下只在重载子进程中启动后台任务，避免重复执行
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_services()
     app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
@@ -0,0 +1,276 @@
+"""ASGI入口
+
+/api/extract-info 和 /api/generate-summary 以协程实现，LLM调用使用 AsyncOpenAI，
+等待模型响应期间不占用线程；其余接口通过 WSGI 适配层复用 app.py 中的 Flask 路由。
+
+启动: python serve.py（或 uvicorn asgi:application）
+"""
+import asyncio
+import contextlib
+import logging
+import time
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as flask_app
+from config import config
+from llm_cache import LLMCache
+from llm_service import get_llm_service
+import llm_service as llm_service_module
+import metrics
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Flask路由在线程池中执行，线程数决定同步接口的并发上限
+WSGI_WORKERS = config.get_setting('asgi_wsgi_workers', 32, int)
+
+def timed_route(route):
+    """记录协程接口的请求数和耗时（与Flask路由的指标保持一致），并记录用户活动和请求追踪"""
+    def decorator(endpoint):
+        async def wrapper(request):
+            start_time = time.time()
+            flask_app.notify_user_activity(request.url.path)
+            trace, trace_tokens = flask_app.start_request_trace(
+                request.method, request.url.path, request.headers.get('x-request-id')
+            )
+            try:
+                response = await endpoint(request)
+            except BaseException:
+                flask_app.trace_recorder.finish(trace, trace_tokens, 500)
+                raise
+            metrics.HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+            metrics.HTTP_LATENCY.observe(time.time() - start_time, route=route, method=request.method)
+            if trace is None:
+                flask_app.trace_recorder.finish(trace, trace_tokens)
+                return response
+
+            response.headers['X-Request-ID'] = trace.request_id
+            if isinstance(response, StreamingResponse):
+                # 流式响应输出完毕后再保存追踪
+                response.body_iterator = traced_body(response.body_iterator, trace, trace_tokens, response.status_code)
+            else:
+                flask_app.trace_recorder.finish(trace, trace_tokens, response.status_code)
+            return response
+        return wrapper
+    return decorator
+
+async def traced_body(body_iterator, trace, trace_tokens, status):
+    """输出流式响应内容，输出完毕或客户端断开时保存请求追踪"""
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    finally:
+        flask_app.trace_recorder.finish(trace, trace_tokens, status)
+
+async def process_literature_item_async(llm_service, item, use_cache=True, include_summary=False):
+    """process_literature_item 的异步版本，读文件和写目录库在线程池中执行"""
+    try:
+        with span('literature', item=item):
+            loaded = await run_in_threadpool(flask_app.load_literature_item, llm_service, item)
+            if loaded is None:
+                return None
+            section_name, _, _, content = loaded
+
+            duplicates, reused = await run_in_threadpool(
+                flask_app.find_literature_duplicates, llm_service, loaded, include_summary
+            ) if use_cache else ([], None)
+
+            summary = None
+            if reused is not None:
+                extracted_info, summary = reused
+            else:
+                previous, previous_summary = await run_in_threadpool(
+                    flask_app.get_previous_results, llm_service, loaded, include_summary
+                ) if use_cache else (None, None)
+
+                if include_summary:
+                    extracted_info, summary = await llm_service.extract_with_summary_async(
+                        content, section_name, use_cache=use_cache, previous=previous, previous_summary=previous_summary
+                    )
+                else:
+                    extracted_info = await llm_service.extract_key_info_async(
+                        content, section_name, use_cache=use_cache, previous=previous
+                    )
+
+            result = await run_in_threadpool(
+                flask_app.save_literature_result, llm_service, loaded, extracted_info, summary
+            )
+            if duplicates:
+                result['_duplicates'] = duplicates
+            return result
+
+    except Exception as e:
+        return flask_app.literature_error(item, e)
+
+async def stream_extraction_async(llm_service, selected_items, use_cache, include_summary, stream_format):
+    """流式返回提取结果，记录格式与 app.stream_extraction 相同"""
+    semaphore = asyncio.Semaphore(max(1, flask_app.EXTRACT_CONCURRENCY))
+
+    async def timed_process(index, item):
+        async with semaphore:
+            item_start = time.time()
+            result = await process_literature_item_async(llm_service, item, use_cache, include_summary)
+            return index, result, round((time.time() - item_start) * 1000, 1)
+
+    start_time = time.time()
+    first_result_ms = None
+    total_processed = 0
+    error_count = 0
+
+    tasks = [asyncio.create_task(timed_process(index, item)) for index, item in enumerate(selected_items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, result, elapsed_ms = await next_done
+            if result is None:
+                continue
+
+            total_processed += 1
+            if 'error' in result:
+                error_count += 1
+            if first_result_ms is None:
+                first_result_ms = round((time.time() - start_time) * 1000, 1)
+
+            yield flask_app.encode_stream_record({
+                'type': 'error' if 'error' in result else 'result',
+                'index': index,
+                'elapsed_ms': elapsed_ms,
+                'result': result
+            }, stream_format)
+
+        yield flask_app.encode_stream_record({
+            'type': 'summary',
+            'success': True,
+            'total_processed': total_processed,
+            'error_count': error_count,
+            'first_result_ms': first_result_ms,
+            'total_ms': round((time.time() - start_time) * 1000, 1)
+        }, stream_format)
+    finally:
+        # 客户端断开时取消尚未完成的文献
+        for task in tasks:
+            task.cancel()
+
+@timed_route('/api/extract-info')
+async def extract_key_info(request):
+    """提取关键信息API（异步）"""
+    try:
+        data = await request.json()
+        if not data or 'selected_items' not in data:
+            return JSONResponse({'error': '缺少selected_items参数'}, status_code=400)
+
+        selected_items = data['selected_items']
+        if not selected_items:
+            return JSONResponse({'error': '没有选择任何项目'}, status_code=400)
+
+        try:
+            use_cache, include_summary = flask_app.get_extraction_options(data)
+        except ValueError as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+
+        try:
+            llm_service = get_llm_service()
+        except Exception as e:
+            return JSONResponse({'error': f'LLM服务初始化失败: {str(e)}'}, status_code=500)
+
+        stream_format = flask_app.get_stream_format(data, request.headers.get('accept', ''))
+        if stream_format:
+            media_type = 'text/event-stream' if stream_format == 'sse' else 'application/x-ndjson'
+            return StreamingResponse(
+                stream_extraction_async(llm_service, selected_items, use_cache, include_summary, stream_format),
+                media_type=media_type,
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+
+        # 有界并发处理各文献，gather保证结果顺序与选中顺序一致
+        semaphore = asyncio.Semaphore(max(1, flask_app.EXTRACT_CONCURRENCY))
+
+        async def bounded(item):
+            async with semaphore:
+                return await process_literature_item_async(llm_service, item, use_cache, include_summary)
+
+        processed = await asyncio.gather(*(bounded(item) for item in selected_items))
+        results = [result for result in processed if result is not None]
+
+        return JSONResponse({
+            'success': True,
+            'results': results,
+            'total_processed': len(results)
+        })
+
+    except Exception as e:
+        logger.error(f"提取关键信息时发生错误: {str(e)}")
+        return JSONResponse({'error': f'服务器内部错误: {str(e)}'}, status_code=500)
+
+@timed_route('/api/generate-summary')
+async def generate_summary(request):
+    """生成方案摘要API（异步）"""
+    try:
+        data = await request.json()
+        if not data or 'literature_info' not in data:
+            return JSONResponse({'error': '缺少literature_info参数'}, status_code=400)
+
+        literature_info = data['literature_info']
+        if not literature_info.get('md_file_path'):
+            return JSONResponse({'error': '缺少md_file_path信息'}, status_code=400)
+
+        try:
+            llm_service = get_llm_service()
+        except Exception as e:
+            return JSONResponse({'error': f'LLM服务初始化失败: {str(e)}'}, status_code=500)
+
+        md_file_path = literature_info['md_file_path']
+        content = await run_in_threadpool(llm_service.read_md_file, md_file_path)
+        content_hash = await run_in_threadpool(LLMCache.content_hash, content)
+        use_cache = not data.get('bypass_cache', False)
+
+        summary, previous = None, None
+        if use_cache:
+            summary, previous = await run_in_threadpool(flask_app.get_stored_summary, md_file_path, content_hash)
+        if summary is None:
+            summary = await llm_service.generate_summary_async(content, use_cache=use_cache, previous=previous)
+            await run_in_threadpool(
+                flask_app.get_catalog().record_extraction, md_file_path, 'summary_extraction', content_hash, summary
+            )
+
+        summary['literature_name'] = literature_info.get('literature_name', '')
+        summary['section_name'] = literature_info.get('section_name', '')
+
+        logger.info(f"成功生成文献 {literature_info.get('literature_name', '')} 的方案摘要")
+
+        return JSONResponse({
+            'success': True,
+            'summary': summary
+        })
+
+    except Exception as e:
+        logger.error(f"生成方案摘要时发生错误: {str(e)}")
+        return JSONResponse({'error': f'服务器内部错误: {str(e)}'}, status_code=500)
+
+@contextlib.asynccontextmanager
+async def lifespan(application):
+    """启动时恢复后台任务；关闭时等待后台任务条目完成并关闭LLM连接池"""
+    flask_app.start_background_services()
+    yield
+    logger.info("正在停止后台服务...")
+    await run_in_threadpool(flask_app.stop_background_services)
+    if llm_service_module.llm_service is not None:
+        await llm_service_module.llm_service.aclose()
+
+application = Starlette(
+    routes=[
+        Route('/api/extract-info', extract_key_info, methods=['POST']),
+        Route('/api/generate-summary', generate_summary, methods=['POST']),
+        Mount('/', app=WSGIMiddleware(flask_app.app, workers=WSGI_WORKERS))
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,284 @@
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+
+from llm_cache import LLMCache
+from llm_service import EXTRACTION_SYSTEM_PROMPT
+from schema_validation import validate_result
+
+logger = logging.getLogger(__name__)
+
+# 服务商批任务的终止状态
+TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+# submit 生成的本地批任务编号（uuid4().hex），来自URL的编号不符合时不访问磁盘
+BATCH_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+def is_valid_batch_id(batch_id):
+    return bool(BATCH_ID_PATTERN.fullmatch(batch_id or ''))
+
+class BatchExtractionManager:
+    """基于服务商Batch API的离线批量提取
+
+    将交互模式下构造的 chat.completions 请求写入JSONL批处理文件并提交，
+    轮询完成后把结果写入LLM缓存和文献目录库。每个批任务的请求文件和清单
+    保存在 batch_dir/<batch_id>/ 下，服务重启后可继续轮询和导入
+    """
+
+    def __init__(self, llm_service, catalog, batch_dir):
+        self.llm_service = llm_service
+        self.catalog = catalog
+        self.batch_dir = batch_dir
+        self._lock = threading.Lock()
+        os.makedirs(batch_dir, exist_ok=True)
+
+    def _manifest_path(self, batch_id):
+        return os.path.join(self.batch_dir, batch_id, 'manifest.json')
+
+    def _save_manifest(self, manifest):
+        path = self._manifest_path(manifest['batch_id'])
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+
+    def load_manifest(self, batch_id):
+        """读取批任务清单，编号格式不正确或不存在时返回None"""
+        if not is_valid_batch_id(batch_id):
+            return None
+        path = self._manifest_path(batch_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def list_batches(self):
+        """列出所有批任务的概要信息"""
+        batches = []
+        for batch_id in os.listdir(self.batch_dir):
+            manifest = self.load_manifest(batch_id)
+            if manifest:
+                batches.append(self._summarize(manifest))
+        return sorted(batches, key=lambda batch: batch['created_at'], reverse=True)
+
+    def build_batch_file(self, entries, file_obj):
+        """为每篇文献构造提取请求并写入JSONL，返回清单中的文献条目
+
+        entries 为 [{'section_name', 'literature_name', 'md_file_path'}]，
+        超长文献的每个分片各占一行，custom_id 为 "<文献序号>-<请求序号>"
+        """
+        # 批处理文件提交给主服务商，使用其配置的模型
+        model = self.llm_service.pool.primary.model
+        items = []
+        for index, entry in enumerate(entries):
+            item = dict(entry, index=index, status='pending', error=None)
+            try:
+                content = self.llm_service.read_md_file(entry['md_file_path'])
+                schema_name, schema, prompt_builder = self.llm_service.get_extraction_spec(entry['section_name'])
+                normalized, normalization = self.llm_service.normalize_content(content)
+                plan = self.llm_service.plan_completion(
+                    normalized, schema_name, schema, EXTRACTION_SYSTEM_PROMPT, prompt_builder, normalization
+                )
+            except Exception as e:
+                item.update(status='error', error=f"构造请求失败: {str(e)}")
+                items.append(item)
+                continue
+
+            for request_index, body in enumerate(plan['requests']):
+                file_obj.write(json.dumps({
+                    'custom_id': f"{index}-{request_index}",
+                    'method': 'POST',
+                    'url': '/v1/chat/completions',
+                    'body': dict(body, model=model)
+                }, ensure_ascii=False) + '\n')
+
+            item.update(
+                schema_name=schema_name,
+                content_hash=LLMCache.content_hash(content),
+                request_count=len(plan['requests']),
+                chunks=[
+                    {key: chunk[key] for key in ('index', 'headings', 'tokens')}
+                    for chunk in plan['chunks']
+                ] if plan['chunks'] is not None else None,
+                selection=plan['selection'],
+                normalization=normalization
+            )
+            items.append(item)
+        return items
+
+    def submit(self, entries):
+        """构造批处理文件并提交到服务商，返回批任务清单"""
+        self.llm_service._ensure_client()
+        client = self.llm_service.client
+
+        batch_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self.batch_dir, batch_id))
+        input_path = os.path.join(self.batch_dir, batch_id, 'requests.jsonl')
+        with open(input_path, 'w', encoding='utf-8') as f:
+            items = self.build_batch_file(entries, f)
+
+        manifest = {
+            'batch_id': batch_id,
+            'created_at': time.time(),
+            'status': 'building',
+            'remote_batch_id': None,
+            'remote_status': None,
+            'input_file_id': None,
+            'output_file_id': None,
+            'error_file_id': None,
+            'ingested': False,
+            'items': items
+        }
+
+        if not any(item['status'] == 'pending' for item in items):
+            manifest['status'] = 'failed'
+            self._save_manifest(manifest)
+            return manifest
+
+        with open(input_path, 'rb') as f:
+            uploaded = client.files.create(file=('requests.jsonl', f), purpose='batch')
+        remote_batch = client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint='/v1/chat/completions',
+            completion_window='24h',
+            metadata={'source': 'noahpharm-demo', 'local_batch_id': batch_id}
+        )
+        manifest.update(
+            status='submitted',
+            input_file_id=uploaded.id,
+            remote_batch_id=remote_batch.id,
+            remote_status=remote_batch.status
+        )
+        self._save_manifest(manifest)
+        logger.info(f"已提交批任务 {batch_id}（服务商批任务 {remote_batch.id}），共 {len(items)} 篇文献")
+        return manifest
+
+    def refresh(self, batch_id):
+        """查询服务商批任务状态，完成后导入结果，返回批任务概要"""
+        with self._lock:
+            manifest = self.load_manifest(batch_id)
+            if manifest is None:
+                return None
+            if manifest['remote_batch_id'] is None or manifest['ingested']:
+                return self._summarize(manifest)
+
+            self.llm_service._ensure_client()
+            remote_batch = self.llm_service.client.batches.retrieve(manifest['remote_batch_id'])
+            manifest.update(
+                remote_status=remote_batch.status,
+                output_file_id=remote_batch.output_file_id,
+                error_file_id=remote_batch.error_file_id
+            )
+
+            if remote_batch.status in TERMINAL_STATUSES:
+                self._ingest(manifest)
+            self._save_manifest(manifest)
+            return self._summarize(manifest)
+
+    def wait(self, batch_id, poll_interval=30, timeout=None):
+        """阻塞轮询直到批任务结束，返回批任务概要"""
+        start_time = time.time()
+        while True:
+            summary = self.refresh(batch_id)
+            if summary is None or summary['ingested'] or summary['status'] == 'failed':
+                return summary
+            if timeout is not None and time.time() - start_time > timeout:
+                return summary
+            time.sleep(poll_interval)
+
+    def cancel(self, batch_id):
+        """取消服务商批任务，已完成的部分结果仍会在下次刷新时导入"""
+        manifest = self.load_manifest(batch_id)
+        if manifest is None or manifest['remote_batch_id'] is None:
+            return False
+        self.llm_service._ensure_client()
+        self.llm_service.client.batches.cancel(manifest['remote_batch_id'])
+        return True
+
+    def _read_remote_file(self, file_id):
+        if not file_id:
+            return []
+        content = self.llm_service.client.files.content(file_id)
+        return [json.loads(line) for line in io.StringIO(content.text) if line.strip()]
+
+    def _ingest(self, manifest):
+        """解析输出文件，按文献合并各请求结果后写入缓存和文献目录库"""
+        responses = {}
+        errors = {}
+        for line in self._read_remote_file(manifest['output_file_id']) + \
+                self._read_remote_file(manifest['error_file_id']):
+            response = line.get('response') or {}
+            if line.get('error') or response.get('status_code') != 200:
+                errors[line['custom_id']] = str(line.get('error') or response.get('body'))
+            else:
+                responses[line['custom_id']] = response['body']
+
+        for item in manifest['items']:
+            if item['status'] != 'pending':
+                continue
+            try:
+                partials = []
+                for request_index in range(item['request_count']):
+                    custom_id = f"{item['index']}-{request_index}"
+                    if custom_id in errors:
+                        raise Exception(f"批处理请求失败: {errors[custom_id]}")
+                    if custom_id not in responses:
+                        raise Exception("批任务结束但未返回该请求的结果")
+                    body = responses[custom_id]
+                    self.llm_service._record_usage(item['schema_name'], body.get('usage'), body.get('model'))
+                    partials.append(self.llm_service.parse_completion_content(
+                        item['schema_name'], body['choices'][0]['message']['content']
+                    ))
+
+                # 提交后MD文件有变化时结果已过期，不再写入
+                content = self.llm_service.read_md_file(item['md_file_path'])
+                if LLMCache.content_hash(content) != item['content_hash']:
+                    raise Exception("MD文件在批任务期间发生变化，结果已过期")
+
+                schema_name, schema, _ = self.llm_service.get_extraction_spec(item['section_name'])
+                result = self.llm_service.assemble_result(
+                    {
+                        'schema': schema, 'chunks': item['chunks'], 'selection': item['selection'],
+                        'normalization': item.get('normalization')
+                    },
+                    partials
+                )
+                # 批处理结果不做补充提取，只按schema规范化
+                result, _ = validate_result(result, schema)
+                # 章节指纹与交互提取一致，按规范化后的内容计算
+                self.llm_service.attach_sections(self.llm_service.normalize_content(content)[0], schema, result)
+                self.llm_service.store_result(content, schema_name, result)
+                self.catalog.record_extraction(item['md_file_path'], schema_name, item['content_hash'], result)
+                item['status'] = 'done'
+            except Exception as e:
+                item.update(status='error', error=str(e))
+
+        manifest['ingested'] = True
+        manifest['status'] = 'ingested'
+        done = sum(1 for item in manifest['items'] if item['status'] == 'done')
+        logger.info(f"批任务 {manifest['batch_id']} 结果已导入: 成功 {done}/{len(manifest['items'])}")
+
+    @staticmethod
+    def _summarize(manifest):
+        counts = {}
+        for item in manifest['items']:
+            counts[item['status']] = counts.get(item['status'], 0) + 1
+        return {
+            'batch_id': manifest['batch_id'],
+            'created_at': manifest['created_at'],
+            'status': manifest['status'],
+            'remote_batch_id': manifest['remote_batch_id'],
+            'remote_status': manifest['remote_status'],
+            'ingested': manifest['ingested'],
+            'total': len(manifest['items']),
+            'progress': counts,
+            'items': [
+                {key: item.get(key) for key in ('index', 'section_name', 'literature_name', 'status', 'error')}
+                for item in manifest['items']
+            ]
+        }
@@ -0,0 +1,47 @@
+"""对比两次压测结果
+
+用法: python bench/compare.py before.json after.json
+"""
+import argparse
+import json
+
+METRICS = (
+    ('throughput_rps', '吞吐量(req/s)', lambda result: result['throughput_rps']),
+    ('p50', 'p50(ms)', lambda result: result['latency_ms']['p50']),
+    ('p95', 'p95(ms)', lambda result: result['latency_ms']['p95']),
+    ('p99', 'p99(ms)', lambda result: result['latency_ms']['p99']),
+    ('errors', '错误数', lambda result: result['errors']),
+    ('peak_rss_mb', '峰值内存(MB)', lambda result: result['peak_rss_mb']),
+)
+
+def change(before, after):
+    if before in (None, 0) or after is None:
+        return ''
+    return f"{(after - before) / before:+.1%}"
+
+def main():
+    parser = argparse.ArgumentParser(description='对比两次压测结果')
+    parser.add_argument('before')
+    parser.add_argument('after')
+    args = parser.parse_args()
+
+    with open(args.before, 'r', encoding='utf-8') as f:
+        before = json.load(f)
+    with open(args.after, 'r', encoding='utf-8') as f:
+        after = json.load(f)
+
+    print(f"before: {before.get('git_commit')} ({before.get('server')})  "
+          f"after: {after.get('git_commit')} ({after.get('server')})")
+    for scenario in before['scenarios']:
+        if scenario not in after['scenarios']:
+            continue
+        print(f"\n[{scenario}]")
+        for _, label, getter in METRICS:
+            old = getter(before['scenarios'][scenario])
+            new = getter(after['scenarios'][scenario])
+            print(f"  {label:<14}{str(old):>12}{str(new):>12}{change(old, new):>10}")
+    print(f"\n进程峰值内存(MB): {before.get('peak_rss_mb')} -> {after.get('peak_rss_mb')} "
+          f"{change(before.get('peak_rss_mb'), after.get('peak_rss_mb'))}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""生成压测用的合成文献库
+
+在根目录下创建与 app.SECTION_PATHS 同名的区域文件夹，支持提取的区域下各生成N个文献文件夹，
+每个文件夹包含 auto/<文献名>.md，内容为带标题层级的模拟试验方案，大小可配置。
+
+用法: python bench/corpus.py --root /tmp/bench-corpus --count 50 --size-kb 40
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 各章节的标题和正文片段，包含提取字段常见的关键词，便于段落预选等逻辑正常工作
+SECTIONS = [
+    ('研究概述', '本试验由{company}发起，评估{drug}（{form}）在{indication}患者中的疗效和安全性。'),
+    ('试验设计', '本研究为多中心、随机、双盲、阳性药对照的{phase}临床试验，采用非劣效设计，受试者按1:1随机分组。'),
+    ('研究人群', '入选标准：年龄18-75岁，确诊为{indication}，签署知情同意书。排除标准：严重肝肾功能不全，妊娠或哺乳期妇女。'),
+    ('给药方案', '试验组每日一次口服{drug} {form}，对照组给予阳性对照药，疗程8周，期间允许合并使用稳定剂量的基础治疗。'),
+    ('疗效指标', '主要终点为第8周坐位收缩压较基线的变化，次要终点包括血压达标率和舒张压变化，安全性评价包括不良事件和实验室检查。'),
+    ('统计分析', '计划入组{sample}例受试者，来自{centers}家研究中心，采用协方差分析模型，非劣效界值为3 mmHg，95%置信区间。'),
+    ('试验进度', '首例受试者入组日期为{start}，预计试验完成日期为{end}。'),
+]
+
+def literature_markdown(name, size_kb, rng):
+    """生成一篇约 size_kb KB 的模拟文献"""
+    values = {
+        'company': rng.choice(['示例制药有限公司', 'Example Pharma Inc.', '模拟生物科技股份有限公司']),
+        'drug': f"NP-{rng.randint(100, 999)}",
+        'form': rng.choice(['片剂 80mg/5mg/12.5mg', '胶囊 10mg', '缓释片 40mg']),
+        'indication': rng.choice(['原发性高血压', '2型糖尿病', '高脂血症']),
+        'phase': rng.choice(['I期', 'II期', 'III期']),
+        'sample': rng.randint(60, 900),
+        'centers': rng.randint(1, 40),
+        'start': f"20{rng.randint(15, 23)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+        'end': f"20{rng.randint(24, 27)}-1{rng.randint(0, 2)}-2{rng.randint(0, 8)}",
+    }
+    parts = [f"# {name}\n"]
+    size = 0
+    target = size_kb * 1024
+    round_index = 0
+    while size < target:
+        for title, template in SECTIONS:
+            heading = f"\n## {title}" + (f"（续{round_index}）" if round_index else '') + "\n\n"
+            paragraph = template.format(**values) + '\n'
+            parts.append(heading + paragraph)
+            size += len((heading + paragraph).encode('utf-8'))
+        round_index += 1
+    return ''.join(parts)
+
+def generate_corpus(root, count, size_kb, seed=0):
+    """生成合成文献库，返回 {区域名称: [文献名称]}"""
+    from app import SECTION_PATHS, EXTRACTION_BASE_PATHS
+
+    rng = random.Random(seed)
+    generated = {}
+    for section_path in SECTION_PATHS.values():
+        section_name = os.path.basename(section_path)
+        os.makedirs(os.path.join(root, section_name), exist_ok=True)
+        if section_name not in EXTRACTION_BASE_PATHS:
+            continue
+
+        names = []
+        for index in range(count):
+            name = f"模拟文献{index:04d}"
+            md_dir = os.path.join(root, section_name, name, 'auto')
+            os.makedirs(md_dir, exist_ok=True)
+            with open(os.path.join(md_dir, f"{name}.md"), 'w', encoding='utf-8') as f:
+                f.write(literature_markdown(name, size_kb, rng))
+            names.append(name)
+        generated[section_name] = names
+    return generated
+
+def main():
+    parser = argparse.ArgumentParser(description='生成压测用的合成文献库')
+    parser.add_argument('--root', required=True, help='文献库根目录')
+    parser.add_argument('--count', type=int, default=50, help='每个可提取区域的文献数')
+    parser.add_argument('--size-kb', type=int, default=40, help='每篇MD文件的大小（KB）')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    generated = generate_corpus(args.root, args.count, args.size_kb, args.seed)
+    for section_name, names in generated.items():
+        print(f"{section_name}: {len(names)} 篇")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,382 @@
+"""端到端压测
+
+启动本地OpenAI模拟服务和后端服务（Flask或ASGI），生成合成文献库，按设定并发依次压测
+/api/folders/all、/api/extract-info、/api/generate-summary、/api/download-summary，
+输出各场景的吞吐量、p50/p95/p99延迟和后端进程峰值内存（JSON），便于不同版本之间对比。
+
+用法: python bench/run.py --server asgi --concurrency 32 --requests 200 --latency 1.0 --output result.json
+对比: python bench/compare.py before.json after.json
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from corpus import generate_corpus  # noqa: E402
+
+SCENARIOS = ('folders_all', 'extract_info', 'generate_summary', 'download_summary')
+
+# Flask模式：不使用debug重载，启动后台服务后以多线程方式运行
+FLASK_LAUNCHER = (
+    "import sys, app; app.start_background_services(); "
+    "app.app.run(host='127.0.0.1', port=int(sys.argv[1]), threaded=True)"
+)
+
+def read_rss_mb(pid, field='VmRSS'):
+    """读取进程的常驻内存（MB），field为VmHWM时读取峰值；无法读取时返回None"""
+    try:
+        import psutil
+        process = psutil.Process(pid)
+        if field == 'VmHWM':
+            peak = getattr(process.memory_info(), 'peak_wset', None)
+            return round(peak / 1024 / 1024, 1) if peak else None
+        return round(process.memory_info().rss / 1024 / 1024, 1)
+    except ImportError:
+        pass
+    except Exception:
+        return None
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+    return None
+
+class RssSampler:
+    """后台定时采样进程内存，记录采样期间的峰值"""
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def sample(self):
+        rss = read_rss_mb(self.pid)
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+    def reset(self):
+        self.peak = None
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+def percentile(sorted_values, fraction):
+    """最近秩法计算分位数"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def http_request(base_url, method, path, body=None, timeout=600):
+    """发送请求并读取完整响应，返回 (状态码, 响应头Content-Type, 响应体)"""
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    request = urllib.request.Request(
+        base_url + path, data=data, method=method,
+        headers={'Content-Type': 'application/json'} if data is not None else {}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, response.headers.get('Content-Type', ''), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers.get('Content-Type', ''), e.read()
+
+def response_ok(status, content_type, payload):
+    """状态码为200且JSON响应中没有错误（提取结果中的单篇错误也计为失败）"""
+    if status != 200:
+        return False
+    if 'application/json' not in content_type:
+        return True
+    data = json.loads(payload)
+    if 'error' in data:
+        return False
+    return not any('error' in result for result in data.get('results', []))
+
+def build_requests(scenario, count, corpus, args):
+    """生成某个场景的请求列表 [(method, path, body)]"""
+    items = [
+        (section_name, name, os.path.join(args.corpus_root, section_name, name, 'auto', f'{name}.md'))
+        for section_name, names in corpus.items() for name in names
+    ]
+    use_cache = args.use_cache
+    requests = []
+    for index in range(count):
+        if scenario == 'folders_all':
+            requests.append(('GET', '/api/folders/all', None))
+        elif scenario == 'extract_info':
+            selected = [
+                f"{section_name}/{name}"
+                for section_name, name, _ in (
+                    items[(index * args.items_per_request + offset) % len(items)]
+                    for offset in range(args.items_per_request)
+                )
+            ]
+            requests.append(('POST', '/api/extract-info', {
+                'selected_items': selected, 'bypass_cache': not use_cache
+            }))
+        elif scenario == 'generate_summary':
+            section_name, name, md_file_path = items[index % len(items)]
+            requests.append(('POST', '/api/generate-summary', {
+                'literature_info': {
+                    'md_file_path': md_file_path, 'literature_name': name, 'section_name': section_name
+                },
+                'bypass_cache': not use_cache
+            }))
+        elif scenario == 'download_summary':
+            requests.append(('POST', '/api/download-summary', {'summary': sample_summary(index)}))
+    return requests
+
+def sample_summary(index):
+    """下载场景使用的方案摘要"""
+    text = '模拟内容，包含试验设计、给药方案和统计分析的详细描述。' * 10
+    return {
+        'study_title': f'模拟研究{index}',
+        'drug_name_specification': text,
+        'indication': '原发性高血压',
+        'trial_phase': 'III期',
+        'center_count': '20',
+        'study_period': '12个月',
+        'study_objectives': {'primary_objective': text, 'secondary_objective': text},
+        'efficacy_endpoints': {
+            'primary_endpoint': text, 'secondary_endpoint': text,
+            'exploratory_endpoint': text, 'safety_evaluation': text
+        },
+        'trial_design': {
+            'study_population_selection': text, 'positive_control_selection': text,
+            'primary_endpoint_selection': text
+        },
+        'trial_process': text,
+        'sample_size': '600',
+        'investigational_drug': text,
+        'concomitant_treatment': text,
+        'rescue_treatment': text,
+        'inclusion_exclusion_criteria': text,
+        'withdrawal_termination_criteria': text,
+        'statistical_analysis': text
+    }
+
+def run_scenario(base_url, requests, concurrency, sampler):
+    """按设定并发发送请求，返回该场景的统计结果"""
+    def timed(request):
+        method, path, body = request
+        start = time.perf_counter()
+        try:
+            status, content_type, payload = http_request(base_url, method, path, body)
+            ok = response_ok(status, content_type, payload)
+        except Exception:
+            status, ok, payload = None, False, b''
+        return ok, time.perf_counter() - start, status, len(payload)
+
+    sampler.reset()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(timed, requests))
+    duration = time.perf_counter() - start
+    # 场景耗时短于采样间隔时至少保留结束时的一次采样
+    sampler.sample()
+
+    latencies = sorted(latency * 1000 for _, latency, _, _ in outcomes)
+    errors = sum(1 for ok, _, _, _ in outcomes if not ok)
+    status_counts = {}
+    for _, _, status, _ in outcomes:
+        status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+    return {
+        'requests': len(outcomes),
+        'errors': errors,
+        'status_counts': status_counts,
+        'concurrency': concurrency,
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(len(outcomes) / duration, 2) if duration else None,
+        'response_bytes': sum(size for _, _, _, size in outcomes),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50), 1),
+            'p95': round(percentile(latencies, 0.95), 1),
+            'p99': round(percentile(latencies, 0.99), 1),
+            'mean': round(sum(latencies) / len(latencies), 1),
+            'max': round(latencies[-1], 1)
+        },
+        'peak_rss_mb': sampler.peak
+    }
+
+def wait_for(url, timeout=60):
+    """等待服务可用"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2):
+                return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f"服务未能在 {timeout} 秒内启动: {url}")
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+def start_services(args, work_dir):
+    """启动模拟服务和后端服务，返回 (模拟服务进程, 后端进程)"""
+    provider_env = os.path.join(work_dir, 'bench.provider_env')
+    with open(provider_env, 'w', encoding='utf-8') as f:
+        f.write(f"[MOCK]\napi_key = mock\nbase_url = http://127.0.0.1:{args.mock_port}/v1\n")
+
+    mock_process = subprocess.Popen([
+        sys.executable, os.path.join(BACKEND_DIR, 'mock_openai_server.py'),
+        '--port', str(args.mock_port),
+        '--latency', str(args.latency),
+        '--latency-per-token', str(args.latency_per_token),
+        '--latency-jitter', str(args.latency_jitter),
+        '--prompt-tokens', str(args.prompt_tokens),
+        '--completion-tokens', str(args.completion_tokens),
+        '--error-rate', str(args.error_rate),
+        '--error-status', str(args.error_status)
+    ], cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    env = dict(
+        os.environ,
+        NOAHPHARM_PROVIDER_ENV=provider_env,
+        NOAHPHARM_LLM_PROVIDER='MOCK',
+        NOAHPHARM_DATA_ROOT=args.corpus_root,
+        NOAHPHARM_DATA_DIR=os.path.join(work_dir, 'data')
+    )
+    for setting in args.set or []:
+        key, _, value = setting.partition('=')
+        env[f'NOAHPHARM_{key.upper()}'] = value
+
+    if args.server == 'asgi':
+        command = [sys.executable, os.path.join(BACKEND_DIR, 'serve.py'), '--host', '127.0.0.1',
+                   '--port', str(args.port)]
+    else:
+        command = [sys.executable, '-c', FLASK_LAUNCHER, str(args.port)]
+    log_file = open(os.path.join(work_dir, 'server.log'), 'w')
+    app_process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+    wait_for(f"http://127.0.0.1:{args.mock_port}/_mock/settings")
+    wait_for(f"http://127.0.0.1:{args.port}/api/health")
+    return mock_process, app_process
+
+def stop_process(process, timeout=30):
+    process.terminate()
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description='端到端压测')
+    parser.add_argument('--server', choices=('flask', 'asgi'), default='flask', help='后端服务模式')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--mock-port', type=int, default=8055)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='逗号分隔的场景列表')
+    parser.add_argument('--concurrency', type=int, default=8, help='并发请求数')
+    parser.add_argument('--requests', type=int, default=50, help='每个场景的请求数')
+    parser.add_argument('--items-per-request', type=int, default=1, help='extract_info 每个请求选择的文献数')
+    parser.add_argument('--use-cache', action='store_true', help='允许命中LLM结果缓存（默认每次都调用模型）')
+    parser.add_argument('--corpus-root', help='文献库目录，默认在临时目录中生成')
+    parser.add_argument('--reuse-corpus', action='store_true', help='--corpus-root 已存在时不重新生成')
+    parser.add_argument('--count', type=int, default=50, help='每个可提取区域的文献数')
+    parser.add_argument('--size-kb', type=int, default=40, help='每篇MD文件的大小（KB）')
+    parser.add_argument('--latency', type=float, default=0.5, help='模拟LLM固定响应延迟秒数')
+    parser.add_argument('--latency-per-token', type=float, default=0.0)
+    parser.add_argument('--latency-jitter', type=float, default=0.2)
+    parser.add_argument('--prompt-tokens', type=int, default=0)
+    parser.add_argument('--completion-tokens', type=int, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--set', action='append', metavar='KEY=VALUE',
+                        help='传给后端的运行参数（NOAHPHARM_<KEY>），可多次指定')
+    parser.add_argument('--output', help='结果JSON的保存路径，默认只输出到标准输出')
+    parser.add_argument('--keep', action='store_true', help='保留临时目录（含后端日志）')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"未知场景: {unknown}")
+
+    work_dir = tempfile.mkdtemp(prefix='noahpharm-bench-')
+    if not args.corpus_root:
+        args.corpus_root = os.path.join(work_dir, 'corpus')
+    if args.reuse_corpus and os.path.isdir(args.corpus_root):
+        from app import EXTRACTION_BASE_PATHS
+        corpus = {
+            section_name: sorted(os.listdir(os.path.join(args.corpus_root, section_name)))
+            for section_name in EXTRACTION_BASE_PATHS
+        }
+    else:
+        corpus = generate_corpus(args.corpus_root, args.count, args.size_kb)
+
+    mock_process, app_process = start_services(args, work_dir)
+    sampler = RssSampler(app_process.pid).start()
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = {}
+    try:
+        for scenario in scenarios:
+            requests = build_requests(scenario, args.requests, corpus, args)
+            print(f"场景 {scenario}: {len(requests)} 个请求，并发 {args.concurrency}", file=sys.stderr)
+            results[scenario] = run_scenario(base_url, requests, args.concurrency, sampler)
+        app_peak_rss = read_rss_mb(app_process.pid, 'VmHWM') or sampler.peak
+        with urllib.request.urlopen(f"http://127.0.0.1:{args.mock_port}/_mock/settings") as response:
+            mock_stats = json.loads(response.read())['stats']
+    finally:
+        sampler.stop()
+        stop_process(app_process)
+        stop_process(mock_process)
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_commit': git_commit(),
+        'server': args.server,
+        'config': {
+            key: getattr(args, key) for key in (
+                'concurrency', 'requests', 'items_per_request', 'use_cache', 'count', 'size_kb', 'latency',
+                'latency_per_token', 'latency_jitter', 'prompt_tokens', 'completion_tokens', 'error_rate',
+                'error_status', 'set'
+            )
+        },
+        'scenarios': results,
+        'peak_rss_mb': app_peak_rss,
+        'mock': mock_stats
+    }
+    if args.keep:
+        report['work_dir'] = work_dir
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import threading
+from collections import Counter
+
+from passage_selection import tokenize
+
+def field_confidence(value, content_tokens, content_lower):
+    """按取值与原文的词重合度估算字段置信度（0~1）
+
+    取值分词后逐词检查是否出现在原文中，单个中文字直接在原文中查找；没有有效词的取值置信度为0
+    """
+    tokens = tokenize(value)
+    if not tokens:
+        return 0.0
+    grounded = sum(
+        1 for token in tokens
+        if token in content_tokens or (len(token) == 1 and token in content_lower)
+    )
+    return round(grounded / len(tokens), 4)
+
+class CascadeStats:
+    """模型级联的逐字段统计：小模型结果被采纳或升级到大模型的次数、升级原因和大模型改写的次数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._schemas = {}
+
+    def record(self, schema_name, confidence, escalations, changed):
+        """记录一篇文献的级联结果，confidence 为各字段的置信度，escalations 为 {升级字段: 原因}"""
+        with self._lock:
+            schema_stats = self._schemas.setdefault(schema_name, {
+                'documents': 0,
+                'escalated_documents': 0,
+                'fields': {}
+            })
+            schema_stats['documents'] += 1
+            schema_stats['escalated_documents'] += bool(escalations)
+            for field_path, score in confidence.items():
+                field_stats = schema_stats['fields'].setdefault(field_path, {
+                    'total': 0,
+                    'escalated': 0,
+                    'changed': 0,
+                    'confidence_sum': 0.0,
+                    'reasons': Counter()
+                })
+                field_stats['total'] += 1
+                field_stats['confidence_sum'] += score
+                if field_path in escalations:
+                    field_stats['escalated'] += 1
+                    field_stats['reasons'][escalations[field_path]] += 1
+                if field_path in changed:
+                    field_stats['changed'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                schema_name: {
+                    'documents': schema_stats['documents'],
+                    'escalated_documents': schema_stats['escalated_documents'],
+                    'fields': {
+                        field_path: {
+                            'total': field_stats['total'],
+                            'escalated': field_stats['escalated'],
+                            'escalation_rate': round(field_stats['escalated'] / field_stats['total'], 4),
+                            'changed': field_stats['changed'],
+                            'avg_confidence': round(field_stats['confidence_sum'] / field_stats['total'], 4),
+                            'reasons': dict(field_stats['reasons'])
+                        }
+                        for field_path, field_stats in schema_stats['fields'].items()
+                    }
+                }
+                for schema_name, schema_stats in self._schemas.items()
+            }
@@ -0,0 +1,560 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from chunking import estimate_tokens
+from fulltext import build_match_query, index_text
+from near_duplicates import (
+    band_keys, pack_signature, registry_ids, registry_key, signature_similarity, token_signature, unpack_signature
+)
+from passage_selection import tokenize
+
+logger = logging.getLogger(__name__)
+
+# 更新目录时每写入多少个条目提交一次事务
+COMMIT_BATCH = 200
+
+# 一次更新的条目数超过该值时合并全文索引的分段，提高检索速度
+SEARCH_OPTIMIZE_THRESHOLD = 1000
+
+class SearchUnavailableError(RuntimeError):
+    """SQLite未编译FTS5，全文检索不可用"""
+
+class LiteratureCatalog:
+    """文献目录索引
+
+    记录各区域下每个文献文件夹对应的MD文件路径、大小、估算token数、内容哈希和MinHash签名，
+    并维护MD全文的FTS5索引，均按MD文件的mtime和大小增量更新；同时保存每篇文献最近一次的提取结果
+    """
+
+    def __init__(self, db_path, section_paths):
+        self.db_path = db_path
+        self.section_paths = section_paths
+        self.last_refresh = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        tables = {row[0] for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS literature (
+                section_name TEXT NOT NULL,
+                literature_name TEXT NOT NULL,
+                folder_path TEXT NOT NULL,
+                md_file_path TEXT,
+                md_mtime_ns INTEGER,
+                md_size INTEGER,
+                estimated_tokens INTEGER,
+                content_hash TEXT,
+                indexed_at REAL NOT NULL,
+                last_extracted_at REAL,
+                PRIMARY KEY (section_name, literature_name)
+            );
+            CREATE INDEX IF NOT EXISTS idx_literature_md ON literature(md_file_path);
+            CREATE INDEX IF NOT EXISTS idx_literature_hash ON literature(content_hash);
+            CREATE TABLE IF NOT EXISTS extractions (
+                md_file_path TEXT NOT NULL,
+                schema_name TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                result TEXT NOT NULL,
+                extracted_at REAL NOT NULL,
+                PRIMARY KEY (md_file_path, schema_name)
+            );
+            CREATE TABLE IF NOT EXISTS signatures (
+                md_file_path TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                registry_key TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_signatures_registry ON signatures(registry_key);
+            CREATE TABLE IF NOT EXISTS registry_ids (
+                registry_id TEXT NOT NULL,
+                md_file_path TEXT NOT NULL,
+                PRIMARY KEY (registry_id, md_file_path)
+            );
+            CREATE INDEX IF NOT EXISTS idx_registry_ids_md ON registry_ids(md_file_path);
+            CREATE TABLE IF NOT EXISTS signature_bands (
+                band INTEGER NOT NULL,
+                bucket TEXT NOT NULL,
+                md_file_path TEXT NOT NULL,
+                PRIMARY KEY (band, bucket, md_file_path)
+            );
+            CREATE INDEX IF NOT EXISTS idx_signature_bands_md ON signature_bands(md_file_path);
+            CREATE TABLE IF NOT EXISTS search_docs (
+                doc_id INTEGER PRIMARY KEY,
+                md_file_path TEXT NOT NULL UNIQUE
+            );
+        """)
+        # 全文索引的rowid为search_docs.doc_id，SQLite未编译FTS5时全文检索不可用
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(tokens, tokenize = 'unicode61')"
+            )
+            self.search_enabled = True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite不支持FTS5，全文检索不可用: {str(e)}")
+            self.search_enabled = False
+        if 'signatures' in tables and 'registry_ids' not in tables:
+            # 旧版目录的注册号按旧规则提取且没有逐个注册号的索引，清除签名后下次更新时重新计算
+            self._conn.execute("DELETE FROM signatures")
+            self._conn.execute("DELETE FROM signature_bands")
+            logger.info("文献目录的注册号索引已升级，下次更新目录时重新计算签名")
+        self._conn.commit()
+
+    @staticmethod
+    def md_path_for(folder_path, literature_name):
+        """MinerU输出的MD文件路径约定: 文献文件夹/auto/文献名.md"""
+        return os.path.join(folder_path, 'auto', f'{literature_name}.md')
+
+    def refresh(self):
+        """增量重建目录：只重新读取新增或mtime/大小变化的MD文件，并删除已不存在的文献"""
+        with self._refresh_lock:
+            start_time = time.time()
+            stats = {'scanned': 0, 'updated': 0, 'removed': 0, 'missing_md': 0}
+
+            with self._lock:
+                existing = {
+                    (row['section_name'], row['literature_name']): row
+                    for row in self._conn.execute(
+                        "SELECT l.section_name, l.literature_name, l.md_mtime_ns, l.md_size, "
+                        "s.md_file_path IS NOT NULL AND d.md_file_path IS NOT NULL AS indexed "
+                        "FROM literature l LEFT JOIN signatures s ON s.md_file_path = l.md_file_path "
+                        "LEFT JOIN search_docs d ON d.md_file_path = l.md_file_path"
+                    )
+                }
+
+            seen = set()
+            for section_name, section_path in self.section_paths.items():
+                try:
+                    with os.scandir(section_path) as it:
+                        folders = [(entry.name, entry.path) for entry in it if entry.is_dir()]
+                except (FileNotFoundError, NotADirectoryError, PermissionError) as e:
+                    # 目录暂时不可访问（如网络驱动器断开）时保留已有条目
+                    logger.warning(f"无法扫描目录 {section_path}: {str(e)}")
+                    seen.update(key for key in existing if key[0] == section_name)
+                    continue
+
+                for literature_name, folder_path in folders:
+                    key = (section_name, literature_name)
+                    seen.add(key)
+                    stats['scanned'] += 1
+                    if self._refresh_entry(section_name, literature_name, folder_path, existing.get(key)):
+                        stats['updated'] += 1
+                        if stats['updated'] % COMMIT_BATCH == 0:
+                            with self._lock:
+                                self._conn.commit()
+
+            removed = [key for key in existing if key not in seen]
+            with self._lock:
+                self._conn.executemany(
+                    "DELETE FROM literature WHERE section_name = ? AND literature_name = ?", removed
+                )
+                orphaned = "md_file_path NOT IN (SELECT md_file_path FROM literature WHERE md_file_path IS NOT NULL)"
+                if self.search_enabled:
+                    self._conn.execute(
+                        f"DELETE FROM search_index WHERE rowid IN (SELECT doc_id FROM search_docs WHERE {orphaned})"
+                    )
+                for table in ('signatures', 'signature_bands', 'registry_ids', 'search_docs'):
+                    self._conn.execute(f"DELETE FROM {table} WHERE {orphaned}")
+                stats['missing_md'] = self._conn.execute(
+                    "SELECT COUNT(*) FROM literature WHERE md_file_path IS NULL"
+                ).fetchone()[0]
+                if self.search_enabled and stats['updated'] >= SEARCH_OPTIMIZE_THRESHOLD:
+                    self._conn.execute("INSERT INTO search_index(search_index) VALUES('optimize')")
+                self._conn.commit()
+            stats['removed'] = len(removed)
+
+            self.last_refresh = time.time()
+            stats['elapsed_ms'] = round((self.last_refresh - start_time) * 1000, 1)
+            logger.info(f"文献目录更新完成: {stats}")
+            return stats
+
+    def _refresh_entry(self, section_name, literature_name, folder_path, existing):
+        """更新单个文献条目，返回是否有变化"""
+        md_file_path = self.md_path_for(folder_path, literature_name)
+        try:
+            stat = os.stat(md_file_path)
+        except OSError:
+            stat = None
+
+        signature = None
+        if stat is None:
+            if existing is not None and existing['md_mtime_ns'] is None:
+                return False
+            values = (folder_path, None, None, None, None, None)
+        else:
+            # 未变化且已有签名和全文索引的条目跳过；旧版本目录中缺少的部分在此补建
+            if existing is not None and existing['md_mtime_ns'] == stat.st_mtime_ns \
+                    and existing['md_size'] == stat.st_size and existing['indexed']:
+                return False
+            try:
+                with open(md_file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+            except (OSError, UnicodeDecodeError) as e:
+                logger.warning(f"读取MD文件失败 {md_file_path}: {str(e)}")
+                return False
+            values = (
+                folder_path, md_file_path, stat.st_mtime_ns, stat.st_size,
+                estimate_tokens(content), hashlib.sha256(content.encode('utf-8')).hexdigest()
+            )
+            # MinHash签名和全文索引共用同一份分词结果
+            tokens = tokenize(content)
+            signature = (token_signature(tokens), registry_key(content))
+            tokens = index_text(tokens)
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO literature (section_name, literature_name, folder_path, md_file_path, md_mtime_ns, "
+                "md_size, estimated_tokens, content_hash, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(section_name, literature_name) DO UPDATE SET folder_path = excluded.folder_path, "
+                "md_file_path = excluded.md_file_path, md_mtime_ns = excluded.md_mtime_ns, "
+                "md_size = excluded.md_size, estimated_tokens = excluded.estimated_tokens, "
+                "content_hash = excluded.content_hash, indexed_at = excluded.indexed_at",
+                (section_name, literature_name, *values, time.time())
+            )
+            self._conn.execute("DELETE FROM signature_bands WHERE md_file_path = ?", (md_file_path,))
+            self._conn.execute("DELETE FROM registry_ids WHERE md_file_path = ?", (md_file_path,))
+            doc = self._conn.execute(
+                "SELECT doc_id FROM search_docs WHERE md_file_path = ?", (md_file_path,)
+            ).fetchone()
+            if doc is not None and self.search_enabled:
+                self._conn.execute("DELETE FROM search_index WHERE rowid = ?", (doc['doc_id'],))
+            if signature is None:
+                self._conn.execute("DELETE FROM signatures WHERE md_file_path = ?", (md_file_path,))
+                self._conn.execute("DELETE FROM search_docs WHERE md_file_path = ?", (md_file_path,))
+            else:
+                doc_id = doc['doc_id'] if doc is not None else self._conn.execute(
+                    "INSERT INTO search_docs (md_file_path) VALUES (?)", (md_file_path,)
+                ).lastrowid
+                if self.search_enabled:
+                    self._conn.execute("INSERT INTO search_index (rowid, tokens) VALUES (?, ?)", (doc_id, tokens))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO signatures (md_file_path, content_hash, signature, registry_key) "
+                    "VALUES (?, ?, ?, ?)",
+                    (md_file_path, values[5], pack_signature(signature[0]), signature[1])
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO signature_bands (band, bucket, md_file_path) VALUES (?, ?, ?)",
+                    [(band, bucket, md_file_path) for band, bucket in band_keys(signature[0])]
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO registry_ids (registry_id, md_file_path) VALUES (?, ?)",
+                    [(registry_id, md_file_path) for registry_id in registry_ids(signature[1])]
+                )
+        # 由 refresh 按批提交
+        return True
+
+    def resolve_md_path(self, section_name, literature_name):
+        """从目录中查找文献的MD文件路径，未收录时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT md_file_path FROM literature WHERE section_name = ? AND literature_name = ?",
+                (section_name, literature_name)
+            ).fetchone()
+        return row['md_file_path'] if row else None
+
+    def get_entry(self, section_name, literature_name):
+        """获取单个文献条目"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM literature WHERE section_name = ? AND literature_name = ?",
+                (section_name, literature_name)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def list_entries(self, section_name=None, query=None, has_md=None, extracted=None, offset=0, limit=50):
+        """分页筛选目录条目，返回 (总数, 条目列表)"""
+        conditions = []
+        params = []
+        if section_name:
+            conditions.append("section_name = ?")
+            params.append(section_name)
+        if query:
+            conditions.append("literature_name LIKE ?")
+            params.append(f"%{query}%")
+        if has_md is not None:
+            conditions.append("md_file_path IS NOT NULL" if has_md else "md_file_path IS NULL")
+        if extracted is not None:
+            conditions.append("last_extracted_at IS NOT NULL" if extracted else "last_extracted_at IS NULL")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM literature {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT * FROM literature {where} ORDER BY section_name, literature_name LIMIT ? OFFSET ?",
+                (*params, limit, offset)
+            ).fetchall()
+        return total, [dict(row) for row in rows]
+
+    def summary(self):
+        """按区域汇总文献数量、MD总大小和估算token数"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT section_name, COUNT(*) AS literature_count, COUNT(md_file_path) AS md_count, "
+                "COALESCE(SUM(md_size), 0) AS total_bytes, COALESCE(SUM(estimated_tokens), 0) AS total_tokens, "
+                "COUNT(last_extracted_at) AS extracted_count FROM literature GROUP BY section_name"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def record_extraction(self, md_file_path, schema_name, content_hash, result):
+        """保存提取结果并更新文献的最近提取时间"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions (md_file_path, schema_name, content_hash, result, extracted_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (md_file_path, schema_name, content_hash, json.dumps(result, ensure_ascii=False), now)
+            )
+            self._conn.execute(
+                "UPDATE literature SET last_extracted_at = ? WHERE md_file_path = ?", (now, md_file_path)
+            )
+            self._conn.commit()
+
+    def iter_extractions(self, schema_name, batch_size=200):
+        """按MD文件路径顺序逐批读取某个schema的全部提取结果，附带文献类型和名称
+
+        每批单独查询，读取期间不长时间持有锁，内存占用与结果总数无关
+        """
+        last_path = ''
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT e.md_file_path, e.result, e.extracted_at, l.section_name, l.literature_name "
+                    "FROM extractions e LEFT JOIN literature l ON l.md_file_path = e.md_file_path "
+                    "WHERE e.schema_name = ? AND e.md_file_path > ? ORDER BY e.md_file_path LIMIT ?",
+                    (schema_name, last_path, batch_size)
+                ).fetchall()
+            for row in rows:
+                result = json.loads(row['result'])
+                result['md_file_path'] = row['md_file_path']
+                result['section_name'] = row['section_name']
+                result['literature_name'] = row['literature_name'] or \
+                    os.path.splitext(os.path.basename(row['md_file_path']))[0]
+                result['extracted_at'] = row['extracted_at']
+                yield result
+            if len(rows) < batch_size:
+                return
+            last_path = rows[-1]['md_file_path']
+
+    def pending_extractions(self, section_name, schema_names):
+        """列出区域中当前MD内容缺少任一schema提取结果的文献（从未提取或MD内容已变化）"""
+        placeholders = ', '.join('?' for _ in schema_names)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT section_name, literature_name, md_file_path, content_hash, estimated_tokens, indexed_at "
+                "FROM literature l WHERE section_name = ? AND md_file_path IS NOT NULL AND "
+                "(SELECT COUNT(*) FROM extractions e WHERE e.md_file_path = l.md_file_path "
+                f"AND e.content_hash = l.content_hash AND e.schema_name IN ({placeholders})) < ?",
+                (section_name, *schema_names, len(schema_names))
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_extraction(self, md_file_path, schema_name):
+        """获取文献最近一次的提取结果，不存在时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM extractions WHERE md_file_path = ? AND schema_name = ?",
+                (md_file_path, schema_name)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'content_hash': row['content_hash'],
+            'extracted_at': row['extracted_at'],
+            'result': json.loads(row['result'])
+        }
+
+    def get_signature(self, md_file_path):
+        """获取文献的 (内容哈希, MinHash签名, 注册号)，未收录时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, signature, registry_key FROM signatures WHERE md_file_path = ?",
+                (md_file_path,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row['content_hash'], unpack_signature(row['signature']), row['registry_key']
+
+    def _load_signatures(self, md_file_paths):
+        """批量读取签名和文献信息，返回 {MD文件路径: 行}"""
+        rows = {}
+        paths = list(md_file_paths)
+        for start in range(0, len(paths), 500):
+            batch = paths[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            with self._lock:
+                for row in self._conn.execute(
+                    "SELECT s.md_file_path, s.signature, s.registry_key, l.section_name, l.literature_name "
+                    "FROM signatures s LEFT JOIN literature l ON l.md_file_path = s.md_file_path "
+                    f"WHERE s.md_file_path IN ({placeholders})", batch
+                ):
+                    rows[row['md_file_path']] = row
+        return rows
+
+    def find_duplicates(self, signature, registry, threshold, exclude=None):
+        """查找与给定签名近似重复的文献
+
+        LSH任一分段相同的文献为候选，按签名估算的相似度不低于 threshold 时视为重复；
+        有共同注册号的文献（如中英文版本，其中一篇另外引用了其他注册号也算）无论文本相似度都视为重复。
+        按相似度从高到低返回
+        """
+        keys = band_keys(signature)
+        ids = registry_ids(registry)
+        candidates = set()
+        with self._lock:
+            if keys:
+                conditions = ' OR '.join(['(band = ? AND bucket = ?)'] * len(keys))
+                candidates.update(
+                    row[0] for row in self._conn.execute(
+                        f"SELECT DISTINCT md_file_path FROM signature_bands WHERE {conditions}",
+                        [value for key in keys for value in key]
+                    )
+                )
+            if ids:
+                placeholders = ','.join('?' * len(ids))
+                candidates.update(
+                    row[0] for row in self._conn.execute(
+                        f"SELECT DISTINCT md_file_path FROM registry_ids WHERE registry_id IN ({placeholders})",
+                        sorted(ids)
+                    )
+                )
+        candidates.discard(exclude)
+
+        duplicates = []
+        for md_file_path, row in self._load_signatures(candidates).items():
+            similarity = signature_similarity(signature, unpack_signature(row['signature']))
+            same_registry = bool(ids & registry_ids(row['registry_key']))
+            if similarity < threshold and not same_registry:
+                continue
+            duplicates.append({
+                'md_file_path': md_file_path,
+                'section_name': row['section_name'],
+                'literature_name': row['literature_name'],
+                'similarity': round(similarity, 3),
+                'reason': 'text' if similarity >= threshold else 'registry_id'
+            })
+        duplicates.sort(key=lambda item: (-item['similarity'], item['md_file_path']))
+        return duplicates
+
+    def duplicate_clusters(self, threshold, section_name=None, max_bucket_pairs=50):
+        """列出全部近似重复文献簇
+
+        同一LSH分段桶内的文献两两比较（桶过大时只比较相邻文献），有共同注册号的文献直接归为一簇，
+        用并查集合并为簇。返回按簇大小排序的 [{'size', 'max_similarity', 'min_similarity', 'members'}]
+        """
+        with self._lock:
+            groups = [
+                row[0].split('\x1f') for row in self._conn.execute(
+                    "SELECT GROUP_CONCAT(md_file_path, char(31)) FROM signature_bands "
+                    "GROUP BY band, bucket HAVING COUNT(*) > 1"
+                )
+            ]
+            registry_groups = [
+                row[0].split('\x1f') for row in self._conn.execute(
+                    "SELECT GROUP_CONCAT(md_file_path, char(31)) FROM registry_ids "
+                    "GROUP BY registry_id HAVING COUNT(*) > 1"
+                )
+            ]
+
+        pairs = set()
+        for members in groups:
+            members.sort()
+            if len(members) <= max_bucket_pairs:
+                pairs.update((a, b) for i, a in enumerate(members) for b in members[i + 1:])
+            else:
+                pairs.update(zip(members, members[1:]))
+        registry_pairs = set()
+        for members in registry_groups:
+            members.sort()
+            registry_pairs.update((members[0], other) for other in members[1:])
+
+        rows = self._load_signatures({path for pair in pairs | registry_pairs for path in pair})
+        signatures = {path: unpack_signature(row['signature']) for path, row in rows.items()}
+
+        parent = {}
+
+        def find(path):
+            parent.setdefault(path, path)
+            while parent[path] != path:
+                parent[path] = parent[parent[path]]
+                path = parent[path]
+            return path
+
+        edges = []
+        for a, b in pairs | registry_pairs:
+            if a not in signatures or b not in signatures:
+                continue
+            similarity = signature_similarity(signatures[a], signatures[b])
+            if similarity >= threshold or (a, b) in registry_pairs:
+                parent[find(a)] = find(b)
+                edges.append((a, b, similarity))
+
+        clusters = {}
+        for a, b, similarity in edges:
+            cluster = clusters.setdefault(find(a), {'members': set(), 'similarities': []})
+            cluster['members'].update((a, b))
+            cluster['similarities'].append(similarity)
+
+        results = []
+        for cluster in clusters.values():
+            members = sorted(cluster['members'])
+            if section_name and not any(rows[path]['section_name'] == section_name for path in members):
+                continue
+            results.append({
+                'size': len(members),
+                'max_similarity': round(max(cluster['similarities']), 3),
+                'min_similarity': round(min(cluster['similarities']), 3),
+                'members': [
+                    {
+                        'md_file_path': path,
+                        'section_name': rows[path]['section_name'],
+                        'literature_name': rows[path]['literature_name']
+                    }
+                    for path in members
+                ]
+            })
+        results.sort(key=lambda cluster: (-cluster['size'], -cluster['max_similarity']))
+        return results
+
+    def search(self, query, section_name=None, offset=0, limit=20):
+        """全文检索MD内容，按BM25相关度排序
+
+        返回 (总数, [{'section_name', 'literature_name', 'md_file_path', 'score'}], 检索词列表)；
+        没有有效检索词时抛出 ValueError，SQLite不支持FTS5时抛出 SearchUnavailableError
+        """
+        match_query, terms = build_match_query(query)
+        if match_query is None:
+            raise ValueError('没有有效的检索词')
+        if not self.search_enabled:
+            raise SearchUnavailableError('全文检索不可用：SQLite不支持FTS5')
+
+        section_filter = "AND l.section_name = ?" if section_name else ''
+        params = [match_query] + ([section_name] if section_name else [])
+        with self._lock:
+            if section_name:
+                total = self._conn.execute(
+                    "SELECT COUNT(*) FROM search_index JOIN search_docs d ON d.doc_id = search_index.rowid "
+                    "JOIN literature l ON l.md_file_path = d.md_file_path "
+                    f"WHERE search_index MATCH ? {section_filter}", params
+                ).fetchone()[0]
+            else:
+                # 目录更新时会清理已删除文献的索引，不按区域筛选时无需关联文献表
+                total = self._conn.execute(
+                    "SELECT COUNT(*) FROM search_index WHERE search_index MATCH ?", params
+                ).fetchone()[0]
+            rows = self._conn.execute(
+                "SELECT l.section_name, l.literature_name, d.md_file_path, bm25(search_index) AS score "
+                "FROM search_index JOIN search_docs d ON d.doc_id = search_index.rowid "
+                "JOIN literature l ON l.md_file_path = d.md_file_path "
+                f"WHERE search_index MATCH ? {section_filter} ORDER BY score LIMIT ? OFFSET ?",
+                (*params, limit, offset)
+            ).fetchall()
+        # bm25() 越小越相关，返回时取相反数
+        return total, [dict(row, score=round(-row['score'], 4)) for row in rows], terms
@@ -0,0 +1,131 @@
+import re
+
+# MinerU输出的Markdown标题行
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.*)$')
+
+# 中日韩字符，按每字约1个token估算
+CJK_PATTERN = re.compile(r'[　-〿㐀-䶿一-鿿＀-￯]')
+
+# 表示字段缺失的取值，合并时视为空
+EMPTY_VALUES = ('', '未提及', '信息不明确')
+
+def estimate_tokens(text):
+    """粗略估算文本的token数：中文每字约1个token，其他字符约4个字符1个token"""
+    cjk_count = len(CJK_PATTERN.findall(text))
+    return cjk_count + (len(text) - cjk_count + 3) // 4
+
+def split_sections(content):
+    """按Markdown标题切分章节，返回 [{'heading': 标题, 'text': 章节全文}]
+
+    第一个标题之前的内容作为标题为空的章节
+    """
+    sections = []
+    heading = ''
+    lines = []
+    for line in content.splitlines(keepends=True):
+        match = HEADING_PATTERN.match(line.strip())
+        if match:
+            if lines:
+                sections.append({'heading': heading, 'text': ''.join(lines)})
+            heading = match.group(2).strip()
+            lines = [line]
+        else:
+            lines.append(line)
+    if lines:
+        sections.append({'heading': heading, 'text': ''.join(lines)})
+    return sections
+
+def _split_oversized(text, max_tokens):
+    """将超出预算的章节按段落、行、字符逐级切分"""
+    pieces = []
+    for separator in ('\n\n', '\n'):
+        parts = text.split(separator)
+        if len(parts) > 1 and all(estimate_tokens(part) <= max_tokens for part in parts):
+            current = ''
+            for part in parts:
+                candidate = current + separator + part if current else part
+                if current and estimate_tokens(candidate) > max_tokens:
+                    pieces.append(current)
+                    current = part
+                else:
+                    current = candidate
+            if current:
+                pieces.append(current)
+            return pieces
+
+    # 单行仍超出预算时按字符硬切分，按最坏情况每字符1个token
+    return [text[i:i + max_tokens] for i in range(0, len(text), max_tokens)]
+
+def chunk_markdown(content, max_tokens):
+    """按章节将Markdown切分为不超过token预算的片段
+
+    相邻的小章节会合并到同一片段，返回 [{'index', 'headings', 'text', 'tokens'}]
+    """
+    chunks = []
+    current_text = ''
+    current_headings = []
+
+    def flush():
+        if current_text.strip():
+            chunks.append({
+                'index': len(chunks),
+                'headings': list(current_headings),
+                'text': current_text,
+                'tokens': estimate_tokens(current_text)
+            })
+
+    for section in split_sections(content):
+        section_tokens = estimate_tokens(section['text'])
+        if section_tokens > max_tokens:
+            flush()
+            current_text, current_headings = '', []
+            for piece in _split_oversized(section['text'], max_tokens):
+                current_text, current_headings = piece, [section['heading']]
+                flush()
+            current_text, current_headings = '', []
+            continue
+
+        if current_text and estimate_tokens(current_text) + section_tokens > max_tokens:
+            flush()
+            current_text, current_headings = '', []
+        current_text += section['text']
+        current_headings.append(section['heading'])
+
+    flush()
+    return chunks
+
+def merge_partial_results(partials, schema):
+    """按片段顺序确定性地合并各片段的提取结果
+
+    对每个字段：忽略空值和"未提及"类取值，保留各片段中不重复的取值并按片段顺序拼接；
+    所有片段都没有取值时返回"未提及"。返回 (合并结果, {字段路径: [来源片段序号]})
+    """
+    field_sources = {}
+
+    def merge(values_by_chunk, sub_schema, path):
+        merged = {}
+        for field, field_schema in sub_schema['properties'].items():
+            field_path = f"{path}.{field}" if path else field
+            if field_schema.get('type') == 'object':
+                merged[field] = merge(
+                    [(index, (value or {}).get(field) or {}) for index, value in values_by_chunk],
+                    field_schema, field_path
+                )
+                continue
+
+            distinct = []
+            sources = []
+            for index, value in values_by_chunk:
+                text = str((value or {}).get(field, '')).strip()
+                if text in EMPTY_VALUES:
+                    continue
+                sources.append(index)
+                if text not in distinct:
+                    distinct.append(text)
+
+            merged[field] = '\n'.join(distinct) if distinct else '未提及'
+            field_sources[field_path] = sources
+        return merged
+
+    merged = merge(list(enumerate(partials)), schema, '')
+    return merged, field_sources
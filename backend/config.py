@@ -4,7 +4,10 @@ import os
 class Config:
     def __init__(self):
         self.config = configparser.ConfigParser()
-        config_path = os.path.join(os.path.dirname(__file__), '.provider_env')
+        # 可通过环境变量指定其他配置文件（如本地模拟服务的配置）
+        config_path = os.environ.get(
+            'NOAHPHARM_PROVIDER_ENV', os.path.join(os.path.dirname(__file__), '.provider_env')
+        )
         self.config.read(config_path, encoding='utf-8')
     
     def get_llm_config(self, provider='YUNWU-OPENAI'):
@@ -16,5 +19,46 @@ class Config:
             'api_key': self.config[provider]['api_key'],
             'base_url': self.config[provider]['base_url']
         }
+    
+    def get_setting(self, key, default=None, cast=str):
+        """获取服务运行参数
+
+        优先读取环境变量 NOAHPHARM_<KEY>，其次读取配置文件中的 [SERVICE] 段，
+        都未配置时返回默认值
+        """
+        value = os.environ.get(f'NOAHPHARM_{key.upper()}')
+        if value is None and self.config.has_option('SERVICE', key):
+            value = self.config.get('SERVICE', key)
+        if value is None:
+            return default
+        
+        return self._cast(key, value, cast)
+    
+    def get_provider_setting(self, provider, key, default=None, cast=str):
+        """获取服务商级别的参数，服务商配置段中未设置时回退到全局运行参数"""
+        if provider in self.config and self.config.has_option(provider, key):
+            return self._cast(f"{provider}.{key}", self.config.get(provider, key), cast)
+        return self.get_setting(key, default, cast)
+    
+    @staticmethod
+    def _cast(name, value, cast):
+        """按类型转换配置值，布尔值只接受 1/true/yes/on 和 0/false/no/off（不区分大小写）"""
+        if cast is bool:
+            normalized = value.strip().lower()
+            if normalized in ('1', 'true', 'yes', 'on'):
+                return True
+            if normalized in ('0', 'false', 'no', 'off', ''):
+                return False
+            raise ValueError(f"配置项 {name} 的值无效: {value}")
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"配置项 {name} 的值无效: {value}")
+    
+    def get_data_dir(self):
+        """获取本地数据目录，用于存放缓存等持久化文件"""
+        data_dir = self.get_setting('data_dir', os.path.join(os.path.dirname(__file__), 'data'))
+        os.makedirs(data_dir, exist_ok=True)
+        return data_dir
 
 config = Config() 
\ No newline at end of file
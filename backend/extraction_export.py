@@ -0,0 +1,182 @@
+import csv
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from summary_export import StreamBuffer
+
+CSV_MIMETYPE = 'text/csv; charset=utf-8'
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# 每输出多少行向客户端刷新一次
+FLUSH_ROWS = 100
+
+# Excel单元格最多容纳的字符数
+XLSX_CELL_MAX_CHARS = 32767
+
+# XML 1.0 不允许的控制字符
+ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+def export_columns(schema):
+    """根据提取Schema生成导出列 [(字段路径, 列标题)]，嵌套字段以 . 连接，列标题取字段描述"""
+    columns = [('section_name', '文献类型'), ('literature_name', '文献名称')]
+
+    def walk(properties, prefix):
+        for field, sub_schema in properties.items():
+            path = f"{prefix}{field}"
+            if sub_schema.get('type') == 'object':
+                walk(sub_schema.get('properties', {}), f"{path}.")
+            else:
+                columns.append((path, sub_schema.get('description', field)))
+
+    walk(schema.get('properties', {}), '')
+    columns.append(('md_file_path', 'MD文件路径'))
+    return columns
+
+def row_values(result, columns):
+    """按导出列取出一条提取结果的取值"""
+    values = []
+    for path, _ in columns:
+        value = result
+        for key in path.split('.'):
+            value = value.get(key) if isinstance(value, dict) else None
+        if value is None:
+            value = ''
+        elif isinstance(value, list):
+            value = '；'.join(str(item) for item in value)
+        values.append(str(value))
+    return values
+
+def iter_csv(results, columns):
+    """逐行生成CSV，带UTF-8 BOM以便Excel正确识别中文"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow([label for _, label in columns])
+
+    for count, result in enumerate(results, start=1):
+        writer.writerow(row_values(result, columns))
+        if count % FLUSH_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+def column_letter(index):
+    """列序号（从0开始）转换为Excel列字母"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+def xlsx_row(row_number, values, style=0):
+    """生成一行工作表XML，字符串使用内联形式，无需共享字符串表"""
+    cells = []
+    style_attr = f' s="{style}"' if style else ''
+    for index, value in enumerate(values):
+        text = escape(ILLEGAL_XML_CHARS.sub('', value)[:XLSX_CELL_MAX_CHARS])
+        cells.append(
+            f'<c r="{column_letter(index)}{row_number}" t="inlineStr"{style_attr}>'
+            f'<is><t xml:space="preserve">{text}</t></is></c>'
+        )
+    return f'<row r="{row_number}">{"".join(cells)}</row>'
+
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# 样式1为加粗表头
+XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+def xlsx_workbook(sheet_name):
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(sheet_name)}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+def xlsx_sheet_name(name):
+    """工作表名称最长31个字符，且不能包含 []:*?/\\"""
+    return re.sub(r'[\[\]:*?/\\]', '_', name)[:31] or 'Sheet1'
+
+def iter_xlsx(results, columns, sheet_name):
+    """逐行生成XLSX
+
+    工作表XML边生成边写入ZIP并输出已压缩的字节块，不构建完整工作簿，
+    内存占用与行数无关
+    """
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', XLSX_CONTENT_TYPES)
+        archive.writestr('_rels/.rels', XLSX_ROOT_RELS)
+        archive.writestr('xl/workbook.xml', xlsx_workbook(xlsx_sheet_name(sheet_name)))
+        archive.writestr('xl/_rels/workbook.xml.rels', XLSX_WORKBOOK_RELS)
+        archive.writestr('xl/styles.xml', XLSX_STYLES)
+        yield buffer.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                '<sheetViews><sheetView workbookViewId="0">'
+                '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+                '</sheetView></sheetViews><sheetData>'
+            ).encode('utf-8'))
+            sheet.write(xlsx_row(1, [label for _, label in columns], style=1).encode('utf-8'))
+
+            for row_number, result in enumerate(results, start=2):
+                sheet.write(xlsx_row(row_number, row_values(result, columns)).encode('utf-8'))
+                if row_number % FLUSH_ROWS == 0:
+                    yield buffer.drain()
+            sheet.write('</sheetData></worksheet>'.encode('utf-8'))
+        yield buffer.drain()
+    yield buffer.drain()
@@ -0,0 +1,61 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class FolderListingCache:
+    """子文件夹列表的进程内缓存
+
+    以目录自身的mtime判断是否失效：目录下新增、删除或重命名条目都会更新目录mtime，
+    命中时只需一次stat。ttl大于0时，超过ttl秒的条目即使mtime未变也会重新扫描，
+    用于mtime不可靠的网络驱动器
+    """
+
+    def __init__(self, ttl=0):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def list_subfolders(self, folder_path):
+        """返回排序后的子文件夹名称列表
+
+        路径不存在时抛出FileNotFoundError，不是目录时抛出NotADirectoryError
+        """
+        mtime_ns = os.stat(folder_path).st_mtime_ns
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(folder_path)
+            if entry and entry['mtime_ns'] == mtime_ns and (not self.ttl or now - entry['scanned_at'] < self.ttl):
+                self.hits += 1
+                return entry['subfolders']
+            self.misses += 1
+
+        with os.scandir(folder_path) as it:
+            subfolders = sorted(item.name for item in it if item.is_dir())
+
+        with self._lock:
+            self._entries[folder_path] = {'mtime_ns': mtime_ns, 'scanned_at': now, 'subfolders': subfolders}
+        return subfolders
+
+    def invalidate(self, folder_path=None):
+        """清除指定路径或全部缓存"""
+        with self._lock:
+            if folder_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(folder_path, None)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+def compute_etag(data):
+    """根据返回数据计算ETag"""
+    payload = json.dumps(data, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
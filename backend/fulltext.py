@@ -0,0 +1,74 @@
+import html
+import re
+
+from passage_selection import tokenize
+
+# 检索结果摘要的长度（字符数）
+SNIPPET_CHARS = 120
+
+def index_text(tokens):
+    """全文索引使用的分词文本：中文按字二元组、英文按单词（即 tokenize 的结果），
+    以空格分隔后交给FTS5的unicode61分词器"""
+    return ' '.join(tokens)
+
+def build_match_query(query):
+    """将用户输入转换为FTS5查询：空格分隔的各个词都需命中，每个词按索引时的分词方式组成短语
+
+    单个中文字无法组成二元组，按前缀匹配。返回 (FTS5查询, 检索词列表)，没有有效检索词时查询为None
+    """
+    phrases = []
+    terms = []
+    for term in query.split():
+        tokens = tokenize(term)
+        if not tokens:
+            continue
+        terms.append(term)
+        if len(tokens) == 1 and len(tokens[0]) == 1 and not tokens[0].isascii():
+            phrases.append(f'"{tokens[0]}"*')
+        else:
+            phrases.append('"' + ' '.join(tokens) + '"')
+    return (' AND '.join(phrases) if phrases else None), terms
+
+def make_snippet(content, terms, width=SNIPPET_CHARS):
+    """从原文中截取包含检索词最多的片段，检索词以 <mark> 标出，其余内容已做HTML转义"""
+    text = re.sub(r'\s+', ' ', content)
+    lowered = text.lower()
+    patterns = [term.lower() for term in terms if term]
+    positions = [
+        (match.start(), index)
+        for index, term in enumerate(patterns)
+        for match in re.finditer(re.escape(term), lowered)
+    ]
+
+    start = 0
+    if positions:
+        # 常见词出现次数很多时只考察前面的出现位置
+        positions = sorted(positions)[:200]
+        best = -1
+        for position, _ in positions:
+            window_start = max(0, position - width // 3)
+            covered = {
+                index for other, index in positions
+                if window_start <= other < window_start + width - len(patterns[index])
+            }
+            if len(covered) > best:
+                best, start = len(covered), window_start
+    window = text[start:start + width]
+
+    if patterns:
+        marker = re.compile('|'.join(re.escape(term) for term in sorted(patterns, key=len, reverse=True)),
+                            re.IGNORECASE)
+        parts = []
+        last = 0
+        for match in marker.finditer(window):
+            parts.append(html.escape(window[last:match.start()]))
+            parts.append(f"<mark>{html.escape(match.group(0))}</mark>")
+            last = match.end()
+        parts.append(html.escape(window[last:]))
+        snippet = ''.join(parts)
+    else:
+        snippet = html.escape(window)
+
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + width < len(text) else ''
+    return f"{prefix}{snippet.strip()}{suffix}"
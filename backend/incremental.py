@@ -0,0 +1,54 @@
+import hashlib
+import re
+
+from chunking import split_sections
+from passage_selection import BM25Index, iter_field_queries
+
+def section_fingerprint(section):
+    """章节指纹：忽略空白差异，重新OCR只改变换行和空格时指纹不变"""
+    text = re.sub(r'\s+', ' ', section['text']).strip()
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+def section_map(content, schema, top_k=3):
+    """计算文献各章节的指纹，并用BM25为schema中每个字段找出支撑章节
+
+    返回 {'fingerprints': [章节指纹], 'fields': {字段路径: [支撑章节指纹]}}
+    """
+    sections = split_sections(content)
+    fingerprints = [section_fingerprint(section) for section in sections]
+    index = BM25Index([section['text'] for section in sections])
+    fields = {
+        field_path: sorted({fingerprints[i] for i in index.search(query, top_k)})
+        for field_path, query in iter_field_queries(schema)
+    }
+    return {'fingerprints': fingerprints, 'fields': fields}
+
+def stale_fields(previous, current):
+    """比较前后两次的章节指纹，返回 (需要重新提取的字段, 删除或修改的章节数, 新增或修改的章节数)
+
+    字段原来的支撑章节被修改或删除，或修改后新增的章节成为其支撑章节时需要重新提取；
+    上次没有记录的字段（如schema新增字段）也重新提取
+    """
+    removed = set(previous['fingerprints']) - set(current['fingerprints'])
+    added = set(current['fingerprints']) - set(previous['fingerprints'])
+    stale = []
+    for field_path, support in current['fields'].items():
+        old_support = previous['fields'].get(field_path)
+        if old_support is None or removed.intersection(old_support) or added.intersection(support):
+            stale.append(field_path)
+    return stale, len(removed), len(added)
+
+def prefix_fields(sections, prefix):
+    """给章节映射中的字段路径加上前缀，用于组合合并提取的上次结果"""
+    return {f"{prefix}.{field_path}": support for field_path, support in sections['fields'].items()}
+
+def strip_prefix(sections, prefix):
+    """取出带指定前缀的字段并去掉前缀，用于拆分合并提取结果"""
+    start = len(prefix) + 1
+    return {
+        'fingerprints': sections['fingerprints'],
+        'fields': {
+            field_path[start:]: support
+            for field_path, support in sections['fields'].items() if field_path.startswith(f"{prefix}.")
+        }
+    }
@@ -0,0 +1,313 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# 文献条目状态
+ITEM_PENDING = 'pending'
+ITEM_RUNNING = 'running'
+ITEM_DONE = 'done'
+ITEM_ERROR = 'error'
+ITEM_SKIPPED = 'skipped'
+ITEM_CANCELLED = 'cancelled'
+ITEM_FINISHED_STATUSES = (ITEM_DONE, ITEM_ERROR, ITEM_SKIPPED, ITEM_CANCELLED)
+
+# 任务状态
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_CANCELLED = 'cancelled'
+
+class JobStore:
+    """基于SQLite的批量提取任务存储"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                options TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_items (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                item TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                started_at REAL,
+                finished_at REAL,
+                PRIMARY KEY (job_id, idx)
+            );
+            CREATE INDEX IF NOT EXISTS idx_job_items_status ON job_items(status);
+        """)
+        self._conn.commit()
+
+    def create_job(self, items, options=None):
+        """创建任务，返回任务ID"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, options, total, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, JOB_QUEUED, json.dumps(options or {}), len(items), now, now)
+            )
+            self._conn.executemany(
+                "INSERT INTO job_items (job_id, idx, item, status) VALUES (?, ?, ?, ?)",
+                [(job_id, idx, item, ITEM_PENDING) for idx, item in enumerate(items)]
+            )
+            self._conn.commit()
+        return job_id
+
+    def get_job(self, job_id):
+        """获取任务信息及各状态条目数量，任务不存在时返回None"""
+        with self._lock:
+            job = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            counts = self._conn.execute(
+                "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall()
+        return self._job_to_dict(job, {status: count for status, count in counts})
+
+    def list_jobs(self, limit=50):
+        """按创建时间倒序列出任务"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._job_to_dict(row) for row in rows]
+
+    def get_items(self, job_id, include_results=False):
+        """按原始顺序获取任务的所有条目"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM job_items WHERE job_id = ? ORDER BY idx", (job_id,)
+            ).fetchall()
+        items = []
+        for row in rows:
+            item = {
+                'index': row['idx'],
+                'item': row['item'],
+                'status': row['status'],
+                'error': row['error'],
+                'elapsed_ms': round((row['finished_at'] - row['started_at']) * 1000, 1)
+                if row['started_at'] and row['finished_at'] else None
+            }
+            if include_results:
+                item['result'] = json.loads(row['result']) if row['result'] else None
+            items.append(item)
+        return items
+
+    def iter_results(self, job_id, follow=False, poll_interval=1.0, batch_size=100):
+        """按提交顺序逐个输出已完成条目的结果
+
+        follow为真时遇到尚未完成的条目会等待，直到任务结束，可用于边处理边导出；
+        否则跳过未完成的条目。每批单独查询，内存占用与条目总数无关
+        """
+        next_idx = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT idx, status, result FROM job_items WHERE job_id = ? AND idx >= ? ORDER BY idx LIMIT ?",
+                    (job_id, next_idx, batch_size)
+                ).fetchall()
+                job = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if not rows:
+                return
+            
+            waiting = False
+            for row in rows:
+                if row['status'] in (ITEM_PENDING, ITEM_RUNNING):
+                    if follow and job is not None and job['status'] not in (JOB_COMPLETED, JOB_CANCELLED):
+                        waiting = True
+                        break
+                elif row['result']:
+                    yield json.loads(row['result'])
+                next_idx = row['idx'] + 1
+            if waiting:
+                time.sleep(poll_interval)
+
+    def get_options(self, job_id):
+        """获取任务的提交参数"""
+        with self._lock:
+            row = self._conn.execute("SELECT options FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row['options']) if row else {}
+
+    def claim_item(self, job_id, idx):
+        """将待处理条目标记为处理中，返回条目内容；已被处理或取消时返回None"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE job_items SET status = ?, started_at = ? WHERE job_id = ? AND idx = ? AND status = ?",
+                (ITEM_RUNNING, now, job_id, idx, ITEM_PENDING)
+            )
+            if cursor.rowcount == 0:
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (JOB_RUNNING, now, job_id, JOB_QUEUED)
+            )
+            row = self._conn.execute(
+                "SELECT item FROM job_items WHERE job_id = ? AND idx = ?", (job_id, idx)
+            ).fetchone()
+            self._conn.commit()
+        return row['item']
+
+    def finish_item(self, job_id, idx, status, result=None, error=None):
+        """记录条目处理结果，所有条目结束后将任务标记为完成"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_items SET status = ?, result = ?, error = ?, finished_at = ? WHERE job_id = ? AND idx = ?",
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None,
+                 error, now, job_id, idx)
+            )
+            self._conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (now, job_id))
+            self._complete_if_finished(job_id, now)
+            self._conn.commit()
+
+    def cancel_job(self, job_id):
+        """取消任务：未开始的条目标记为已取消，处理中的条目会在完成后保留结果"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status IN (?, ?)",
+                (JOB_CANCELLED, now, job_id, JOB_QUEUED, JOB_RUNNING)
+            )
+            if cursor.rowcount:
+                self._conn.execute(
+                    "UPDATE job_items SET status = ?, finished_at = ? WHERE job_id = ? AND status = ?",
+                    (ITEM_CANCELLED, now, job_id, ITEM_PENDING)
+                )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def reset_unfinished(self):
+        """服务重启后将中断的条目重置为待处理，返回需要重新入队的 (job_id, idx) 列表"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_items SET status = ?, started_at = NULL WHERE status = ? AND job_id IN "
+                "(SELECT id FROM jobs WHERE status != ?)",
+                (ITEM_PENDING, ITEM_RUNNING, JOB_CANCELLED)
+            )
+            rows = self._conn.execute(
+                "SELECT i.job_id, i.idx FROM job_items i JOIN jobs j ON i.job_id = j.id "
+                "WHERE i.status = ? AND j.status IN (?, ?) ORDER BY j.created_at, i.idx",
+                (ITEM_PENDING, JOB_QUEUED, JOB_RUNNING)
+            ).fetchall()
+            self._conn.commit()
+        return [(row['job_id'], row['idx']) for row in rows]
+
+    def _complete_if_finished(self, job_id, now):
+        """所有条目结束时更新任务状态（调用方需持有锁）"""
+        placeholders = ', '.join('?' for _ in ITEM_FINISHED_STATUSES)
+        remaining = self._conn.execute(
+            f"SELECT COUNT(*) FROM job_items WHERE job_id = ? AND status NOT IN ({placeholders})",
+            (job_id, *ITEM_FINISHED_STATUSES)
+        ).fetchone()[0]
+        if remaining == 0:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status != ?",
+                (JOB_COMPLETED, now, job_id, JOB_CANCELLED)
+            )
+
+    @staticmethod
+    def _job_to_dict(row, counts=None):
+        job = {
+            'job_id': row['id'],
+            'status': row['status'],
+            'total': row['total'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at']
+        }
+        if counts is not None:
+            job['progress'] = {
+                status: counts.get(status, 0)
+                for status in (ITEM_PENDING, ITEM_RUNNING) + ITEM_FINISHED_STATUSES
+            }
+            job['finished'] = sum(counts.get(status, 0) for status in ITEM_FINISHED_STATUSES)
+        return job
+
+class JobManager:
+    """批量提取任务的后台线程池
+
+    process_item(item, options) 负责单个文献的处理，返回None表示跳过，
+    返回包含error字段的字典表示处理失败
+    """
+
+    def __init__(self, store, process_item, max_workers=4):
+        self.store = store
+        self.process_item = process_item
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """启动线程池并恢复上次未完成的条目"""
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job-worker')
+
+        unfinished = self.store.reset_unfinished()
+        for job_id, idx in unfinished:
+            self._executor.submit(self._run_item, job_id, idx)
+        if unfinished:
+            logger.info(f"恢复 {len(unfinished)} 个未完成的任务条目")
+
+    def shutdown(self, wait=True):
+        """停止线程池，未处理的条目会在下次启动时恢复"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def submit(self, items, options=None):
+        """提交批量任务，返回任务ID"""
+        self.start()
+        job_id = self.store.create_job(items, options)
+        for idx in range(len(items)):
+            self._executor.submit(self._run_item, job_id, idx)
+        logger.info(f"已提交任务 {job_id}，共 {len(items)} 个条目")
+        return job_id
+
+    def cancel(self, job_id):
+        """取消任务"""
+        return self.store.cancel_job(job_id)
+
+    def _run_item(self, job_id, idx):
+        item = self.store.claim_item(job_id, idx)
+        if item is None:
+            return
+
+        try:
+            result = self.process_item(item, self.store.get_options(job_id))
+        except Exception as e:
+            logger.error(f"任务 {job_id} 处理条目 {item} 失败: {str(e)}")
+            self.store.finish_item(job_id, idx, ITEM_ERROR, error=str(e))
+            return
+
+        if result is None:
+            self.store.finish_item(job_id, idx, ITEM_SKIPPED)
+        elif 'error' in result:
+            self.store.finish_item(job_id, idx, ITEM_ERROR, result=result, error=result['error'])
+        else:
+            self.store.finish_item(job_id, idx, ITEM_DONE, result=result)
@@ -1,32 +1,168 @@
-import openai
+import asyncio
+import contextlib
+import contextvars
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from config import config
+from llm_cache import LLMCache
+from chunking import chunk_markdown, estimate_tokens, merge_partial_results
+from passage_selection import select_passages, tokenize
+from schema_validation import (
+    field_subschema, get_field, iter_leaf_fields, repair_json, set_field, validate_result, REASK_VALUES
+)
+from incremental import prefix_fields, section_map, stale_fields, strip_prefix
+from cascade import CascadeStats, field_confidence
+from md_normalize import normalize_markdown, DEFAULT_NORMALIZE_STEPS, NORMALIZE_STEPS, NORMALIZE_VERSION
+from provider_pool import ProviderPool
+from tracing import span, propagate
+import metrics
+import rate_limit
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Prompt模板版本，修改任意Prompt或Schema后需递增，使旧缓存失效
+PROMPT_VERSION = 1
+
+# 各类提取任务的系统提示词
+EXTRACTION_SYSTEM_PROMPT = "你是一个专业的医学文献信息提取专家，请严格按照JSON Schema格式返回提取的信息。"
+SUMMARY_SYSTEM_PROMPT = "你是一个专业的临床试验方案摘要专家，请严格按照JSON Schema格式返回提取的信息。"
+COMBINED_SYSTEM_PROMPT = "你是一个专业的医学文献信息提取和临床试验方案摘要专家，请严格按照JSON Schema格式返回提取的信息。"
+
+# 只提取部分字段时Prompt的开头说明
+REASK_INTRO = "之前从这篇医学文献中提取信息时，以下字段缺失或不明确，请根据下方文献片段补充提取："
+UPDATE_INTRO = "这篇医学文献的部分章节已更新，以下字段需要根据下方文献片段重新提取："
+CASCADE_INTRO = "请根据下方医学文献片段准确提取以下字段："
+
+# 表示文献中没有相关信息的取值，级联模式下小模型返回该值时交给大模型确认
+NOT_MENTIONED_VALUE = "未提及"
+
+# 当前上下文中累计实际token用量的计量器，随线程池/协程任务复制到子任务中
+_usage_meter = contextvars.ContextVar('usage_meter', default=None)
+
+class UsageMeter:
+    """累计LLM响应中 usage 报告的实际token数，分片等并行调用可同时累加"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.calls = 0
+        # 响应中没有 usage 的调用次数，这些调用的用量无法计入
+        self.unreported_calls = 0
+
+    def add(self, prompt_tokens, completion_tokens):
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.calls += 1
+
+    def add_unreported(self):
+        with self._lock:
+            self.calls += 1
+            self.unreported_calls += 1
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+
+@contextlib.contextmanager
+def measure_usage():
+    """统计代码块中所有LLM调用（含重试、级联、补充提取）实际消耗的token数
+
+    用法: with measure_usage() as meter: ...; meter.total_tokens
+    """
+    meter = UsageMeter()
+    token = _usage_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _usage_meter.reset(token)
+
 class LLMService:
     def __init__(self):
-        # 获取YUNWU-OPENAI配置
-        llm_config = config.get_llm_config('YUNWU-OPENAI')
+        # 获取LLM服务商配置，默认YUNWU-OPENAI
+        self.provider = config.get_setting('llm_provider', 'YUNWU-OPENAI')
+        self.model = config.get_setting('llm_model', "gpt-4.1-2025-04-14")
         
-        # 设置OpenAI客户端配置
-        self.api_key = llm_config['api_key']
-        self.base_url = llm_config['base_url']
+        # 服务商连接池：llm_providers 为逗号分隔的配置段列表，未设置时只使用 llm_provider。
+        # 每个服务商有独立的客户端、权重、并发上限、限流器和熔断器，可在配置段中设置 model 覆盖默认模型
+        provider_names = [
+            name.strip() for name in config.get_setting('llm_providers', self.provider).split(',') if name.strip()
+        ]
+        self.pool = ProviderPool(provider_names, self.model)
+        # Batch API等只能使用单一服务商的场景使用列表中的第一个服务商
+        self.provider = self.pool.primary.name
+        self.client = None
         
-        # 尝试创建客户端
-        try:
-            self.client = openai.OpenAI(
-                api_key=self.api_key,
-                base_url=self.base_url
+        # 重试时优先切换到其他服务商，没有可切换的服务商时才退避等待
+        self.max_retries = config.get_setting('llm_max_retries', 4, int)
+        self.backoff_base = config.get_setting('llm_backoff_base', 1.0, float)
+        self.backoff_max = config.get_setting('llm_backoff_max', 60.0, float)
+        # 限流时为每次调用预留的输出token数
+        self.completion_token_reserve = config.get_setting('llm_completion_token_reserve', 2000, int)
+        
+        # 超过该token数的文献按章节切分后分片提取
+        self.chunk_token_budget = config.get_setting('chunk_token_budget', 60000, int)
+        self.chunk_concurrency = config.get_setting('chunk_concurrency', 4, int)
+        
+        # 基于BM25的段落预选：只把与各字段相关的段落放入Prompt
+        self.passage_selection = config.get_setting('passage_selection', False, bool)
+        self.passage_top_k = config.get_setting('passage_top_k', 3, int)
+        self.passage_min_tokens = config.get_setting('passage_min_tokens', 2000, int)
+        
+        # 结果按schema本地校验，缺失或不明确的字段只携带相关段落补充提取一次
+        self.reask_enabled = config.get_setting('reask_enabled', True, bool)
+        self.reask_top_k = config.get_setting('reask_top_k', 3, int)
+        
+        # 增量提取：MD内容变化后只重新提取支撑章节有变化的字段，其余沿用上次结果；
+        # 变化字段超过 incremental_max_ratio 时全量提取
+        self.incremental_extraction = config.get_setting('incremental_extraction', True, bool)
+        self.incremental_top_k = config.get_setting('incremental_top_k', 3, int)
+        self.incremental_max_ratio = config.get_setting('incremental_max_ratio', 0.5, float)
+        
+        # 模型级联：先用小模型提取全部字段，缺失、"未提及"、校验失败、与原文重合度低的字段
+        # 以及 cascade_escalate_fields 中的关键字段只携带相关段落交给大模型重新提取
+        self.cascade_enabled = config.get_setting('cascade_enabled', False, bool)
+        self.cascade_model = config.get_setting('cascade_model', 'gpt-4.1-mini-2025-04-14')
+        self.cascade_min_confidence = config.get_setting('cascade_min_confidence', 0.5, float)
+        self.cascade_top_k = config.get_setting('cascade_top_k', 5, int)
+        self.cascade_escalate_fields = {
+            field.strip()
+            for field in config.get_setting(
+                'cascade_escalate_fields', 'study_design,trial_results_conclusions'
+            ).split(',')
+            if field.strip()
+        }
+        self.cascade_stats = CascadeStats()
+        
+        # MD规范化：读取MD文件后、构造Prompt前按配置顺序去除图片、冗余表格格式和参考文献（可选页眉页脚），
+        # 规范化结果按内容哈希缓存
+        self.md_normalize_steps = [
+            step.strip()
+            for step in config.get_setting('md_normalize_steps', ','.join(DEFAULT_NORMALIZE_STEPS)).split(',')
+            if step.strip()
+        ]
+        for step in self.md_normalize_steps:
+            if step not in NORMALIZE_STEPS:
+                raise ValueError(f"配置项 md_normalize_steps 包含未知步骤: {step}")
+        self.md_normalize_cache = None
+        if self.md_normalize_steps and config.get_setting('md_normalize_cache', True, bool):
+            self.md_normalize_cache = LLMCache(
+                os.path.join(config.get_data_dir(), 'md_normalize_cache.db'),
+                max_bytes=config.get_setting('md_normalize_cache_mb', 256, int) * 1024 * 1024
+            )
+        
+        # LLM结果磁盘缓存
+        self.cache = None
+        if config.get_setting('cache_enabled', True, bool):
+            self.cache = LLMCache(
+                os.path.join(config.get_data_dir(), 'llm_cache.db'),
+                max_bytes=config.get_setting('cache_max_mb', 256, int) * 1024 * 1024
             )
-        except Exception as e:
-            logger.error(f"初始化OpenAI客户端失败: {str(e)}")
-            # 如果失败，尝试不使用base_url的方式
-            self.client = None
-            
-        self.model = "gpt-4.1-2025-04-14"
     
     def get_extraction_schema(self):
         """定义CDE关键信息提取的JSON Schema"""
@@ -236,47 +372,755 @@ class LLMService:
 请确保返回的JSON格式严格符合要求，特别注意嵌套对象的结构。
 """
     
-    def extract_key_info(self, content, literature_type="CDE"):
-        """使用LLM提取关键信息"""
+    def _ensure_client(self):
+        """确保主服务商的OpenAI客户端可用"""
         if self.client is None:
-            # 重新尝试初始化客户端
+            self.client = self.pool.primary.get_client()
+
+    def _prompt_variant(self):
+        """Prompt版本标识，包含会影响Prompt内容的开关"""
+        variant = str(PROMPT_VERSION)
+        if self.passage_selection:
+            variant += f"+bm25k{self.passage_top_k}"
+        if self.reask_enabled:
+            variant += f"+reask{self.reask_top_k}"
+        if self.md_normalize_steps:
+            variant += f"+md{NORMALIZE_VERSION}:{','.join(self.md_normalize_steps)}"
+        if self.cascade_enabled:
+            variant += f"+cascade:{self.cascade_model}"
+        return variant
+
+    def normalize_content(self, content):
+        """按配置的步骤规范化MD内容，返回 (规范化后的内容, 统计信息)；未配置步骤时原样返回，统计信息为None
+
+        规范化结果按内容哈希和步骤顺序缓存，同一篇文献只规范化一次
+        """
+        if not self.md_normalize_steps:
+            return content, None
+        with span('normalize', chars=len(content)) as stage:
+            normalized, stats = self._normalize_content(content)
+            stage.set(original_tokens=stats['original_tokens'], normalized_tokens=stats['normalized_tokens'])
+        return normalized, stats
+
+    def _normalize_content(self, content):
+        """查询规范化结果缓存，未命中时规范化并记录各步骤的节省量"""
+        cache_key = None
+        if self.md_normalize_cache:
+            cache_key = LLMCache.make_key(
+                LLMCache.content_hash(content), 'md_normalize', ','.join(self.md_normalize_steps), NORMALIZE_VERSION
+            )
+            cached = self.md_normalize_cache.get(cache_key)
+            metrics.MD_NORMALIZE_LOOKUPS.inc(result='hit' if cached is not None else 'miss')
+            if cached is not None:
+                return cached['content'], cached['stats']
+        
+        normalized, stats = normalize_markdown(content, self.md_normalize_steps)
+        for step in stats['steps']:
+            metrics.MD_NORMALIZE_SAVED_BYTES.inc(max(0, step['bytes_saved']), step=step['step'])
+            metrics.MD_NORMALIZE_SAVED_TOKENS.inc(max(0, step['tokens_saved']), step=step['step'])
+        logger.info(
+            f"MD规范化: token {stats['original_tokens']} -> {stats['normalized_tokens']}，"
+            f"减少 {stats['reduction_ratio']:.1%}（" +
+            '，'.join(f"{step['step']} -{step['tokens_saved']}" for step in stats['steps']) + '）'
+        )
+        if cache_key:
+            self.md_normalize_cache.set(cache_key, 'md_normalize', {'content': normalized, 'stats': stats})
+        return normalized, stats
+
+    def _cache_key(self, content, schema_name):
+        """根据文献内容、schema、主服务商的模型和Prompt版本生成缓存键"""
+        return LLMCache.make_key(
+            LLMCache.content_hash(content), schema_name, self.pool.primary.model, self._prompt_variant()
+        )
+
+    def _cacheable(self, models):
+        """结果只由主服务商的模型（级联模式下还有小模型）生成时才写入缓存
+
+        故障切换到配置了其他模型的服务商时，结果不能以主模型的缓存键保存
+        """
+        allowed = {self.pool.primary.model}
+        if self.cascade_enabled:
+            allowed.add(self.cascade_model)
+        return set(models) <= allowed
+
+    def build_chat_request(self, schema_name, schema, system_prompt, prompt):
+        """构造 chat.completions 结构化输出请求参数，交互调用和批处理文件共用"""
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": schema_name,
+                    "schema": schema
+                }
+            },
+            "temperature": 0.1
+        }
+
+    def _record_usage(self, schema_name, usage, model=None):
+        """记录token用量指标并累加到当前的用量计量器，usage可以是响应对象属性或批处理结果中的字典"""
+        meter = _usage_meter.get()
+        if usage is None:
+            if meter is not None:
+                meter.add_unreported()
+            return
+        model = model or self.model
+        values = {}
+        for token_type in ('prompt_tokens', 'completion_tokens', 'total_tokens'):
+            value = usage.get(token_type) if isinstance(usage, dict) else getattr(usage, token_type, 0)
+            values[token_type] = value or 0
+            metrics.LLM_TOKENS.inc(
+                value or 0, schema=schema_name, model=model, type=token_type.replace('_tokens', '')
+            )
+        if meter is not None:
+            meter.add(values['prompt_tokens'], values['completion_tokens'])
+
+    def parse_completion_content(self, schema_name, content):
+        """解析LLM返回的JSON内容，格式错误或被截断时尝试本地修复，无法修复时抛出异常"""
+        with span('parse_json', schema=schema_name, chars=len(content or '')) as stage:
             try:
-                self.client = openai.OpenAI(
-                    api_key=self.api_key,
-                    base_url=self.base_url
+                return json.loads(content)
+            except json.JSONDecodeError:
+                stage.set(repaired=True)
+                metrics.LLM_JSON_PARSE_FAILURES.inc(schema=schema_name)
+                result = repair_json(content)
+                metrics.LLM_JSON_REPAIRS.inc(schema=schema_name)
+                logger.warning(f"LLM返回内容不是有效JSON，已在本地修复: {schema_name}")
+                return result
+
+    def _estimate_request_tokens(self, request):
+        """估算一次调用消耗的token数（输入 + 预留输出），用于TPM限流"""
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in request["messages"])
+        return prompt_tokens + self.completion_token_reserve
+
+    def _finish_attempt(self, provider, model, schema_name, latency, error, attempt, tried):
+        """记录一次调用尝试的结果，同步和异步调用共用
+
+        成功时返回None；可重试错误返回重试前需等待的秒数（切换服务商时为0），
+        不可重试或重试次数用尽时抛出原始错误
+        """
+        retryable = error is not None and rate_limit.is_retryable(error)
+        # 不可重试的错误（如400/401）同样计入服务商错误率，避免快速失败的延迟拉高其路由评分；
+        # 是否计入熔断在下方单独处理
+        self.pool.release(provider, latency, success=error is None)
+        metrics.LLM_LATENCY.observe(latency, schema=schema_name, model=model, provider=provider.name)
+        metrics.LLM_REQUESTS.inc(
+            schema=schema_name, model=model, provider=provider.name,
+            status='success' if error is None else 'error'
+        )
+        if error is None:
+            provider.breaker.record_success()
+            return None
+        
+        if retryable:
+            provider.breaker.record_failure()
+        else:
+            # 非服务端问题（如参数错误）不计入熔断，只释放试探名额，不清零连续失败次数
+            provider.breaker.release_trial()
+        if not retryable or attempt >= self.max_retries:
+            raise error
+        
+        tried.add(provider.name)
+        metrics.LLM_RETRIES.inc(provider=provider.name, reason=type(error).__name__)
+        if self.pool.has_alternative(tried):
+            logger.warning(f"服务商 {provider.name} 调用失败（{type(error).__name__}），切换服务商重试: {str(error)}")
+            return 0
+        
+        delay = rate_limit.backoff_delay(
+            attempt, self.backoff_base, self.backoff_max, rate_limit.get_retry_after(error)
+        )
+        logger.warning(f"LLM调用失败（{type(error).__name__}），{delay:.1f}秒后第 {attempt + 1} 次重试: {str(error)}")
+        # 所有服务商都已尝试过，退避后重新按评分选择
+        tried.clear()
+        return delay
+
+    def _handle_response(self, provider, model, schema_name, response, estimated_tokens):
+        """记录用量、修正限流配额并解析响应中的JSON结果"""
+        usage = getattr(response, 'usage', None)
+        self._record_usage(schema_name, usage, model)
+        if usage is not None and getattr(usage, 'total_tokens', None):
+            provider.limiter.adjust(usage.total_tokens - estimated_tokens)
+        return self.parse_completion_content(schema_name, response.choices[0].message.content)
+
+    def _execute_request(self, request, model=None, models=None):
+        """调用LLM结构化输出接口并解析JSON结果
+
+        每次调用从服务商连接池中按延迟和错误率选择服务商，经过熔断检查和限流排队；
+        429、5xx、超时等可重试错误优先立即切换到其他服务商重试，
+        没有可切换的服务商时按带抖动的指数退避重试，服务商返回Retry-After时以其为准。
+        model 不为None时使用指定模型（如级联模式的小模型），否则使用服务商配置的模型；
+        models 不为None时将实际生成结果的模型加入其中，用于判断结果能否写入缓存
+        """
+        schema_name = request["response_format"]["json_schema"]["name"]
+        estimated_tokens = self._estimate_request_tokens(request)
+        
+        attempt = 0
+        tried = set()
+        with span('llm_request', schema=schema_name, estimated_tokens=estimated_tokens) as stage:
+            while True:
+                stage.set(attempts=attempt + 1)
+                with span('provider_acquire'):
+                    provider = self.pool.acquire(exclude=tried)
+                provider_model = model or provider.model
+                error = None
+                start_time = time.time()
+                try:
+                    with span('limiter_wait', provider=provider.name, estimated_tokens=estimated_tokens):
+                        provider.limiter.acquire(estimated_tokens)
+                    start_time = time.time()
+                    with span('provider_call', provider=provider.name, model=provider_model, attempt=attempt):
+                        response = provider.get_client().chat.completions.create(**dict(request, model=provider_model))
+                except Exception as e:
+                    error = e
+                delay = self._finish_attempt(
+                    provider, provider_model, schema_name, time.time() - start_time, error, attempt, tried
                 )
-            except Exception as e:
-                logger.error(f"无法初始化OpenAI客户端: {str(e)}")
-                raise Exception("OpenAI客户端初始化失败，请检查API配置和网络连接")
+                if delay is None:
+                    if models is not None:
+                        models.add(provider_model)
+                    return self._handle_response(provider, provider_model, schema_name, response, estimated_tokens)
+                attempt += 1
+                if delay:
+                    with span('retry_backoff', seconds=round(delay, 3)):
+                        time.sleep(delay)
+
+    async def _execute_request_async(self, request, model=None, models=None):
+        """_execute_request 的异步版本，等待服务商名额、限流和响应时不占用线程，估算token和解析JSON在线程池中执行"""
+        schema_name = request["response_format"]["json_schema"]["name"]
+        estimated_tokens = await asyncio.to_thread(self._estimate_request_tokens, request)
+        
+        attempt = 0
+        tried = set()
+        with span('llm_request', schema=schema_name, estimated_tokens=estimated_tokens) as stage:
+            while True:
+                stage.set(attempts=attempt + 1)
+                with span('provider_acquire'):
+                    provider = await self.pool.acquire_async(exclude=tried)
+                provider_model = model or provider.model
+                error = None
+                start_time = time.time()
+                try:
+                    with span('limiter_wait', provider=provider.name, estimated_tokens=estimated_tokens):
+                        await provider.limiter.acquire_async(estimated_tokens)
+                    start_time = time.time()
+                    with span('provider_call', provider=provider.name, model=provider_model, attempt=attempt):
+                        response = await provider.get_async_client().chat.completions.create(
+                            **dict(request, model=provider_model)
+                        )
+                except asyncio.CancelledError:
+                    # 客户端断开等原因取消时归还并发名额，不计入服务商健康统计
+                    self.pool.release(provider, record=False)
+                    provider.breaker.release_trial()
+                    raise
+                except Exception as e:
+                    error = e
+                delay = self._finish_attempt(
+                    provider, provider_model, schema_name, time.time() - start_time, error, attempt, tried
+                )
+                if delay is None:
+                    if models is not None:
+                        models.add(provider_model)
+                    # 解析JSON（及本地修复）在线程池中执行
+                    return await asyncio.to_thread(
+                        self._handle_response, provider, provider_model, schema_name, response, estimated_tokens
+                    )
+                attempt += 1
+                if delay:
+                    with span('retry_backoff', seconds=round(delay, 3)):
+                        await asyncio.sleep(delay)
+
+    def plan_completion(self, content, schema_name, schema, system_prompt, prompt_builder, normalization=None):
+        """规划一次结构化提取所需的LLM请求
+
+        content 为已规范化的内容，normalization 为其规范化统计信息。
+        依次进行段落预选和超长分片，返回包含请求列表的计划，
+        各请求的结果按顺序交给 assemble_result 合并
+        """
+        prompt_content = content
+        selection_stats = None
+        if self.passage_selection and estimate_tokens(content) > self.passage_min_tokens:
+            prompt_content, selection_stats = select_passages(content, schema, top_k=self.passage_top_k)
+            logger.info(
+                f"段落预选: {schema_name} 保留 {selection_stats['selected_passage_count']}/"
+                f"{selection_stats['passage_count']} 段，token {selection_stats['original_tokens']} -> "
+                f"{selection_stats['selected_tokens']}，减少 {selection_stats['reduction_ratio']:.1%}"
+            )
+        
+        chunks = None
+        if estimate_tokens(prompt_content) > self.chunk_token_budget:
+            chunks = chunk_markdown(prompt_content, self.chunk_token_budget)
+            logger.info(f"文献超出token预算，按章节切分为 {len(chunks)} 个片段提取: {schema_name}")
+            prompts = []
+            for chunk in chunks:
+                headings = '、'.join(heading for heading in chunk['headings'] if heading) or '无标题'
+                prompts.append(prompt_builder(
+                    f"（注意：以下为文献的第 {chunk['index'] + 1}/{len(chunks)} 个片段，所含章节：{headings}。"
+                    f"仅根据本片段提取，本片段未涉及的信息请返回\"未提及\"。）\n\n{chunk['text']}"
+                ))
+        else:
+            prompts = [prompt_builder(prompt_content)]
+        
+        return {
+            'schema_name': schema_name,
+            'schema': schema,
+            'system_prompt': system_prompt,
+            'requests': [self.build_chat_request(schema_name, schema, system_prompt, prompt) for prompt in prompts],
+            'chunks': chunks,
+            'selection': selection_stats,
+            'normalization': normalization,
+            # 实际生成结果的模型
+            'models': set()
+        }
+
+    def assemble_result(self, plan, partials):
+        """合并计划中各请求的结果：分片结果按片段顺序确定性合并，并附加预选/分片元信息"""
+        if plan['chunks'] is None:
+            result = partials[0]
+        else:
+            result, field_sources = merge_partial_results(partials, plan['schema'])
+            result['_chunking'] = {
+                'chunk_count': len(plan['chunks']),
+                'chunks': [
+                    {'index': chunk['index'], 'headings': chunk['headings'], 'tokens': chunk['tokens']}
+                    for chunk in plan['chunks']
+                ],
+                'field_sources': field_sources
+            }
+        
+        if plan['selection']:
+            result['_selection'] = plan['selection']
+        if plan.get('normalization'):
+            result['_normalization'] = plan['normalization']
+        return result
+
+    def _lookup_cache(self, content, schema_name, use_cache):
+        """查询缓存，返回 (缓存键, 缓存结果)；未启用缓存时缓存键为None"""
+        cache_key = self._cache_key(content, schema_name) if self.cache else None
+        if cache_key and use_cache:
+            with span('cache_lookup', schema=schema_name) as stage:
+                cached = self.cache.get(cache_key)
+                stage.set(hit=cached is not None)
+            metrics.CACHE_LOOKUPS.inc(schema=schema_name, result='hit' if cached is not None else 'miss')
+            if cached is not None:
+                logger.info(f"命中缓存: {schema_name}")
+                return cache_key, cached
+        return cache_key, None
+
+    def get_field_prompt(self, content, schema, intro):
+        """生成只提取部分字段的Prompt，只列出schema中的字段"""
+        fields = '\n'.join(
+            f"{index}. {field_schema.get('description', field_path)}（{field_path}）"
+            for index, (field_path, field_schema) in enumerate(iter_leaf_fields(schema), start=1)
+        )
+        return f"""
+{intro}
+
+{fields}
+
+文献片段：
+{content}
+
+请仅根据文献片段提取这些字段。如果片段中确实没有相关信息，请返回"未提及"。
+"""
+
+    def build_field_request(self, content, plan, field_paths, suffix, intro, top_k):
+        """构造只提取指定字段的请求，只携带BM25检索到的相关段落，不重新发送整篇文献
+
+        返回 (请求, 精简后的文献内容)
+        """
+        schema = field_subschema(plan['schema'], list(field_paths))
+        prompt_content = content
+        if estimate_tokens(content) > self.passage_min_tokens:
+            prompt_content, _ = select_passages(content, schema, top_k=top_k)
+        request = self.build_chat_request(
+            f"{plan['schema_name']}_{suffix}", schema, plan['system_prompt'],
+            self.get_field_prompt(prompt_content, schema, intro)
+        )
+        return request, prompt_content
+
+    def plan_reask(self, content, plan, result, fields=None):
+        """按schema校验结果，返回 (规范化结果, 补充提取请求, 待补充字段)
+
+        fields 不为None时只补充其中的字段；无需补充时请求为None
+        """
+        result, problems = validate_result(result, plan['schema'])
+        if fields is not None:
+            problems = {field_path: problem for field_path, problem in problems.items() if field_path in fields}
+        if not problems or not self.reask_enabled:
+            return result, None, problems
+        
+        request, prompt_content = self.build_field_request(
+            content, plan, problems, 'reask', REASK_INTRO, self.reask_top_k
+        )
+        logger.info(
+            f"{plan['schema_name']} 有 {len(problems)} 个字段缺失或不明确，补充提取: "
+            f"token {estimate_tokens(content)} -> {estimate_tokens(prompt_content)}"
+        )
+        return result, request, problems
+
+    def merge_reask(self, plan, result, problems, request, partial):
+        """将补充提取得到的有效取值合并到结果中"""
+        schema_name = plan['schema_name']
+        resolved = []
+        if partial is not None:
+            for field_path in problems:
+                value = get_field(partial, field_path)
+                if isinstance(value, str) and value.strip() not in REASK_VALUES:
+                    set_field(result, field_path, value.strip())
+                    resolved.append(field_path)
+        
+        unresolved = len(problems) - len(resolved)
+        metrics.LLM_REASK_FIELDS.inc(len(resolved), schema=schema_name, result='resolved')
+        metrics.LLM_REASK_FIELDS.inc(unresolved, schema=schema_name, result='unresolved')
+        result['_reask'] = {
+            'fields': problems,
+            'resolved': resolved,
+            'prompt_tokens': self._estimate_request_tokens(request) - self.completion_token_reserve
+        }
+        return result
+
+    def plan_cascade(self, content, plan, result):
+        """校验小模型的结果并为各字段评分，返回 (规范化结果, 升级请求, {升级字段: 原因}, {字段路径: 置信度})
+
+        缺失或类型不符（missing/type）、为空或"信息不明确"（unclear）、"未提及"（not_mentioned）、
+        属于关键字段（critical）以及置信度低于 cascade_min_confidence（low_confidence）的字段升级到大模型；
+        无需升级时请求为None
+        """
+        result, problems = validate_result(result, plan['schema'])
+        content_tokens = set(tokenize(content))
+        content_lower = content.lower()
+        escalations = {}
+        confidence = {}
+        for field_path, _ in iter_leaf_fields(plan['schema']):
+            value = get_field(result, field_path)
+            if field_path in problems or value == NOT_MENTIONED_VALUE:
+                confidence[field_path] = 0.0
+            else:
+                confidence[field_path] = field_confidence(value, content_tokens, content_lower)
+            
+            if field_path in problems:
+                escalations[field_path] = problems[field_path]
+            elif value == NOT_MENTIONED_VALUE:
+                escalations[field_path] = 'not_mentioned'
+            elif field_path.rsplit('.', 1)[-1] in self.cascade_escalate_fields:
+                escalations[field_path] = 'critical'
+            elif confidence[field_path] < self.cascade_min_confidence:
+                escalations[field_path] = 'low_confidence'
+        
+        if not escalations:
+            return result, None, escalations, confidence
+        request, prompt_content = self.build_field_request(
+            content, plan, escalations, 'cascade', CASCADE_INTRO, self.cascade_top_k
+        )
+        logger.info(
+            f"{plan['schema_name']} 小模型结果中有 {len(escalations)}/{len(confidence)} 个字段升级到大模型: "
+            f"token {estimate_tokens(content)} -> {estimate_tokens(prompt_content)}"
+        )
+        return result, request, escalations, confidence
+
+    def merge_cascade(self, plan, result, escalations, confidence, request, partial):
+        """用大模型的取值替换升级字段，大模型未返回有效取值时保留小模型的结果，并记录逐字段统计"""
+        schema_name = plan['schema_name']
+        changed = []
+        if partial is not None:
+            for field_path in escalations:
+                value = get_field(partial, field_path)
+                if isinstance(value, str) and value.strip():
+                    if value.strip() != get_field(result, field_path):
+                        changed.append(field_path)
+                    set_field(result, field_path, value.strip())
         
+        self.cascade_stats.record(schema_name, confidence, escalations, changed)
+        for field_path in confidence:
+            metrics.LLM_CASCADE_FIELDS.inc(
+                schema=schema_name, field=field_path,
+                result='escalated' if field_path in escalations else 'accepted'
+            )
+        result['_cascade'] = {
+            'model': self.cascade_model,
+            'escalated': escalations,
+            'changed': changed,
+            'confidence': confidence,
+            'prompt_tokens': (self._estimate_request_tokens(request) - self.completion_token_reserve)
+            if request is not None else 0
+        }
+        return result
+
+    def _cascade_result(self, content, plan, result):
+        """对小模型的结果评分，不确定的字段只携带相关段落交给大模型重新提取"""
+        with span('cascade', schema=plan['schema_name']) as stage:
+            result, request, escalations, confidence = self.plan_cascade(content, plan, result)
+            stage.set(escalated=len(escalations))
+            partial = None
+            if request is not None:
+                try:
+                    partial = self._execute_request(request, models=plan['models'])
+                except Exception as e:
+                    logger.warning(f"升级到大模型提取失败，保留小模型结果: {str(e)}")
+            return self.merge_cascade(plan, result, escalations, confidence, request, partial)
+
+    async def _cascade_result_async(self, content, plan, result):
+        """_cascade_result 的异步版本"""
+        with span('cascade', schema=plan['schema_name']) as stage:
+            result, request, escalations, confidence = await asyncio.to_thread(self.plan_cascade, content, plan, result)
+            stage.set(escalated=len(escalations))
+            partial = None
+            if request is not None:
+                try:
+                    partial = await self._execute_request_async(request, models=plan['models'])
+                except Exception as e:
+                    logger.warning(f"升级到大模型提取失败，保留小模型结果: {str(e)}")
+            return self.merge_cascade(plan, result, escalations, confidence, request, partial)
+
+    def _finish_completion(self, cache_key, plan, result):
+        """记录生成结果的模型，写入缓存并返回结果"""
+        result['_models'] = sorted(plan['models'])
+        if not self._cacheable(plan['models']):
+            logger.warning(
+                f"{plan['schema_name']} 的结果由 {', '.join(result['_models'])} 生成，"
+                f"与主模型 {self.pool.primary.model} 不一致，不写入缓存"
+            )
+        elif cache_key:
+            with span('cache_store', schema=plan['schema_name']):
+                self.cache.set(cache_key, plan['schema_name'], result)
+        return result
+
+    def attach_sections(self, content, schema, result, sections=None):
+        """在结果中记录章节指纹和各字段的支撑章节，供MD内容变化后增量提取"""
+        if self.incremental_extraction:
+            if sections is None:
+                with span('section_map'):
+                    sections = section_map(content, schema, self.incremental_top_k)
+            result['_sections'] = sections
+        return result
+
+    def plan_incremental(self, content, schema_name, schema, system_prompt, previous, normalization=None):
+        """根据上次结果中的章节指纹规划增量提取
+
+        返回 (计划, 沿用上次取值的结果, 重新提取请求, 需要重新提取的字段)，没有字段需要重新提取时请求为None；
+        上次结果没有章节指纹或变化字段过多时返回None，此时应全量提取
+        """
+        if not (self.incremental_extraction and previous and previous.get('_sections')):
+            return None
+        
+        sections = section_map(content, schema, self.incremental_top_k)
+        stale, removed, added = stale_fields(previous['_sections'], sections)
+        total = len(sections['fields'])
+        if len(stale) > total * self.incremental_max_ratio:
+            logger.info(f"{schema_name} 有 {len(stale)}/{total} 个字段的支撑章节发生变化，全量提取")
+            return None
+        
+        plan = {
+            'schema_name': schema_name, 'schema': schema, 'system_prompt': system_prompt, 'sections': sections,
+            'models': set()
+        }
+        result, _ = validate_result({key: value for key, value in previous.items() if not key.startswith('_')}, schema)
+        result['_incremental'] = {
+            'removed_sections': removed,
+            'added_sections': added,
+            'recomputed': stale,
+            'carried': total - len(stale)
+        }
+        if normalization:
+            result['_normalization'] = normalization
+        metrics.LLM_INCREMENTAL_FIELDS.inc(len(stale), schema=schema_name, result='recomputed')
+        metrics.LLM_INCREMENTAL_FIELDS.inc(total - len(stale), schema=schema_name, result='carried')
+        if not stale:
+            logger.info(f"{schema_name} 各字段的支撑章节均未变化，沿用上次结果")
+            return plan, result, None, stale
+        
+        request, prompt_content = self.build_field_request(
+            content, plan, stale, 'incremental', UPDATE_INTRO, self.incremental_top_k
+        )
+        logger.info(
+            f"{schema_name} 增量提取 {len(stale)}/{total} 个字段（章节 -{removed}/+{added}）: "
+            f"token {estimate_tokens(content)} -> {estimate_tokens(prompt_content)}"
+        )
+        return plan, result, request, stale
+
+    def merge_fields(self, result, field_paths, partial):
+        """用重新提取的取值替换结果中的指定字段，缺失的字段置空，之后按缺失字段补充提取"""
+        for field_path in field_paths:
+            value = get_field(partial, field_path)
+            set_field(result, field_path, value if isinstance(value, str) else '')
+        return result
+
+    def _validated_result(self, content, plan, result, fields=None):
+        """校验结果、对缺失字段补充提取并记录章节指纹"""
+        with span('validate', schema=plan['schema_name']):
+            result, request, problems = self.plan_reask(content, plan, result, fields)
+        if request is not None:
+            partial = None
+            try:
+                with span('reask', fields=len(problems)):
+                    partial = self._execute_request(request, models=plan['models'])
+            except Exception as e:
+                logger.warning(f"补充提取失败，保留原结果: {str(e)}")
+            result = self.merge_reask(plan, result, problems, request, partial)
+        return self.attach_sections(content, plan['schema'], result, plan.get('sections'))
+
+    async def _validated_result_async(self, content, plan, result, fields=None):
+        """_validated_result 的异步版本，校验和计算章节指纹在线程池中执行"""
+        with span('validate', schema=plan['schema_name']):
+            result, request, problems = await asyncio.to_thread(self.plan_reask, content, plan, result, fields)
+        if request is not None:
+            partial = None
+            try:
+                with span('reask', fields=len(problems)):
+                    partial = await self._execute_request_async(request, models=plan['models'])
+            except Exception as e:
+                logger.warning(f"补充提取失败，保留原结果: {str(e)}")
+            result = self.merge_reask(plan, result, problems, request, partial)
+        return await asyncio.to_thread(self.attach_sections, content, plan['schema'], result, plan.get('sections'))
+
+    def _incremental_completion(self, content, cache_key, incremental):
+        """执行增量提取：只请求支撑章节有变化的字段，补充提取也只针对这些字段"""
+        plan, result, request, stale = incremental
+        if request is not None:
+            result = self.merge_fields(result, stale, self._execute_request(request, models=plan['models']))
+        return self._finish_completion(cache_key, plan, self._validated_result(content, plan, result, stale))
+
+    async def _incremental_completion_async(self, content, cache_key, incremental):
+        """_incremental_completion 的异步版本"""
+        plan, result, request, stale = incremental
+        if request is not None:
+            result = self.merge_fields(
+                result, stale, await self._execute_request_async(request, models=plan['models'])
+            )
+        result = await self._validated_result_async(content, plan, result, stale)
+        return await asyncio.to_thread(self._finish_completion, cache_key, plan, result)
+
+    def _cached_completion(self, content, schema_name, schema, system_prompt, prompt_builder, use_cache=True,
+                           previous=None):
+        """带缓存的结构化输出调用
+
+        use_cache=False 时跳过缓存读取，但仍会用新结果刷新缓存；
+        传入同一文献上次的结果 previous 时优先增量提取；
+        文献超出 chunk_token_budget 时自动切换为分片并行提取再合并
+        """
+        with span('completion', schema=schema_name, chars=len(content)) as stage:
+            cache_key, cached = self._lookup_cache(content, schema_name, use_cache)
+            if cached is not None:
+                stage.set(cached=True)
+                return cached
+            
+            # 缓存按原始内容查询，未命中时再规范化
+            content, normalization = self.normalize_content(content)
+            with span('plan_incremental', schema=schema_name):
+                incremental = self.plan_incremental(content, schema_name, schema, system_prompt, previous, normalization)
+            if incremental is not None:
+                stage.set(incremental=True)
+                return self._incremental_completion(content, cache_key, incremental)
+            
+            with span('build_prompt', schema=schema_name) as prompt_stage:
+                plan = self.plan_completion(content, schema_name, schema, system_prompt, prompt_builder, normalization)
+                prompt_stage.set(requests=len(plan['requests']))
+            # 级联模式下先用小模型提取全部字段
+            model = self.cascade_model if self.cascade_enabled else None
+            requests = plan['requests']
+            if len(requests) == 1:
+                partials = [self._execute_request(requests[0], model, plan['models'])]
+            else:
+                max_workers = max(1, min(self.chunk_concurrency, len(requests)))
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    partials = list(executor.map(
+                        propagate(lambda request: self._execute_request(request, model, plan['models'])), requests
+                    ))
+            
+            result = self.assemble_result(plan, partials)
+            if self.cascade_enabled:
+                # 缺失和不明确的字段已升级到大模型重新提取，不再补充提取
+                result = self._validated_result(content, plan, self._cascade_result(content, plan, result), fields=())
+            else:
+                result = self._validated_result(content, plan, result)
+            return self._finish_completion(cache_key, plan, result)
+
+    async def _cached_completion_async(self, content, schema_name, schema, system_prompt, prompt_builder,
+                                       use_cache=True, previous=None):
+        """_cached_completion 的异步版本，分片请求以协程并发执行
+
+        缓存读写、MD规范化、段落预选、增量规划和结果合并等阻塞操作在线程池中执行，
+        事件循环上只等待模型响应
+        """
+        with span('completion', schema=schema_name, chars=len(content)) as stage:
+            cache_key, cached = await asyncio.to_thread(self._lookup_cache, content, schema_name, use_cache)
+            if cached is not None:
+                stage.set(cached=True)
+                return cached
+            
+            content, normalization = await asyncio.to_thread(self.normalize_content, content)
+            with span('plan_incremental', schema=schema_name):
+                incremental = await asyncio.to_thread(
+                    self.plan_incremental, content, schema_name, schema, system_prompt, previous, normalization
+                )
+            if incremental is not None:
+                stage.set(incremental=True)
+                return await self._incremental_completion_async(content, cache_key, incremental)
+            
+            with span('build_prompt', schema=schema_name) as prompt_stage:
+                plan = await asyncio.to_thread(
+                    self.plan_completion, content, schema_name, schema, system_prompt, prompt_builder, normalization
+                )
+                prompt_stage.set(requests=len(plan['requests']))
+            model = self.cascade_model if self.cascade_enabled else None
+            semaphore = asyncio.Semaphore(max(1, self.chunk_concurrency))
+            
+            async def run(request):
+                async with semaphore:
+                    return await self._execute_request_async(request, model, plan['models'])
+            
+            partials = await asyncio.gather(*(run(request) for request in plan['requests']))
+            result = await asyncio.to_thread(self.assemble_result, plan, list(partials))
+            if self.cascade_enabled:
+                result = await self._cascade_result_async(content, plan, result)
+                result = await self._validated_result_async(content, plan, result, fields=())
+            else:
+                result = await self._validated_result_async(content, plan, result)
+            return await asyncio.to_thread(self._finish_completion, cache_key, plan, result)
+
+    def store_result(self, content, schema_name, result):
+        """将外部得到的结果（如批处理结果）写入缓存"""
+        if self.cache:
+            self.cache.set(self._cache_key(content, schema_name), schema_name, result)
+
+    def get_extraction_spec(self, literature_type):
+        """根据文献类型返回 (schema名称, schema, prompt生成函数)"""
+        if literature_type == "国外试验文献调研":
+            return "foreign_trial_extraction", self.get_foreign_trial_extraction_schema(), \
+                self.get_foreign_trial_extraction_prompt
+        return "medical_trial_extraction", self.get_extraction_schema(), self.get_extraction_prompt
+
+    def extract_key_info(self, content, literature_type="CDE", use_cache=True, previous=None):
+        """使用LLM提取关键信息，previous为同一文献上次的提取结果时只重新提取有变化的字段"""
         try:
             # 根据文献类型选择不同的prompt和schema
-            if literature_type == "国外试验文献调研":
-                prompt = self.get_foreign_trial_extraction_prompt(content)
-                schema = self.get_foreign_trial_extraction_schema()
-                schema_name = "foreign_trial_extraction"
-            else:
-                prompt = self.get_extraction_prompt(content)
-                schema = self.get_extraction_schema()
-                schema_name = "medical_trial_extraction"
+            schema_name, schema, prompt_builder = self.get_extraction_spec(literature_type)
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "你是一个专业的医学文献信息提取专家，请严格按照JSON Schema格式返回提取的信息。"},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={
-                    "type": "json_schema",
-                    "json_schema": {
-                        "name": schema_name,
-                        "schema": schema
-                    }
-                },
-                temperature=0.1
+            result = self._cached_completion(
+                content, schema_name, schema,
+                EXTRACTION_SYSTEM_PROMPT,
+                prompt_builder, use_cache=use_cache, previous=previous
             )
+            logger.info(f"成功提取{literature_type}关键信息")
+            return result
             
-            result = json.loads(response.choices[0].message.content)
+        except Exception as e:
+            logger.error(f"LLM提取{literature_type}关键信息失败: {str(e)}")
+            raise e
+
+    async def extract_key_info_async(self, content, literature_type="CDE", use_cache=True, previous=None):
+        """extract_key_info 的异步版本"""
+        try:
+            schema_name, schema, prompt_builder = self.get_extraction_spec(literature_type)
+            result = await self._cached_completion_async(
+                content, schema_name, schema,
+                EXTRACTION_SYSTEM_PROMPT,
+                prompt_builder, use_cache=use_cache, previous=previous
+            )
             logger.info(f"成功提取{literature_type}关键信息")
             return result
             
@@ -284,40 +1128,154 @@ class LLMService:
             logger.error(f"LLM提取{literature_type}关键信息失败: {str(e)}")
             raise e
 
-    def generate_summary(self, content):
-        """使用LLM生成方案摘要"""
-        if self.client is None:
-            # 重新尝试初始化客户端
-            try:
-                self.client = openai.OpenAI(
-                    api_key=self.api_key,
-                    base_url=self.base_url
-                )
-            except Exception as e:
-                logger.error(f"无法初始化OpenAI客户端: {str(e)}")
-                raise Exception("OpenAI客户端初始化失败，请检查API配置和网络连接")
+    def get_combined_prompt(self, content, literature_type):
+        """生成关键信息提取与方案摘要合并提取的Prompt，文献内容只出现一次"""
+        _, _, prompt_builder = self.get_extraction_spec(literature_type)
+        placeholder = "（见上方文献内容）"
+        return f"""
+文献内容：
+{content}
+
+本次需要基于上方同一篇文献完成两项任务，分别输出到JSON的 extraction 和 summary 字段。
+
+【任务一：关键信息提取，输出到 extraction 字段】
+{prompt_builder(placeholder)}
+
+【任务二：方案摘要提取，输出到 summary 字段】
+{self.get_summary_prompt(placeholder)}
+"""
+
+    def _cached_pair(self, content, schema_name, use_cache):
+        """分别查询关键信息和方案摘要的缓存，返回 (提取结果, 方案摘要)，未命中的一项为None"""
+        if not use_cache:
+            return None, None
+        return (
+            self._lookup_cache(content, schema_name, use_cache)[1],
+            self._lookup_cache(content, "summary_extraction", use_cache)[1]
+        )
+
+    def get_combined_spec(self, literature_type):
+        """合并提取的 (schema名称, schema, prompt生成函数)"""
+        schema_name, schema, _ = self.get_extraction_spec(literature_type)
+        combined_schema = {
+            "type": "object",
+            "properties": {
+                "extraction": schema,
+                "summary": self.get_summary_schema()
+            },
+            "required": ["extraction", "summary"],
+            "additionalProperties": False
+        }
+        return f"{schema_name}_with_summary", combined_schema, \
+            lambda prompt_content: self.get_combined_prompt(prompt_content, literature_type)
+
+    def _combine_previous(self, previous, previous_summary):
+        """将上次的关键信息和方案摘要组合为合并提取的上次结果，两者的章节指纹不一致时返回None"""
+        if not (previous and previous_summary):
+            return None
+        sections = previous.get('_sections')
+        summary_sections = previous_summary.get('_sections')
+        if not (sections and summary_sections) or sections['fingerprints'] != summary_sections['fingerprints']:
+            return None
+        return {
+            'extraction': previous,
+            'summary': previous_summary,
+            '_sections': {
+                'fingerprints': sections['fingerprints'],
+                'fields': {**prefix_fields(sections, 'extraction'), **prefix_fields(summary_sections, 'summary')}
+            }
+        }
+
+    def _split_combined(self, content, schema_name, combined):
+        """拆分合并提取结果，两部分分别写入各自的缓存"""
+        extraction = combined['extraction']
+        summary = combined['summary']
+        # 分片、段落预选等元信息同时附加到两部分结果
+        for meta_key in ('_chunking', '_selection', '_reask', '_incremental', '_normalization', '_cascade', '_models'):
+            if meta_key in combined:
+                extraction[meta_key] = summary[meta_key] = combined[meta_key]
+        # 章节映射按各自的字段拆分，之后可单独增量提取
+        if '_sections' in combined:
+            extraction['_sections'] = strip_prefix(combined['_sections'], 'extraction')
+            summary['_sections'] = strip_prefix(combined['_sections'], 'summary')
         
+        if self.cache and self._cacheable(combined.get('_models', ())):
+            self.cache.set(self._cache_key(content, schema_name), schema_name, extraction)
+            self.cache.set(self._cache_key(content, "summary_extraction"), "summary_extraction", summary)
+        return extraction, summary
+
+    def extract_with_summary(self, content, literature_type="CDE", use_cache=True, previous=None,
+                             previous_summary=None):
+        """一次LLM调用同时完成关键信息提取和方案摘要
+
+        两部分结果分别写入各自的缓存，之后调用 generate_summary 不会再请求模型；
+        只有一部分已缓存时单独提取另一部分。同时传入上次的提取结果和方案摘要时增量提取。返回 (提取结果, 方案摘要)
+        """
         try:
-            prompt = self.get_summary_prompt(content)
-            schema = self.get_summary_schema()
+            schema_name = self.get_extraction_spec(literature_type)[0]
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "你是一个专业的临床试验方案摘要专家，请严格按照JSON Schema格式返回提取的信息。"},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={
-                    "type": "json_schema",
-                    "json_schema": {
-                        "name": "summary_extraction",
-                        "schema": schema
-                    }
-                },
-                temperature=0.1
+            # 两部分均已缓存时直接返回；只命中一项时单独提取另一项，已查询过的缓存不再重复查询
+            extraction, summary = self._cached_pair(content, schema_name, use_cache)
+            if extraction is not None and summary is not None:
+                return extraction, summary
+            if extraction is not None:
+                return extraction, self.generate_summary(content, use_cache=False, previous=previous_summary)
+            if summary is not None:
+                return self.extract_key_info(content, literature_type, use_cache=False, previous=previous), summary
+            
+            combined_name, combined_schema, prompt_builder = self.get_combined_spec(literature_type)
+            combined = self._cached_completion(
+                content, combined_name, combined_schema,
+                COMBINED_SYSTEM_PROMPT,
+                prompt_builder, use_cache=use_cache, previous=self._combine_previous(previous, previous_summary)
             )
             
-            result = json.loads(response.choices[0].message.content)
+            extraction, summary = self._split_combined(content, schema_name, combined)
+            logger.info(f"成功合并提取{literature_type}关键信息和方案摘要")
+            return extraction, summary
+            
+        except Exception as e:
+            logger.error(f"LLM合并提取{literature_type}关键信息和方案摘要失败: {str(e)}")
+            raise e
+
+    async def extract_with_summary_async(self, content, literature_type="CDE", use_cache=True, previous=None,
+                                         previous_summary=None):
+        """extract_with_summary 的异步版本"""
+        try:
+            schema_name = self.get_extraction_spec(literature_type)[0]
+            extraction, summary = await asyncio.to_thread(self._cached_pair, content, schema_name, use_cache)
+            if extraction is not None and summary is not None:
+                return extraction, summary
+            if extraction is not None:
+                return extraction, await self.generate_summary_async(content, use_cache=False, previous=previous_summary)
+            if summary is not None:
+                return await self.extract_key_info_async(
+                    content, literature_type, use_cache=False, previous=previous
+                ), summary
+            
+            combined_name, combined_schema, prompt_builder = self.get_combined_spec(literature_type)
+            combined = await self._cached_completion_async(
+                content, combined_name, combined_schema,
+                COMBINED_SYSTEM_PROMPT,
+                prompt_builder, use_cache=use_cache, previous=self._combine_previous(previous, previous_summary)
+            )
+            
+            extraction, summary = await asyncio.to_thread(self._split_combined, content, schema_name, combined)
+            logger.info(f"成功合并提取{literature_type}关键信息和方案摘要")
+            return extraction, summary
+            
+        except Exception as e:
+            logger.error(f"LLM合并提取{literature_type}关键信息和方案摘要失败: {str(e)}")
+            raise e
+
+    def generate_summary(self, content, use_cache=True, previous=None):
+        """使用LLM生成方案摘要，previous为同一文献上次的方案摘要时只重新提取有变化的字段"""
+        try:
+            result = self._cached_completion(
+                content, "summary_extraction", self.get_summary_schema(),
+                SUMMARY_SYSTEM_PROMPT,
+                self.get_summary_prompt, use_cache=use_cache, previous=previous
+            )
             logger.info("成功生成方案摘要")
             return result
             
@@ -325,11 +1283,34 @@ class LLMService:
             logger.error(f"LLM生成方案摘要失败: {str(e)}")
             raise e
 
+    async def generate_summary_async(self, content, use_cache=True, previous=None):
+        """generate_summary 的异步版本"""
+        try:
+            result = await self._cached_completion_async(
+                content, "summary_extraction", self.get_summary_schema(),
+                SUMMARY_SYSTEM_PROMPT,
+                self.get_summary_prompt, use_cache=use_cache, previous=previous
+            )
+            logger.info("成功生成方案摘要")
+            return result
+            
+        except Exception as e:
+            logger.error(f"LLM生成方案摘要失败: {str(e)}")
+            raise e
+
+    async def aclose(self):
+        """关闭各服务商的异步客户端连接池"""
+        await self.pool.aclose()
+
     def read_md_file(self, file_path):
         """读取Markdown文件内容"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            with span('read_md_file', path=file_path) as stage, open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
+                size = os.fstat(f.fileno()).st_size
+                stage.set(bytes=size)
+                metrics.MD_READ_BYTES.inc(size)
+            metrics.MD_READS.inc()
             return content
         except Exception as e:
             logger.error(f"读取文件失败 {file_path}: {str(e)}")
@@ -340,8 +1321,9 @@ class LLMService:
         # 构建MD文件路径: 文献文件夹/auto/文献名.md
         md_file_path = os.path.join(literature_folder, 'auto', f'{literature_name}.md')
         
-        if not os.path.exists(md_file_path):
-            raise FileNotFoundError(f"MD文件不存在: {md_file_path}")
+        with span('find_md_file_path', path=md_file_path):
+            if not os.path.exists(md_file_path):
+                raise FileNotFoundError(f"MD文件不存在: {md_file_path}")
         
         return md_file_path
 
@@ -472,11 +1454,13 @@ class LLMService:
             "additionalProperties": False
         }
 
-# 延迟初始化，避免导入时错误
+# 延迟初始化，避免导入时错误；加锁避免并发的首个请求创建多个服务商连接池
 llm_service = None
+llm_service_lock = threading.Lock()
 
 def get_llm_service():
     global llm_service
-    if llm_service is None:
-        llm_service = LLMService()
-    return llm_service 
\ No newline at end of file
+    with llm_service_lock:
+        if llm_service is None:
+            llm_service = LLMService()
+        return llm_service 
\ No newline at end of file
@@ -0,0 +1,240 @@
+import html
+import re
+
+from chunking import HEADING_PATTERN, estimate_tokens
+
+# 规范化步骤的版本，修改任意步骤的处理逻辑后需递增，使已缓存的规范化结果失效
+NORMALIZE_VERSION = 2
+
+# 重复出现至少这么多次、每次间隔至少 HEADER_MIN_GAP 行的独立短行视为页眉页脚
+HEADER_MIN_REPEATS = 3
+HEADER_MIN_CHARS = 6
+HEADER_MAX_CHARS = 100
+HEADER_MIN_GAP = 10
+
+# 带"页"/"page"字样的页码：第12页、第12页/共30页、Page 12 of 30
+EXPLICIT_PAGE_PATTERN = re.compile(
+    r'^(?:第\s*\d{1,4}\s*页(?:\s*[/，,]?\s*共\s*\d{1,4}\s*页)?|page\s+\d{1,4}(?:\s+of\s+\d{1,4})?)$',
+    re.IGNORECASE
+)
+# 只有数字的页码：12、- 12 -、12/30。与样本量等取值无法区分，只有连续递增至少 PAGE_MIN_RUN 页时才视为页码
+BARE_PAGE_PATTERN = re.compile(r'^(?:[-–—]\s*)?(\d{1,4})(?:\s*[-–—])?(?:\s*/\s*\d{1,4})?$')
+PAGE_MIN_RUN = 3
+
+# 是/否、数字等简短取值（如CDE登记信息的逐项回答）不参与页眉页脚去重
+SHORT_VALUE_PATTERN = re.compile(
+    r'^(?:是|否|有|无|不适用|未提及|n/?a|yes|no|[\d\s.,%/:：~～<>≤≥±+\-–—]+)$', re.IGNORECASE
+)
+# 列表项、表格行和引用不参与页眉页脚去重
+LIST_ITEM_PATTERN = re.compile(r'^(?:[-*+>|]|\d+[.)、])')
+# 以中文句末标点结尾的行是正文句子，不是页眉页脚
+SENTENCE_END = ('。', '！', '？', '；')
+
+# Markdown图片和HTML图片标签（含base64内嵌图片）
+MARKDOWN_IMAGE_PATTERN = re.compile(r'!\[([^\]]*)\]\((?:[^()\s]|\([^()]*\))*(?:\s+"[^"]*")?\)')
+HTML_IMAGE_PATTERN = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+# 图片语法之外残留的base64数据
+DATA_URI_PATTERN = re.compile(r'data:[\w/+.-]+;base64,[A-Za-z0-9+/=\s]{64,}')
+
+HTML_TABLE_PATTERN = re.compile(r'<table\b.*?</table>', re.IGNORECASE | re.DOTALL)
+HTML_ROW_PATTERN = re.compile(r'<tr\b[^>]*>(.*?)</tr>', re.IGNORECASE | re.DOTALL)
+HTML_CELL_PATTERN = re.compile(r'<t[hd]\b[^>]*>(.*?)</t[hd]>', re.IGNORECASE | re.DOTALL)
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+# Markdown表格的对齐分隔行
+TABLE_SEPARATOR_PATTERN = re.compile(r'^\|?\s*:?-{3,}:?\s*(?:\|\s*:?-{3,}:?\s*)*\|?$')
+
+REFERENCE_HEADINGS = re.compile(
+    r'^(?:\d+[.、\s]*)?(?:references?|bibliography|literature cited|参考文献|参考资料)\s*[:：]?$',
+    re.IGNORECASE
+)
+# 参考文献条目：[1] / 1. / 1) 编号开头，或含文献类型标识 [J]、et al.、doi、年份加卷期
+CITATION_PATTERN = re.compile(
+    r'^(?:\[\d{1,3}\]|\d{1,3}[.)、]\s)'
+    r'|\[[JMCDRSPNZ](?:/OL)?\]|\bet al\b|\bdoi\b|\b(?:19|20)\d{2}\s*[;,:.(]\s*\d',
+    re.IGNORECASE
+)
+# 参考文献章节中至少这个比例的非空行像文献条目时才省略
+REFERENCE_MIN_RATIO = 0.6
+
+def dedupe_headers(content):
+    """去除页眉页脚和页码，只处理位于页面边界（前后为空行或换页符）的独立短行
+
+    - 带"页"/"page"字样的页码直接删除；只有数字的页码连续递增至少 PAGE_MIN_RUN 页时才删除，
+      单独成行的样本量等数字不受影响
+    - 长度不少于 HEADER_MIN_CHARS、重复至少 HEADER_MIN_REPEATS 次且相邻两次间隔至少 HEADER_MIN_GAP 行的
+      相同短行视为页眉页脚，只保留第一次；是/否、数字等简短取值，以及标题、列表项、表格行和中文句子不参与去重
+    """
+    lines = content.splitlines(keepends=True)
+    keys = [_header_key(lines, index) for index in range(len(lines))]
+
+    removed = set()
+    page_candidates = []
+    occurrences = {}
+    for index, key in enumerate(keys):
+        if key is None:
+            continue
+        if EXPLICIT_PAGE_PATTERN.match(key):
+            removed.add(index)
+            continue
+        match = BARE_PAGE_PATTERN.match(key)
+        if match:
+            page_candidates.append((index, int(match.group(1))))
+            continue
+        if len(key) >= HEADER_MIN_CHARS and not SHORT_VALUE_PATTERN.match(key):
+            occurrences.setdefault(key, []).append(index)
+    removed.update(_page_number_runs(page_candidates))
+
+    for indexes in occurrences.values():
+        if len(indexes) < HEADER_MIN_REPEATS:
+            continue
+        if min(b - a for a, b in zip(indexes, indexes[1:])) < HEADER_MIN_GAP:
+            continue
+        removed.update(indexes[1:])
+    return ''.join(line for index, line in enumerate(lines) if index not in removed)
+
+def _header_key(lines, index):
+    """位于页面边界的独立短行返回去除多余空白后的内容，其余行返回None"""
+    line = lines[index]
+    text = ' '.join(line.split())
+    if not text or len(text) > HEADER_MAX_CHARS:
+        return None
+    if HEADING_PATTERN.match(text) or LIST_ITEM_PATTERN.match(text) or text.endswith(SENTENCE_END):
+        return None
+    before_blank = index == 0 or not lines[index - 1].strip() or lines[index - 1].endswith('\f')
+    after_blank = index == len(lines) - 1 or not lines[index + 1].strip() or line.endswith('\f')
+    if not (before_blank and after_blank):
+        return None
+    return text
+
+def _page_number_runs(candidates):
+    """从 (行号, 数字) 中找出按文档顺序连续递增（每次加1）至少 PAGE_MIN_RUN 个的页码，返回其行号"""
+    runs = []
+    # 以当前末尾页码为键的未结束序列
+    open_runs = {}
+    for index, number in candidates:
+        run = open_runs.pop(number - 1, None)
+        if run is None:
+            run = []
+            runs.append(run)
+        run.append(index)
+        open_runs[number] = run
+    return {index for run in runs if len(run) >= PAGE_MIN_RUN for index in run}
+
+def strip_images(content):
+    """删除图片链接、HTML图片标签和内嵌的base64数据，有替代文字时保留替代文字"""
+    content = MARKDOWN_IMAGE_PATTERN.sub(lambda match: match.group(1).strip(), content)
+    content = HTML_IMAGE_PATTERN.sub('', content)
+    content = DATA_URI_PATTERN.sub('', content)
+    # 图片独占一行时删除后留下的空行
+    return re.sub(r'\n[ \t]*\n(?:[ \t]*\n)+', '\n\n', content)
+
+def compact_tables(content):
+    """将HTML表格转换为紧凑的Markdown表格行，并去除Markdown表格单元格的对齐空格
+
+    合并单元格（rowspan/colspan）不展开，表格按行保留单元格文本
+    """
+    content = HTML_TABLE_PATTERN.sub(_html_table_to_rows, content)
+    lines = []
+    for line in content.splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped.startswith('|') and stripped.endswith('|'):
+            if TABLE_SEPARATOR_PATTERN.match(stripped):
+                continue
+            cells = [' '.join(cell.split()) for cell in stripped[1:-1].split('|')]
+            line = '|' + '|'.join(cells) + '|' + ('\n' if line.endswith('\n') else '')
+        lines.append(line)
+    return ''.join(lines)
+
+def _html_table_to_rows(match):
+    rows = []
+    for row in HTML_ROW_PATTERN.findall(match.group(0)):
+        cells = [
+            ' '.join(html.unescape(HTML_TAG_PATTERN.sub(' ', cell)).split())
+            for cell in HTML_CELL_PATTERN.findall(row)
+        ]
+        if any(cells):
+            rows.append('|' + '|'.join(cells) + '|')
+    return '\n'.join(rows)
+
+def truncate_references(content):
+    """省略参考文献章节中的文献条目，只保留标题、非条目内容和条目数说明
+
+    章节到下一个同级或更高级标题（如附录）为止；只有非空行中至少 REFERENCE_MIN_RATIO 像文献条目，
+    且省略的内容比说明文字更长时才省略，否则原样保留
+    """
+    lines = content.splitlines(keepends=True)
+    output = []
+    section = None
+    level = None
+    for line in lines:
+        match = HEADING_PATTERN.match(line.strip())
+        if level is not None:
+            if match and len(match.group(1)) <= level:
+                output.extend(_compact_references(section))
+                level = None
+            else:
+                section.append(line)
+                continue
+        if match and REFERENCE_HEADINGS.match(match.group(2).strip()):
+            level = len(match.group(1))
+            section = []
+        output.append(line)
+    if level is not None:
+        output.extend(_compact_references(section))
+    return ''.join(output)
+
+def _compact_references(lines):
+    """参考文献章节的内容：条目足够多且省略后更短时，只保留非条目行和条目数说明"""
+    citations = {index for index, line in enumerate(lines) if line.strip() and CITATION_PATTERN.search(line.strip())}
+    non_empty = sum(1 for line in lines if line.strip())
+    note = _reference_note(len(citations))
+    if not citations or len(citations) < non_empty * REFERENCE_MIN_RATIO:
+        return lines
+    if len(''.join(lines[index] for index in citations).encode('utf-8')) <= len(note.encode('utf-8')):
+        return lines
+    kept = [line for index, line in enumerate(lines) if line.strip() and index not in citations]
+    return kept + [note]
+
+def _reference_note(count):
+    return f"\n（参考文献共 {count} 条，已省略）\n\n"
+
+# 可用的规范化步骤，按配置的顺序依次执行
+NORMALIZE_STEPS = {
+    'dedupe_headers': dedupe_headers,
+    'strip_images': strip_images,
+    'compact_tables': compact_tables,
+    'truncate_references': truncate_references,
+}
+
+# 默认启用的步骤。dedupe_headers 按版式规则推断页眉页脚，可能误删正文中重复的短行，需显式启用
+DEFAULT_NORMALIZE_STEPS = ('strip_images', 'compact_tables', 'truncate_references')
+
+def normalize_markdown(content, steps):
+    """按顺序执行规范化步骤，返回 (规范化后的内容, 统计信息)
+
+    统计信息记录规范化前后的字节数和估算token数，以及每个步骤各自减少的字节数和token数
+    """
+    original_bytes = len(content.encode('utf-8'))
+    original_tokens = estimate_tokens(content)
+    step_stats = []
+    current_bytes, current_tokens = original_bytes, original_tokens
+    for step in steps:
+        content = NORMALIZE_STEPS[step](content)
+        step_bytes = len(content.encode('utf-8'))
+        step_tokens = estimate_tokens(content)
+        step_stats.append({
+            'step': step,
+            'bytes_saved': current_bytes - step_bytes,
+            'tokens_saved': current_tokens - step_tokens
+        })
+        current_bytes, current_tokens = step_bytes, step_tokens
+
+    stats = {
+        'original_bytes': original_bytes,
+        'normalized_bytes': current_bytes,
+        'original_tokens': original_tokens,
+        'normalized_tokens': current_tokens,
+        'reduction_ratio': round(1 - current_tokens / original_tokens, 4) if original_tokens else 0.0,
+        'steps': step_stats
+    }
+    return content, stats
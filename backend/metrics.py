@@ -0,0 +1,189 @@
+import threading
+
+# 默认延迟分桶（秒），覆盖从本地接口到长时间LLM调用的范围
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Counter:
+    """单调递增计数器"""
+
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+class Gauge(Counter):
+    """可增可减的瞬时值"""
+
+    type_name = 'gauge'
+
+    def set(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram:
+    """累积分桶直方图"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, dict(state, counts=list(state['counts']))) for key, state in self._values.items())
+        lines = []
+        for key, state in items:
+            for bound, count in zip(self.buckets, state['counts']):
+                labels = _format_labels(self.label_names, key, ('le', _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+class MetricsRegistry:
+    """指标注册表，按Prometheus文本格式输出"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, label_names=()):
+        return self.register(Counter(name, documentation, label_names))
+
+    def gauge(self, name, documentation, label_names=()):
+        return self.register(Gauge(name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+registry = MetricsRegistry()
+
+# HTTP接口
+HTTP_REQUESTS = registry.counter(
+    'noahpharm_http_requests_total', 'HTTP请求数', ('route', 'method', 'status'))
+HTTP_LATENCY = registry.histogram(
+    'noahpharm_http_request_duration_seconds', 'HTTP请求处理耗时（秒）', ('route', 'method'))
+
+# LLM调用
+LLM_REQUESTS = registry.counter(
+    'noahpharm_llm_requests_total', 'LLM调用次数', ('schema', 'model', 'provider', 'status'))
+LLM_LATENCY = registry.histogram(
+    'noahpharm_llm_request_duration_seconds', 'LLM调用耗时（秒）', ('schema', 'model', 'provider'))
+LLM_TOKENS = registry.counter(
+    'noahpharm_llm_tokens_total', 'LLM token用量', ('schema', 'model', 'type'))
+LLM_JSON_PARSE_FAILURES = registry.counter(
+    'noahpharm_llm_json_parse_failures_total', 'LLM返回内容JSON解析失败次数', ('schema',))
+LLM_JSON_REPAIRS = registry.counter(
+    'noahpharm_llm_json_repairs_total', 'LLM返回内容JSON在本地修复成功的次数', ('schema',))
+LLM_REASK_FIELDS = registry.counter(
+    'noahpharm_llm_reask_fields_total', '补充提取的字段数', ('schema', 'result'))
+LLM_CASCADE_FIELDS = registry.counter(
+    'noahpharm_llm_cascade_fields_total', '级联模式下小模型结果被采纳 / 升级到大模型的字段数', ('schema', 'field', 'result'))
+LLM_INCREMENTAL_FIELDS = registry.counter(
+    'noahpharm_llm_incremental_fields_total', '增量提取时重新提取 / 沿用上次结果的字段数', ('schema', 'result'))
+LLM_RETRIES = registry.counter(
+    'noahpharm_llm_retries_total', 'LLM调用重试次数', ('provider', 'reason'))
+LLM_LIMITER_WAIT = registry.histogram(
+    'noahpharm_llm_limiter_wait_seconds', 'LLM调用在限流器中的排队时间（秒）', ('provider',))
+LLM_CIRCUIT_OPEN = registry.gauge(
+    'noahpharm_llm_circuit_open', '服务商熔断器是否打开（1为打开）', ('provider',))
+
+# 预提取
+PREWARM_ITEMS = registry.counter(
+    'noahpharm_prewarm_items_total', '后台预提取的文献数', ('result',))
+PREWARM_TOKENS = registry.counter(
+    'noahpharm_prewarm_tokens_total', '后台预提取消耗的估算token数')
+
+# 缓存与磁盘
+CACHE_LOOKUPS = registry.counter(
+    'noahpharm_llm_cache_lookups_total', 'LLM结果缓存查询次数', ('schema', 'result'))
+LITERATURE_DUPLICATES = registry.counter(
+    'noahpharm_literature_duplicates_total', '提取时发现近似重复文献的次数', ('action',))
+MD_READ_BYTES = registry.counter(
+    'noahpharm_md_read_bytes_total', '读取MD文件的字节数')
+MD_READS = registry.counter(
+    'noahpharm_md_reads_total', '读取MD文件的次数')
+MD_NORMALIZE_SAVED_BYTES = registry.counter(
+    'noahpharm_md_normalize_saved_bytes_total', 'MD规范化各步骤减少的字节数', ('step',))
+MD_NORMALIZE_SAVED_TOKENS = registry.counter(
+    'noahpharm_md_normalize_saved_tokens_total', 'MD规范化各步骤减少的估算token数', ('step',))
+MD_NORMALIZE_LOOKUPS = registry.counter(
+    'noahpharm_md_normalize_cache_lookups_total', 'MD规范化结果缓存查询次数', ('result',))
@@ -0,0 +1,284 @@
+"""本地OpenAI兼容模拟服务
+
+用于在不访问真实服务商的情况下联调、测试和压测：支持 chat.completions 结构化输出、
+文件上传和 Batch API。返回内容按请求中的JSON Schema生成占位取值。
+可配置响应延迟、token用量和错误注入，运行中可通过 POST /_mock/settings 修改。
+
+启动: python mock_openai_server.py --port 8001
+配置: 在 .provider_env（或 NOAHPHARM_PROVIDER_ENV 指定的文件）中添加
+    [MOCK]
+    api_key = mock
+    base_url = http://localhost:8001/v1
+并设置 NOAHPHARM_LLM_PROVIDER=MOCK
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+
+from flask import Flask, jsonify, request, Response
+
+app = Flask(__name__)
+
+# 模拟服务的运行参数
+settings = {
+    'batch_delay': 1.0,
+    # chat.completions 响应延迟：固定秒数 + 每个输出token的秒数，再加上 ±jitter 比例的随机抖动
+    'latency': 0.0,
+    'latency_per_token': 0.0,
+    'latency_jitter': 0.0,
+    # 固定的token用量，0表示按内容长度估算
+    'prompt_tokens': 0,
+    'completion_tokens': 0,
+    # 按比例随机返回的错误状态码
+    'error_rate': 0.0,
+    'error_status': 503
+}
+
+# 错误注入时各状态码对应的OpenAI错误类型
+ERROR_TYPES = {
+    400: 'invalid_request_error',
+    429: 'rate_limit_exceeded',
+    500: 'server_error',
+    502: 'server_error',
+    503: 'server_error',
+    504: 'server_error'
+}
+
+stats = {
+    'requests': 0,
+    'errors_injected': 0,
+    'in_flight': 0,
+    'max_in_flight': 0
+}
+
+files = {}
+batches = {}
+lock = threading.Lock()
+
+def fill_schema(schema):
+    """按JSON Schema生成占位取值"""
+    if schema.get('type') == 'object':
+        return {field: fill_schema(sub_schema) for field, sub_schema in schema.get('properties', {}).items()}
+    return f"模拟{schema.get('description', '取值')}"
+
+def estimate_tokens(text):
+    return max(1, len(text) // 2)
+
+def build_completion(body):
+    """根据请求体生成 chat.completion 响应"""
+    response_format = body.get('response_format') or {}
+    schema = (response_format.get('json_schema') or {}).get('schema')
+    content = json.dumps(fill_schema(schema), ensure_ascii=False) if schema else '模拟回复'
+
+    prompt_tokens = settings['prompt_tokens'] or \
+        sum(estimate_tokens(message.get('content') or '') for message in body.get('messages', []))
+    completion_tokens = settings['completion_tokens'] or estimate_tokens(content)
+    return {
+        'id': f"chatcmpl-{uuid.uuid4().hex}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': body.get('model', 'mock'),
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'finish_reason': 'stop'
+        }],
+        'usage': {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+    }
+
+def store_file(content, filename, purpose):
+    file_id = f"file-{uuid.uuid4().hex}"
+    with lock:
+        files[file_id] = {
+            'id': file_id,
+            'object': 'file',
+            'bytes': len(content),
+            'created_at': int(time.time()),
+            'filename': filename,
+            'purpose': purpose,
+            'status': 'processed',
+            'content': content
+        }
+    return file_id
+
+def file_object(file_id):
+    return {key: value for key, value in files[file_id].items() if key != 'content'}
+
+def simulated_latency(completion):
+    """按配置计算本次响应的模拟延迟秒数"""
+    latency = settings['latency'] + settings['latency_per_token'] * completion['usage']['completion_tokens']
+    if settings['latency_jitter']:
+        latency *= 1 + random.uniform(-settings['latency_jitter'], settings['latency_jitter'])
+    return max(0.0, latency)
+
+@app.route('/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    with lock:
+        stats['requests'] += 1
+        stats['in_flight'] += 1
+        stats['max_in_flight'] = max(stats['max_in_flight'], stats['in_flight'])
+    try:
+        completion = build_completion(request.get_json())
+        time.sleep(simulated_latency(completion))
+
+        if settings['error_rate'] and random.random() < settings['error_rate']:
+            with lock:
+                stats['errors_injected'] += 1
+            status = settings['error_status']
+            headers = {'retry-after': '1'} if status == 429 else {}
+            return jsonify({'error': {
+                'message': f'mock injected error {status}',
+                'type': ERROR_TYPES.get(status, 'server_error'),
+                'code': None
+            }}), status, headers
+        return jsonify(completion)
+    finally:
+        with lock:
+            stats['in_flight'] -= 1
+
+@app.route('/_mock/settings', methods=['GET', 'POST'])
+def mock_settings():
+    """查看或修改模拟服务的运行参数，POST时只修改请求体中给出的参数"""
+    if request.method == 'POST':
+        updates = request.get_json() or {}
+        unknown = [key for key in updates if key not in settings]
+        if unknown:
+            return jsonify({'error': {'message': f'unknown settings: {unknown}'}}), 400
+        with lock:
+            for key, value in updates.items():
+                settings[key] = type(settings[key])(value)
+    return jsonify({'settings': settings, 'stats': stats})
+
+@app.route('/v1/files', methods=['POST'])
+def upload_file():
+    uploaded = request.files['file']
+    file_id = store_file(uploaded.read(), uploaded.filename, request.form.get('purpose', 'batch'))
+    return jsonify(file_object(file_id))
+
+@app.route('/v1/files/<file_id>', methods=['GET'])
+def get_file(file_id):
+    if file_id not in files:
+        return jsonify({'error': {'message': 'file not found'}}), 404
+    return jsonify(file_object(file_id))
+
+@app.route('/v1/files/<file_id>/content', methods=['GET'])
+def get_file_content(file_id):
+    if file_id not in files:
+        return jsonify({'error': {'message': 'file not found'}}), 404
+    return Response(files[file_id]['content'], mimetype='application/jsonl')
+
+def run_batch(batch_id):
+    """后台处理批任务：逐行生成结果并写入输出文件"""
+    time.sleep(settings['batch_delay'])
+    with lock:
+        batch = batches[batch_id]
+        if batch['status'] == 'cancelling':
+            batch['status'] = 'cancelled'
+            return
+        batch['status'] = 'in_progress'
+        batch['in_progress_at'] = int(time.time())
+        input_content = files[batch['input_file_id']]['content']
+
+    output_lines = []
+    error_lines = []
+    for line in input_content.decode('utf-8').splitlines():
+        if not line.strip():
+            continue
+        task = json.loads(line)
+        try:
+            output_lines.append(json.dumps({
+                'id': f"batch_req_{uuid.uuid4().hex}",
+                'custom_id': task['custom_id'],
+                'response': {'status_code': 200, 'body': build_completion(task['body'])},
+                'error': None
+            }, ensure_ascii=False))
+        except Exception as e:
+            error_lines.append(json.dumps({
+                'id': f"batch_req_{uuid.uuid4().hex}",
+                'custom_id': task.get('custom_id'),
+                'response': None,
+                'error': {'code': 'mock_error', 'message': str(e)}
+            }, ensure_ascii=False))
+
+    output_file_id = store_file('\n'.join(output_lines).encode('utf-8'), f"{batch_id}_output.jsonl", 'batch_output')
+    error_file_id = None
+    if error_lines:
+        error_file_id = store_file('\n'.join(error_lines).encode('utf-8'), f"{batch_id}_error.jsonl", 'batch_output')
+
+    with lock:
+        batch.update({
+            'status': 'completed',
+            'completed_at': int(time.time()),
+            'output_file_id': output_file_id,
+            'error_file_id': error_file_id,
+            'request_counts': {
+                'total': len(output_lines) + len(error_lines),
+                'completed': len(output_lines),
+                'failed': len(error_lines)
+            }
+        })
+
+@app.route('/v1/batches', methods=['POST'])
+def create_batch():
+    data = request.get_json()
+    if data.get('input_file_id') not in files:
+        return jsonify({'error': {'message': 'input file not found'}}), 400
+
+    batch_id = f"batch_{uuid.uuid4().hex}"
+    with lock:
+        batches[batch_id] = {
+            'id': batch_id,
+            'object': 'batch',
+            'endpoint': data.get('endpoint'),
+            'input_file_id': data['input_file_id'],
+            'completion_window': data.get('completion_window', '24h'),
+            'status': 'validating',
+            'created_at': int(time.time()),
+            'output_file_id': None,
+            'error_file_id': None,
+            'request_counts': {'total': 0, 'completed': 0, 'failed': 0},
+            'metadata': data.get('metadata')
+        }
+    threading.Thread(target=run_batch, args=(batch_id,), daemon=True).start()
+    return jsonify(batches[batch_id])
+
+@app.route('/v1/batches/<batch_id>', methods=['GET'])
+def get_batch(batch_id):
+    if batch_id not in batches:
+        return jsonify({'error': {'message': 'batch not found'}}), 404
+    return jsonify(batches[batch_id])
+
+@app.route('/v1/batches/<batch_id>/cancel', methods=['POST'])
+def cancel_batch(batch_id):
+    if batch_id not in batches:
+        return jsonify({'error': {'message': 'batch not found'}}), 404
+    with lock:
+        if batches[batch_id]['status'] in ('validating', 'in_progress'):
+            batches[batch_id]['status'] = 'cancelling'
+    return jsonify(batches[batch_id])
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='本地OpenAI兼容模拟服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--batch-delay', type=float, default=1.0, help='批任务开始处理前的等待秒数')
+    parser.add_argument('--latency', type=float, default=0.0, help='chat.completions 固定响应延迟秒数')
+    parser.add_argument('--latency-per-token', type=float, default=0.0, help='每个输出token增加的延迟秒数')
+    parser.add_argument('--latency-jitter', type=float, default=0.0, help='延迟随机抖动比例，如0.2表示±20%%')
+    parser.add_argument('--prompt-tokens', type=int, default=0, help='固定的输入token用量，0表示按内容估算')
+    parser.add_argument('--completion-tokens', type=int, default=0, help='固定的输出token用量，0表示按内容估算')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='随机返回错误的比例')
+    parser.add_argument('--error-status', type=int, default=503, help='注入错误的HTTP状态码')
+    args = parser.parse_args()
+
+    for key in settings:
+        settings[key] = getattr(args, key)
+    print(f"模拟OpenAI服务: http://{args.host}:{args.port}/v1")
+    app.run(host=args.host, port=args.port, threaded=True)
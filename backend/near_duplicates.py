@@ -0,0 +1,94 @@
+import hashlib
+import re
+from array import array
+
+from passage_selection import tokenize
+
+# MinHash签名长度，分为 BANDS 个区段做LSH：每段 NUM_PERM // BANDS 个值完全相同即成为候选，
+# 16段x8行时相似度约0.7以上的文献大概率成为候选，再按签名估算的相似度确认
+NUM_PERM = 128
+BANDS = 16
+
+# 以连续5个词（中文为字二元组）作为一个shingle
+SHINGLE_SIZE = 5
+
+EMPTY_BIN = (1 << 64) - 1
+
+# 临床试验注册号：中英文版本、预印本和期刊版本的文本不同，但注册号一致。
+# 注册号常紧跟中文出现（如"登记号CTR20201234"），\b 在中文和字母之间不成立，因此用前后不是字母数字界定
+REGISTRY_PATTERN = re.compile(
+    r'(?<![A-Za-z0-9])(NCT\d{8}|ChiCTR(?:-[A-Z]{2,4}-)?\d{6,}|CTR\d{8}|ISRCTN\d{8}|jRCT\d{10})(?![A-Za-z0-9])'
+    r'|(?<![A-Za-z0-9])EudraCT(?:\s*(?:No\.?|Number))?[\s:：]*(\d{4}-\d{6}-\d{2})(?![0-9])',
+    re.IGNORECASE
+)
+
+def shingles(tokens):
+    """将分词结果切分为shingle集合"""
+    if len(tokens) < SHINGLE_SIZE:
+        return {' '.join(tokens)} if tokens else set()
+    return {' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+def minhash_signature(content, num_perm=NUM_PERM):
+    """计算文献的MinHash签名"""
+    return token_signature(tokenize(content), num_perm)
+
+def token_signature(tokens, num_perm=NUM_PERM):
+    """根据分词结果计算MinHash签名，已分词时（如同时建立全文索引）避免重复分词
+
+    采用单次哈希MinHash（one permutation hashing）：每个shingle只哈希一次，按哈希值分到 num_perm 个桶中
+    各取最小值，空桶向后借用相邻非空桶的取值（densification），计算量与签名长度无关
+    """
+    bins = [EMPTY_BIN] * num_perm
+    for shingle in shingles(tokens):
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        index = value % num_perm
+        if value < bins[index]:
+            bins[index] = value
+
+    filled = [index for index, value in enumerate(bins) if value != EMPTY_BIN]
+    if not filled or len(filled) == num_perm:
+        return bins
+
+    # 从后向前找到每个空桶之后最近的非空桶（循环），借用时加上距离偏移以区分来源
+    next_filled = filled[0] + num_perm
+    for index in range(num_perm - 1, -1, -1):
+        if bins[index] != EMPTY_BIN:
+            next_filled = index
+            continue
+        distance = next_filled - index
+        bins[index] = (bins[next_filled % num_perm] + distance * 0x9E3779B97F4A7C15) & EMPTY_BIN
+    return bins
+
+def signature_similarity(signature, other):
+    """按签名中相等取值的比例估算两篇文献的Jaccard相似度"""
+    if not signature or not other:
+        return 0.0
+    return sum(1 for a, b in zip(signature, other) if a == b) / len(signature)
+
+def band_keys(signature, bands=BANDS):
+    """LSH分段键 [(段号, 键)]，空文献没有分段键"""
+    if all(value == EMPTY_BIN for value in signature):
+        return []
+    rows = len(signature) // bands
+    return [
+        (band, hashlib.blake2b(array('Q', signature[band * rows:(band + 1) * rows]).tobytes(),
+                               digest_size=8).hexdigest())
+        for band in range(bands)
+    ]
+
+def registry_key(content):
+    """文献中出现的全部注册号（排序后以逗号连接），没有时为空字符串"""
+    ids = {(match.group(1) or match.group(2)).upper() for match in REGISTRY_PATTERN.finditer(content)}
+    return ','.join(sorted(ids))
+
+def registry_ids(key):
+    """将 registry_key 拆分为注册号集合"""
+    return set(key.split(',')) if key else set()
+
+def pack_signature(signature):
+    return array('Q', signature).tobytes()
+
+def unpack_signature(data):
+    signature = array('Q')
+    signature.frombytes(data)
+    return signature.tolist()
@@ -0,0 +1,152 @@
+import math
+import re
+from collections import Counter
+
+from chunking import estimate_tokens, split_sections
+
+# 英文单词/数字，以及连续的中文字符
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+(?:[.\-][a-z0-9]+)*|[一-鿿]+')
+
+# 英文停用词，检索时忽略
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is', 'it',
+    'of', 'on', 'or', 'that', 'the', 'to', 'was', 'were', 'with'
+}
+
+# 字段检索关键词补充：schema描述均为中文，英文文献需借助英文关键词匹配
+FIELD_KEYWORDS = {
+    'company_name': 'sponsor sponsored company 申办者 申请人',
+    'company_publication_country': 'sponsor sponsored company published country countries 申办者 国家',
+    'drug_name': 'drug investigational product tablet 药物 试验药',
+    'drug_name_specification': 'drug tablet mg dose strength 规格',
+    'dosage_form': 'tablet capsule mg formulation strength 片 胶囊 规格',
+    'trial_phase': 'phase 期 single combination monotherapy 联合',
+    'study_design': 'randomized double-blind placebo controlled design arm group dose weeks non-inferiority 随机 双盲 对照 分组',
+    'primary_endpoint': 'primary endpoint outcome efficacy 主要终点',
+    'primary_secondary_endpoints': 'primary secondary endpoint outcome 终点',
+    'inclusion_criteria': 'inclusion criteria eligible patients aged 入选标准 纳入',
+    'exclusion_criteria': 'exclusion criteria excluded 排除标准',
+    'total_sample_size': 'sample size enrolled patients participants 例 样本量',
+    'sample_size': 'sample size enrolled patients participants power 例',
+    'center_count': 'centers sites multicenter 中心',
+    'first_patient_in': 'first patient enrolled enrollment date 首例 入组 日期',
+    'study_completion_date': 'completion date completed 完成 日期',
+    'confidence_interval_values': 'confidence interval ci margin cv 置信区间 界值',
+    'trial_results_conclusions': 'results conclusion reduction significant pk pd 结果 结论',
+    'reference_level': 'conclusion results limitations 结论',
+    'study_title': 'title study trial 题目',
+    'indication': 'hypertension indication patients disease 适应症',
+    'study_period': 'duration weeks months period 周期',
+    'statistical_analysis': 'statistical analysis method ancova model 统计',
+    'investigational_drug': 'dose mg once daily administration 用法 用量',
+    'concomitant_treatment': 'concomitant medication 合并用药',
+    'rescue_treatment': 'rescue medication 挽救',
+    'withdrawal_termination_criteria': 'withdrawal discontinuation termination 退出 终止',
+    'trial_process': 'visit screening run-in follow-up 流程 访视',
+}
+
+def tokenize(text):
+    """中英文混合分词：英文按单词切分并去除停用词，中文按字二元组切分"""
+    tokens = []
+    for match in TOKEN_PATTERN.findall(text.lower()):
+        if '一' <= match[0] <= '鿿':
+            if len(match) == 1:
+                tokens.append(match)
+            else:
+                tokens.extend([match[i:i + 2] for i in range(len(match) - 1)])
+        elif match not in STOPWORDS:
+            tokens.append(match)
+    return tokens
+
+def split_passages(content):
+    """按章节和空行切分段落，段落检索文本附带所属章节标题"""
+    passages = []
+    for section in split_sections(content):
+        for paragraph in re.split(r'\n\s*\n', section['text']):
+            if paragraph.strip():
+                passages.append({
+                    'index': len(passages),
+                    'heading': section['heading'],
+                    'text': paragraph
+                })
+    return passages
+
+class BM25Index:
+    """段落级BM25词法索引"""
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(tokenize(document)) for document in documents]
+        self.doc_lengths = [sum(freqs.values()) for freqs in self.term_freqs]
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+
+        doc_freqs = Counter()
+        for freqs in self.term_freqs:
+            doc_freqs.update(freqs.keys())
+        total = len(documents)
+        self.idf = {
+            term: math.log(1 + (total - freq + 0.5) / (freq + 0.5))
+            for term, freq in doc_freqs.items()
+        }
+
+    def score(self, query_tokens, doc_index):
+        freqs = self.term_freqs[doc_index]
+        length_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_index] / (self.avg_length or 1))
+        score = 0.0
+        for term in query_tokens:
+            freq = freqs.get(term)
+            if freq:
+                score += self.idf[term] * freq * (self.k1 + 1) / (freq + length_norm)
+        return score
+
+    def search(self, query, top_k):
+        """返回得分最高的 top_k 个文档序号（得分为0的不返回）"""
+        query_tokens = set(tokenize(query))
+        scored = [(self.score(query_tokens, index), index) for index in range(len(self.term_freqs))]
+        scored = [item for item in scored if item[0] > 0]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [index for _, index in scored[:top_k]]
+
+def iter_field_queries(schema, path=''):
+    """遍历schema中的叶子字段，生成 (字段路径, 检索语句)"""
+    for field, field_schema in schema['properties'].items():
+        field_path = f"{path}.{field}" if path else field
+        if field_schema.get('type') == 'object':
+            yield from iter_field_queries(field_schema, field_path)
+            continue
+        query = ' '.join([
+            field_schema.get('description', ''),
+            field.replace('_', ' '),
+            FIELD_KEYWORDS.get(field, '')
+        ])
+        yield field_path, query
+
+def select_passages(content, schema, top_k=3, lead_passages=2):
+    """为schema中每个字段选取最相关的 top_k 个段落，按原文顺序拼接
+
+    文献开头的 lead_passages 个段落（通常为题目、申办者等）始终保留。
+    返回 (精简后的内容, 统计信息)
+    """
+    passages = split_passages(content)
+    index = BM25Index([f"{passage['heading']}\n{passage['text']}" for passage in passages])
+
+    selected = set(range(min(lead_passages, len(passages))))
+    field_passages = {}
+    for field_path, query in iter_field_queries(schema):
+        hits = index.search(query, top_k)
+        field_passages[field_path] = hits
+        selected.update(hits)
+
+    selected_content = '\n\n'.join(passages[i]['text'].strip() for i in sorted(selected))
+    original_tokens = estimate_tokens(content)
+    selected_tokens = estimate_tokens(selected_content)
+    stats = {
+        'passage_count': len(passages),
+        'selected_passage_count': len(selected),
+        'original_tokens': original_tokens,
+        'selected_tokens': selected_tokens,
+        'reduction_ratio': round(1 - selected_tokens / original_tokens, 4) if original_tokens else 0.0,
+        'field_passages': field_passages
+    }
+    return selected_content, stats
@@ -0,0 +1,206 @@
+import logging
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+class PrewarmWorker:
+    """空闲时预先提取新增或变化文献的后台线程
+
+    每隔 scan_interval 秒增量更新文献目录，找出当前MD内容尚无提取结果或方案摘要的文献（新增的优先），
+    在没有用户请求且没有进行中的LLM调用时逐篇调用 process_item 提取，结果写入LLM缓存和目录库，
+    之后用户发起的提取直接命中缓存。每个 budget_window 秒内最多消耗 token_budget：
+    提取前按估算token数预留，提取后按 measure_usage 统计的实际用量（含重试、级联和补充提取）结算
+    """
+
+    def __init__(self, catalog, section_schemas, process_item, is_busy, token_budget, budget_window=86400,
+                 scan_interval=300, idle_seconds=60, completion_reserve=2000, poll_interval=5,
+                 measure_usage=None):
+        self.catalog = catalog
+        # {区域名称: [需要预先提取的schema名称]}
+        self.section_schemas = section_schemas
+        self.process_item = process_item
+        self.is_busy = is_busy
+        self.token_budget = token_budget
+        self.budget_window = budget_window
+        self.scan_interval = scan_interval
+        self.idle_seconds = idle_seconds
+        self.completion_reserve = completion_reserve
+        self.poll_interval = poll_interval
+        # 返回用量计量器的上下文管理器（见 llm_service.measure_usage），未设置时按估算token数计入预算
+        self.measure_usage = measure_usage
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._queue = []
+        # 提取失败的 (MD文件路径, 内容哈希)，内容变化前不再重试，避免反复消耗预算
+        self._failed = set()
+        self.last_activity = 0.0
+        self.window_start = time.time()
+        self.spent_tokens = 0
+        self.processed = 0
+        self.errors = 0
+        self.last_scan = None
+        self.last_item = None
+
+    def start(self):
+        """启动后台线程"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='prewarm-worker', daemon=True)
+            self._thread.start()
+        logger.info(f"预提取已启动，每 {self.budget_window} 秒token预算 {self.token_budget}")
+
+    def shutdown(self, wait=True):
+        """停止后台线程，正在处理的文献完成后退出"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        self._stop.set()
+        if thread is not None and wait:
+            thread.join()
+
+    def notify_activity(self):
+        """记录用户请求时间，请求结束 idle_seconds 秒后才继续预提取"""
+        self.last_activity = time.time()
+
+    def idle(self):
+        return time.time() - self.last_activity >= self.idle_seconds and not self.is_busy()
+
+    def _run(self):
+        next_scan = 0.0
+        while not self._stop.is_set():
+            try:
+                if time.time() >= next_scan:
+                    self._scan()
+                    next_scan = time.time() + self.scan_interval
+                if self._process_next():
+                    continue
+            except Exception as e:
+                logger.error(f"预提取出错: {str(e)}")
+            self._stop.wait(self.poll_interval)
+
+    def _scan(self):
+        """增量更新文献目录并重新生成待提取队列"""
+        self.catalog.refresh()
+        queue = []
+        for section_name, schema_names in self.section_schemas.items():
+            for entry in self.catalog.pending_extractions(section_name, schema_names):
+                if (entry['md_file_path'], entry['content_hash']) not in self._failed:
+                    queue.append(entry)
+        queue.sort(key=lambda entry: entry['indexed_at'], reverse=True)
+        with self._lock:
+            self._queue = queue
+            self.last_scan = time.time()
+        if queue:
+            logger.info(f"预提取队列: {len(queue)} 篇文献待提取")
+
+    def _reserve(self, tokens):
+        """在当前预算周期内预留token，超出预算时返回None，否则返回预留所在周期的开始时间"""
+        with self._lock:
+            now = time.time()
+            if now - self.window_start >= self.budget_window:
+                self.window_start = now
+                self.spent_tokens = 0
+            if self.spent_tokens + tokens > self.token_budget:
+                return None
+            self.spent_tokens += tokens
+            return self.window_start
+
+    def _settle(self, window_start, reserved, actual):
+        """用实际用量替换预留的token数；提取期间预算周期已重置时实际用量计入新周期"""
+        with self._lock:
+            if self.window_start == window_start:
+                self.spent_tokens += actual - reserved
+            else:
+                self.spent_tokens += actual
+        metrics.PREWARM_TOKENS.inc(actual)
+
+    def _run_item(self, item, reserved):
+        """提取一篇文献，返回 (错误信息, 实际消耗的token数)
+
+        响应中没有 usage 的调用无法计量，此时至少按预留的估算token数计入
+        """
+        if self.measure_usage is None:
+            return self._call_process_item(item), reserved
+        with self.measure_usage() as meter:
+            error = self._call_process_item(item)
+        actual = meter.total_tokens
+        if meter.unreported_calls:
+            actual = max(actual, reserved)
+        return error, actual
+
+    def _call_process_item(self, item):
+        try:
+            result = self.process_item(item)
+            return result.get('error') if result is not None else '不支持的文献类型'
+        except Exception as e:
+            return str(e)
+
+    def _process_next(self):
+        """空闲且预算充足时提取队列中的下一篇文献，返回是否处理了文献"""
+        with self._lock:
+            entry = self._queue[0] if self._queue else None
+        if entry is None or not self.idle():
+            return False
+        tokens = (entry['estimated_tokens'] or 0) + self.completion_reserve
+        if tokens > self.token_budget:
+            # 单篇即超出整个预算的文献不预提取，留待用户按需提取
+            with self._lock:
+                self._queue.pop(0)
+                self._failed.add((entry['md_file_path'], entry['content_hash']))
+            metrics.PREWARM_ITEMS.inc(result='skipped')
+            return True
+        window_start = self._reserve(tokens)
+        if window_start is None:
+            return False
+
+        with self._lock:
+            self._queue.pop(0)
+        item = f"{entry['section_name']}/{entry['literature_name']}"
+        start_time = time.time()
+        error, actual = self._run_item(item, tokens)
+        self._settle(window_start, tokens, actual)
+        if actual > tokens:
+            logger.warning(f"预提取 {item} 实际消耗 {actual} tokens，超过预留的 {tokens} tokens")
+
+        with self._lock:
+            self.last_item = {
+                'item': item,
+                'error': error,
+                'reserved_tokens': tokens,
+                'tokens': actual,
+                'elapsed_ms': round((time.time() - start_time) * 1000, 1),
+                'finished_at': time.time()
+            }
+            if error:
+                self.errors += 1
+                self._failed.add((entry['md_file_path'], entry['content_hash']))
+            else:
+                self.processed += 1
+        metrics.PREWARM_ITEMS.inc(result='error' if error else 'done')
+        if error:
+            logger.warning(f"预提取 {item} 失败: {error}")
+        else:
+            logger.info(f"预提取 {item} 完成")
+        return True
+
+    def snapshot(self):
+        with self._lock:
+            window_remaining = max(0.0, self.budget_window - (time.time() - self.window_start))
+            return {
+                'running': self._thread is not None,
+                'idle': self.idle(),
+                'queued': len(self._queue),
+                'processed': self.processed,
+                'errors': self.errors,
+                'token_budget': self.token_budget,
+                'spent_tokens': self.spent_tokens,
+                'budget_resets_in_seconds': round(window_remaining, 1),
+                'last_scan': self.last_scan,
+                'last_item': self.last_item
+            }
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import random
+import threading
+
+import openai
+
+from config import config
+import rate_limit
+
+logger = logging.getLogger(__name__)
+
+# 延迟和错误率的指数滑动平均系数
+EWMA_ALPHA = 0.2
+
+class Provider:
+    """服务商连接池中的单个服务商：独立的客户端、并发上限、限流器、熔断器和健康统计"""
+
+    def __init__(self, name, default_model):
+        llm_config = config.get_llm_config(name)
+        self.name = name
+        self.api_key = llm_config['api_key']
+        self.base_url = llm_config['base_url']
+        self.model = config.get_provider_setting(name, 'model', default_model)
+        self.weight = config.get_provider_setting(name, 'weight', 1.0, float)
+        self.max_concurrency = config.get_provider_setting(name, 'max_concurrency', 8, int)
+
+        self.limiter = rate_limit.get_limiter(
+            name,
+            rpm=config.get_provider_setting(name, 'rpm', 0, int),
+            tpm=config.get_provider_setting(name, 'tpm', 0, int)
+        )
+        self.breaker = rate_limit.get_breaker(
+            name,
+            failure_threshold=config.get_provider_setting(name, 'circuit_failure_threshold', 5, int),
+            recovery_seconds=config.get_provider_setting(name, 'circuit_recovery_seconds', 30, float)
+        )
+
+        self.client = None
+        self.async_client = None
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.ewma_latency = None
+        self.ewma_error_rate = 0.0
+
+    def get_client(self):
+        """获取服务商的OpenAI客户端，每个服务商各自维护keep-alive连接池"""
+        if self.client is None:
+            try:
+                self.client = openai.OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+            except Exception as e:
+                logger.error(f"无法初始化服务商 {self.name} 的OpenAI客户端: {str(e)}")
+                raise Exception(f"服务商 {self.name} 客户端初始化失败，请检查API配置和网络连接")
+        return self.client
+
+    def get_async_client(self):
+        """获取服务商的AsyncOpenAI客户端，所有协程共享同一个keep-alive连接池
+
+        需在事件循环中调用，客户端与创建时的事件循环绑定
+        """
+        if self.async_client is None:
+            try:
+                self.async_client = openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+            except Exception as e:
+                logger.error(f"无法初始化服务商 {self.name} 的异步OpenAI客户端: {str(e)}")
+                raise Exception(f"服务商 {self.name} 异步客户端初始化失败，请检查API配置和网络连接")
+        return self.async_client
+
+    def accepting(self):
+        """熔断器未打开或已过冷却期（可放行试探请求）"""
+        circuit = self.breaker.snapshot()
+        return circuit['state'] != rate_limit.CircuitBreaker.OPEN or circuit['retry_in_seconds'] <= 0
+
+    def score(self):
+        """路由评分：权重越高、延迟越低、错误率越低、当前负载越低，得分越高"""
+        latency = self.ewma_latency if self.ewma_latency is not None else 1.0
+        load = 1 + self.in_flight / self.max_concurrency
+        return self.weight * (1 - self.ewma_error_rate) ** 2 / ((latency + 0.1) * load)
+
+    def snapshot(self):
+        return {
+            'model': self.model,
+            'weight': self.weight,
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'failures': self.failures,
+            'ewma_latency_seconds': round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+            'ewma_error_rate': round(self.ewma_error_rate, 4),
+            'score': round(self.score(), 4),
+            'circuit': self.breaker.snapshot()
+        }
+
+class ProviderPool:
+    """多服务商负载均衡
+
+    按评分加权随机选择可用服务商（未熔断且未达并发上限），调用失败后优先切换到其他服务商
+    """
+
+    def __init__(self, provider_names, default_model):
+        if not provider_names:
+            raise ValueError("服务商列表为空")
+        self.providers = [Provider(name, default_model) for name in provider_names]
+        self._condition = threading.Condition()
+
+    @property
+    def primary(self):
+        """列表中的第一个服务商，用于Batch API等只能使用单一服务商的场景"""
+        return self.providers[0]
+
+    def acquire(self, exclude=(), block=True):
+        """选择并占用一个服务商的并发名额
+
+        优先在 exclude 之外的服务商中按评分加权随机选择，没有时再考虑 exclude 中的服务商；
+        全部熔断时抛出CircuitOpenError，全部达到并发上限或处于熔断试探中时等待，
+        block=False 时不等待而是返回None
+        """
+        with self._condition:
+            while True:
+                usable = [provider for provider in self.providers if provider.accepting()]
+                if not usable:
+                    raise rate_limit.CircuitOpenError("所有服务商均处于熔断状态，请稍后重试")
+
+                ready = [provider for provider in usable if provider.in_flight < provider.max_concurrency]
+                preferred = [provider for provider in ready if provider.name not in exclude]
+                others = [provider for provider in ready if provider.name in exclude]
+                for group in (preferred, others):
+                    while group:
+                        provider = random.choices(group, weights=[max(p.score(), 1e-6) for p in group])[0]
+                        try:
+                            provider.breaker.before_call()
+                        except rate_limit.CircuitOpenError:
+                            group.remove(provider)
+                            continue
+                        provider.in_flight += 1
+                        return provider
+                if not block:
+                    return None
+                self._condition.wait(timeout=0.5)
+
+    async def acquire_async(self, exclude=()):
+        """acquire 的异步版本，没有可用名额时让出事件循环后重试"""
+        delay = 0.01
+        while True:
+            provider = self.acquire(exclude, block=False)
+            if provider is not None:
+                return provider
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.2)
+
+    def release(self, provider, latency=None, success=True, record=True):
+        """释放并发名额并更新健康统计，record=False 时只释放名额"""
+        with self._condition:
+            provider.in_flight -= 1
+            if not record:
+                self._condition.notify_all()
+                return
+            provider.requests += 1
+            if not success:
+                provider.failures += 1
+            provider.ewma_error_rate = (1 - EWMA_ALPHA) * provider.ewma_error_rate + EWMA_ALPHA * (0 if success else 1)
+            if latency is not None and success:
+                provider.ewma_latency = latency if provider.ewma_latency is None else \
+                    (1 - EWMA_ALPHA) * provider.ewma_latency + EWMA_ALPHA * latency
+            self._condition.notify_all()
+
+    def has_alternative(self, exclude):
+        """exclude 之外是否还有未熔断的服务商可供切换"""
+        return any(provider.name not in exclude and provider.accepting() for provider in self.providers)
+
+    async def aclose(self):
+        """关闭所有异步客户端"""
+        for provider in self.providers:
+            if provider.async_client is not None:
+                await provider.async_client.close()
+                provider.async_client = None
+
+    def snapshot(self):
+        with self._condition:
+            return {provider.name: provider.snapshot() for provider in self.providers}
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+
+import openai
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，调用被拒绝"""
+
+class TokenBucket:
+    """令牌桶：以固定速率补充令牌，容量为每分钟配额"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount, now):
+        """获取amount个令牌还需等待的秒数（调用方需持有锁）"""
+        self._refill(now)
+        # 单次请求超过桶容量时按满桶处理，避免永远等待
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        """扣除令牌，amount为负数时返还（调用方需持有锁）"""
+        self.tokens = min(self.capacity, self.tokens - min(amount, self.capacity))
+
+class RateLimiter:
+    """按请求数(RPM)和token数(TPM)限流的进程级限流器
+
+    rpm或tpm为0时不限制对应维度。同一服务商的所有调用共享一个实例
+    """
+
+    def __init__(self, name, rpm=0, tpm=0):
+        self.name = name
+        self.request_bucket = TokenBucket(rpm) if rpm else None
+        self.token_bucket = TokenBucket(tpm) if tpm else None
+        self.waiting = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.acquired = 0
+        self._condition = threading.Condition()
+
+    def _try_consume(self, estimated_tokens):
+        """配额满足时扣除并返回0，否则返回还需等待的秒数（调用方需持有锁）"""
+        now = time.monotonic()
+        wait = 0.0
+        if self.request_bucket:
+            wait = max(wait, self.request_bucket.wait_time(1, now))
+        if self.token_bucket:
+            wait = max(wait, self.token_bucket.wait_time(estimated_tokens, now))
+        if wait > 0:
+            return wait
+        
+        if self.request_bucket:
+            self.request_bucket.consume(1)
+        if self.token_bucket:
+            self.token_bucket.consume(estimated_tokens)
+        return 0.0
+
+    def _record_wait(self, waited):
+        """记录排队时间（调用方需持有锁）"""
+        self.acquired += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def acquire(self, estimated_tokens):
+        """阻塞直到请求数和token配额都满足，返回排队等待的秒数"""
+        start = time.monotonic()
+        with self._condition:
+            self.waiting += 1
+            try:
+                while True:
+                    wait = self._try_consume(estimated_tokens)
+                    if wait <= 0:
+                        break
+                    self._condition.wait(timeout=wait)
+            finally:
+                self.waiting -= 1
+            
+            waited = time.monotonic() - start
+            self._record_wait(waited)
+        
+        metrics.LLM_LIMITER_WAIT.observe(waited, provider=self.name)
+        return waited
+
+    async def acquire_async(self, estimated_tokens):
+        """acquire 的异步版本，排队期间让出事件循环"""
+        start = time.monotonic()
+        with self._condition:
+            self.waiting += 1
+        try:
+            while True:
+                with self._condition:
+                    wait = self._try_consume(estimated_tokens)
+                if wait <= 0:
+                    break
+                # 配额可能因用量修正提前恢复，等待时间设上限
+                await asyncio.sleep(min(wait, 1.0))
+        finally:
+            with self._condition:
+                self.waiting -= 1
+        
+        waited = time.monotonic() - start
+        with self._condition:
+            self._record_wait(waited)
+        metrics.LLM_LIMITER_WAIT.observe(waited, provider=self.name)
+        return waited
+
+    def adjust(self, token_delta):
+        """按实际token用量修正预估值，正数追加扣除，负数返还"""
+        if not self.token_bucket or not token_delta:
+            return
+        with self._condition:
+            self.token_bucket.consume(token_delta)
+            self._condition.notify_all()
+
+    def state(self):
+        with self._condition:
+            now = time.monotonic()
+            state = {
+                'waiting': self.waiting,
+                'acquired': self.acquired,
+                'avg_wait_seconds': round(self.total_wait_seconds / self.acquired, 4) if self.acquired else 0.0,
+                'max_wait_seconds': round(self.max_wait_seconds, 4)
+            }
+            for key, bucket in (('requests', self.request_bucket), ('tokens', self.token_bucket)):
+                if bucket:
+                    bucket._refill(now)
+                    state[key] = {'per_minute': bucket.capacity, 'available': round(bucket.tokens, 1)}
+            return state
+
+class CircuitBreaker:
+    """熔断器：连续失败达到阈值后打开，冷却期后放行一次试探请求"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, recovery_seconds=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """调用前检查，熔断打开时抛出CircuitOpenError"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.recovery_seconds:
+                    raise CircuitOpenError(f"服务商 {self.name} 熔断中，请稍后重试")
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    raise CircuitOpenError(f"服务商 {self.name} 熔断恢复试探中，请稍后重试")
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"服务商 {self.name} 连续失败 {self.consecutive_failures} 次，熔断打开")
+                self.opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+    def release_trial(self):
+        """调用被取消时释放试探名额，不改变熔断状态"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def _set_state(self, state):
+        self.state = state
+        metrics.LLM_CIRCUIT_OPEN.set(1 if state == self.OPEN else 0, provider=self.name)
+
+    def snapshot(self):
+        with self._lock:
+            snapshot = {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures
+            }
+            if self.state == self.OPEN:
+                snapshot['retry_in_seconds'] = round(
+                    max(0.0, self.recovery_seconds - (time.monotonic() - self.opened_at)), 1
+                )
+            return snapshot
+
+def is_retryable(error):
+    """429、5xx、超时和连接错误可以重试"""
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError,
+                          openai.InternalServerError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409) or error.status_code >= 500
+    return False
+
+def get_retry_after(error):
+    """读取响应头中的 Retry-After / retry-after-ms（秒），没有时返回None"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+def backoff_delay(attempt, base, maximum, retry_after=None):
+    """带完全抖动的指数退避；服务商给出Retry-After时以其为下限"""
+    delay = random.uniform(0, min(maximum, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, maximum))
+    return delay
+
+limiters = {}
+breakers = {}
+registry_lock = threading.Lock()
+
+def get_limiter(provider, rpm=0, tpm=0):
+    """获取服务商的进程级限流器"""
+    with registry_lock:
+        if provider not in limiters:
+            limiters[provider] = RateLimiter(provider, rpm, tpm)
+        return limiters[provider]
+
+def get_breaker(provider, failure_threshold=5, recovery_seconds=30):
+    """获取服务商的熔断器"""
+    with registry_lock:
+        if provider not in breakers:
+            breakers[provider] = CircuitBreaker(provider, failure_threshold, recovery_seconds)
+        return breakers[provider]
+
+def snapshot():
+    """所有服务商的限流和熔断状态"""
+    with registry_lock:
+        providers = sorted(set(limiters) | set(breakers))
+        return {
+            provider: {
+                'limiter': limiters[provider].state() if provider in limiters else None,
+                'circuit': breakers[provider].snapshot() if provider in breakers else None
+            }
+            for provider in providers
+        }
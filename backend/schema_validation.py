@@ -0,0 +1,155 @@
+import json
+import re
+
+# 需要补充提取的取值；"未提及"表示文献中确实没有，不再追问
+REASK_VALUES = ('', '信息不明确')
+
+# 字段缺失且补充提取仍未得到结果时的占位取值
+MISSING_VALUE = '信息不明确'
+
+# 模型有时会把JSON包在Markdown代码块中
+CODE_FENCE_PATTERN = re.compile(r'^```(?:json)?\s*(.*?)\s*(?:```)?$', re.DOTALL)
+
+def close_truncated_json(text):
+    """截断到最后一个完整的成员处并补齐未闭合的括号
+
+    未写完的字段整体丢弃（而不是保留半截取值），之后按缺失字段补充提取
+    """
+    stack = []
+    in_string = escape = string_is_key = False
+    expect_key = False
+    safe = None
+    for index, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+                if not string_is_key:
+                    safe = (index + 1, tuple(stack))
+            continue
+
+        if char == '"':
+            in_string = True
+            string_is_key = bool(stack) and stack[-1] == '{' and expect_key
+        elif char in '{[':
+            stack.append(char)
+            expect_key = char == '{'
+            safe = (index + 1, tuple(stack))
+        elif char in '}]':
+            if stack:
+                stack.pop()
+            expect_key = False
+            safe = (index + 1, tuple(stack))
+            if not stack:
+                return text[:index + 1]
+        elif char == ',':
+            expect_key = bool(stack) and stack[-1] == '{'
+            safe = (index, tuple(stack))
+        elif char == ':':
+            expect_key = False
+
+    if safe is None:
+        raise json.JSONDecodeError('无法修复的JSON', text, 0)
+    cut, open_stack = safe
+    repaired = text[:cut].rstrip().rstrip(',')
+    return repaired + ''.join('}' if bracket == '{' else ']' for bracket in reversed(open_stack))
+
+def repair_json(content):
+    """修复LLM返回的不完整JSON：去除代码块标记和前后多余文字，补齐被截断的结构
+
+    无法修复时抛出 json.JSONDecodeError
+    """
+    text = content.strip()
+    fence = CODE_FENCE_PATTERN.match(text)
+    if fence:
+        text = fence.group(1)
+    start = text.find('{')
+    if start < 0:
+        raise json.JSONDecodeError('返回内容中没有JSON对象', content, 0)
+    text = text[start:]
+
+    try:
+        # 完整对象之后还有多余文字
+        return json.JSONDecoder().raw_decode(text)[0]
+    except json.JSONDecodeError:
+        pass
+    return json.loads(close_truncated_json(text))
+
+def iter_leaf_fields(schema, path=''):
+    """遍历schema中的叶子字段，生成 (字段路径, 字段schema)"""
+    for field, field_schema in schema['properties'].items():
+        field_path = f"{path}.{field}" if path else field
+        if field_schema.get('type') == 'object':
+            yield from iter_leaf_fields(field_schema, field_path)
+        else:
+            yield field_path, field_schema
+
+def validate_result(result, schema):
+    """按schema校验并规范化提取结果
+
+    缺失或类型不符的字段填入占位取值，数字等标量转为字符串，丢弃schema之外的字段
+    （以 _ 开头的元信息除外）。返回 (规范化结果, {字段路径: 问题})，
+    问题为 missing（缺失）、type（类型不符）或 unclear（为空或"信息不明确"）
+    """
+    problems = {}
+
+    def check(value, sub_schema, path):
+        value = value if isinstance(value, dict) else {}
+        normalized = {}
+        for field, field_schema in sub_schema['properties'].items():
+            field_path = f"{path}.{field}" if path else field
+            field_value = value.get(field)
+
+            if field_schema.get('type') == 'object':
+                if field_value is not None and not isinstance(field_value, dict):
+                    problems.update({nested: 'type' for nested, _ in iter_leaf_fields(field_schema, field_path)})
+                normalized[field] = check(field_value, field_schema, field_path)
+                continue
+
+            if field_value is None:
+                problems[field_path] = 'missing'
+                normalized[field] = MISSING_VALUE
+            elif isinstance(field_value, list):
+                normalized[field] = '；'.join(str(item) for item in field_value)
+            elif isinstance(field_value, dict):
+                problems[field_path] = 'type'
+                normalized[field] = MISSING_VALUE
+            else:
+                normalized[field] = str(field_value).strip()
+
+            if field_path not in problems and normalized[field] in REASK_VALUES:
+                problems[field_path] = 'unclear'
+                normalized[field] = normalized[field] or MISSING_VALUE
+        return normalized
+
+    normalized = check(result, schema, '')
+    if isinstance(result, dict):
+        normalized.update({key: value for key, value in result.items() if key.startswith('_')})
+    return normalized, problems
+
+def field_subschema(schema, field_paths):
+    """只保留指定字段路径的schema，嵌套对象中未涉及的字段一并去除"""
+    properties = {}
+    for field, field_schema in schema['properties'].items():
+        if field_schema.get('type') == 'object':
+            nested = [path[len(field) + 1:] for path in field_paths if path.startswith(f"{field}.")]
+            if nested:
+                properties[field] = field_subschema(field_schema, nested)
+        elif field in field_paths:
+            properties[field] = field_schema
+    return dict(schema, properties=properties, required=list(properties))
+
+def get_field(result, field_path):
+    value = result
+    for key in field_path.split('.'):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+def set_field(result, field_path, value):
+    keys = field_path.split('.')
+    for key in keys[:-1]:
+        result = result.setdefault(key, {})
+    result[keys[-1]] = value
@@ -0,0 +1,43 @@
+"""生产环境启动脚本
+
+使用 uvicorn 运行 asgi.py 中的应用：单进程内以协程承载大量等待LLM响应的请求，
+超过 max_connections 的并发连接直接返回503以限制内存占用。
+收到 SIGINT/SIGTERM 后停止接收新连接，等待进行中的请求完成（最长 graceful_timeout 秒），
+再停止后台任务并关闭LLM连接池。
+
+启动: python serve.py --port 5000
+"""
+import argparse
+import logging
+
+import uvicorn
+
+from config import config
+
+def main():
+    parser = argparse.ArgumentParser(description='文件系统API服务（ASGI）')
+    parser.add_argument('--host', default=config.get_setting('server_host', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=config.get_setting('server_port', 5000, int))
+    parser.add_argument('--max-connections', type=int,
+                        default=config.get_setting('server_max_connections', 1000, int),
+                        help='同时处理的最大连接数，超出时返回503')
+    parser.add_argument('--graceful-timeout', type=float,
+                        default=config.get_setting('server_graceful_timeout', 120, float),
+                        help='关闭时等待进行中请求完成的最长秒数')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(f"启动文件系统API服务（ASGI）: http://{args.host}:{args.port}")
+    server = uvicorn.Server(uvicorn.Config(
+        'asgi:application',
+        host=args.host,
+        port=args.port,
+        limit_concurrency=args.max_connections,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        timeout_keep_alive=30,
+        lifespan='on'
+    ))
+    server.run()
+
+if __name__ == '__main__':
+    main()
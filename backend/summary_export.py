@@ -0,0 +1,182 @@
+import io
+import multiprocessing
+import re
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+DOCX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+def add_summary_content(doc, summary, title='关键文献方案摘要'):
+    """将一份方案摘要写入Word文档"""
+    # 添加标题
+    doc.add_heading(title, 0)
+
+    # 添加基本信息表格
+    basic_info = [
+        ('研究题目', summary.get('study_title', '')),
+        ('申办者', summary.get('sponsor', '')),
+        ('方案编号', summary.get('protocol_number', '')),
+        ('组长单位/主要研究者', summary.get('principal_investigator', '')),
+        ('试验药物名称及规格', summary.get('drug_name_specification', '')),
+        ('适应症', summary.get('indication', '')),
+        ('试验分期', summary.get('trial_phase', '')),
+        ('研究中心数', summary.get('center_count', '')),
+        ('研究周期', summary.get('study_period', ''))
+    ]
+
+    table = doc.add_table(rows=len(basic_info), cols=2)
+    table.style = 'Table Grid'
+
+    for i, (label, value) in enumerate(basic_info):
+        table.cell(i, 0).text = label
+        table.cell(i, 1).text = value
+
+    # 添加研究目的
+    doc.add_heading('研究目的', level=1)
+    objectives = summary.get('study_objectives', {})
+    doc.add_paragraph(f"主要目的: {objectives.get('primary_objective', '')}")
+    doc.add_paragraph(f"次要目的: {objectives.get('secondary_objective', '')}")
+
+    # 添加疗效指标
+    doc.add_heading('疗效指标', level=1)
+    endpoints = summary.get('efficacy_endpoints', {})
+    doc.add_paragraph(f"主要终点: {endpoints.get('primary_endpoint', '')}")
+    doc.add_paragraph(f"次要终点: {endpoints.get('secondary_endpoint', '')}")
+    doc.add_paragraph(f"探索性终点: {endpoints.get('exploratory_endpoint', '')}")
+    doc.add_paragraph(f"安全性评价: {endpoints.get('safety_evaluation', '')}")
+
+    # 添加试验设计
+    doc.add_heading('试验设计', level=1)
+    design = summary.get('trial_design', {})
+    doc.add_paragraph(f"研究人群选择及导入期设计依据: {design.get('study_population_selection', '')}")
+    doc.add_paragraph(f"阳性对照药品选择及依据: {design.get('positive_control_selection', '')}")
+    doc.add_paragraph(f"主要疗效终点的选择及依据: {design.get('primary_endpoint_selection', '')}")
+
+    # 添加其他信息
+    other_info = [
+        ('试验流程', summary.get('trial_process', '')),
+        ('样本量', summary.get('sample_size', '')),
+        ('试验用药品，规格，用法用量', summary.get('investigational_drug', '')),
+        ('合并治疗', summary.get('concomitant_treatment', '')),
+        ('挽救治疗', summary.get('rescue_treatment', '')),
+        ('入排标准', summary.get('inclusion_exclusion_criteria', '')),
+        ('退出和中止/终止标准', summary.get('withdrawal_termination_criteria', '')),
+        ('统计分析', summary.get('statistical_analysis', ''))
+    ]
+
+    for label, value in other_info:
+        doc.add_heading(label, level=1)
+        doc.add_paragraph(value)
+
+def save_document(doc):
+    """将文档保存到内存并返回字节内容，不产生临时文件"""
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+def render_summary_docx(summary):
+    """渲染单份方案摘要为DOCX字节内容"""
+    from docx import Document
+
+    doc = Document()
+    add_summary_content(doc, summary)
+    return save_document(doc)
+
+def render_combined_docx(summaries):
+    """将多份方案摘要渲染到同一个DOCX中，每份摘要从新的一页开始"""
+    from docx import Document
+
+    doc = Document()
+    for index, summary in enumerate(summaries):
+        if index > 0:
+            doc.add_page_break()
+        add_summary_content(doc, summary, title=summary_title(summary, index))
+    return save_document(doc)
+
+def summary_title(summary, index):
+    """合并导出时每份摘要的标题"""
+    name = summary.get('literature_name') or summary.get('study_title') or '关键文献方案摘要'
+    return f"{index + 1}. {name}"
+
+def summary_filename(summary, index):
+    """ZIP中每份摘要的文件名，去除文件名中不允许的字符"""
+    name = summary.get('literature_name') or summary.get('study_title') or '方案摘要'
+    name = re.sub(r'[\\/:*?"<>|\r\n\t]', '_', name).strip()[:80] or '方案摘要'
+    return f"{index + 1:03d}_{name}.docx"
+
+class StreamBuffer(io.RawIOBase):
+    """只追加的写缓冲区，供zipfile写入后按块取出，ZIP不需要完整驻留内存"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def iter_summary_zip(summaries, executor, window):
+    """按顺序逐个写入ZIP并输出已生成的字节块
+
+    各份摘要在进程池中并行渲染，同时在渲染中的摘要不超过 window 份，内存占用与总数无关；
+    已渲染完成的摘要按顺序写入ZIP并立即输出，客户端断开时取消尚未开始的渲染
+    """
+    buffer = StreamBuffer()
+    pending = deque()
+    remaining = iter(enumerate(summaries))
+
+    def fill():
+        while len(pending) < window:
+            try:
+                index, summary = next(remaining)
+            except StopIteration:
+                return
+            pending.append((index, summary, executor.submit(render_summary_docx, summary)))
+
+    try:
+        # DOCX本身已压缩，ZIP中直接存储
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+            fill()
+            while pending:
+                index, summary, future = pending.popleft()
+                archive.writestr(summary_filename(summary, index), future.result())
+                fill()
+                yield buffer.drain()
+        yield buffer.drain()
+    finally:
+        for _, _, future in pending:
+            future.cancel()
+
+render_pool = None
+render_pool_lock = threading.Lock()
+
+def get_render_pool(max_workers):
+    """获取渲染DOCX的进程池，首次使用时创建"""
+    global render_pool
+    with render_pool_lock:
+        if render_pool is None:
+            # 服务进程已有多个线程，使用spawn避免fork时复制持有中的锁
+            render_pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+        return render_pool
+
+def shutdown_render_pool():
+    """关闭渲染进程池"""
+    global render_pool
+    with render_pool_lock:
+        pool, render_pool = render_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,32 @@
+import json
+import os
+import uuid
+
+from batch_extraction import BatchExtractionManager, is_valid_batch_id
+
+
+def test_batch_id_format():
+    assert is_valid_batch_id(uuid.uuid4().hex)
+    assert not is_valid_batch_id('..')
+    assert not is_valid_batch_id('../outside')
+    assert not is_valid_batch_id(uuid.uuid4().hex.upper())
+    assert not is_valid_batch_id(None)
+
+
+def test_manifest_outside_batch_dir_is_not_read(tmp_path):
+    batch_dir = tmp_path / 'batches'
+    manager = BatchExtractionManager(None, None, str(batch_dir))
+    with open(tmp_path / 'manifest.json', 'w', encoding='utf-8') as f:
+        json.dump({'batch_id': '..', 'remote_batch_id': 'remote'}, f)
+
+    assert manager.load_manifest('..') is None
+    assert manager.refresh('..') is None
+    assert manager.cancel('..') is False
+
+
+def test_manifest_is_loaded_by_valid_id(tmp_path):
+    manager = BatchExtractionManager(None, None, str(tmp_path))
+    batch_id = uuid.uuid4().hex
+    os.makedirs(tmp_path / batch_id)
+    manager._save_manifest({'batch_id': batch_id, 'remote_batch_id': None})
+    assert manager.load_manifest(batch_id) == {'batch_id': batch_id, 'remote_batch_id': None}
@@ -0,0 +1,86 @@
+import configparser
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from config import config
+import metrics
+import rate_limit
+from llm_service import LLMService
+
+PROVIDER_ENV = """
+[SERVICE]
+llm_providers = A
+md_normalize_cache = false
+reask_enabled = false
+incremental_extraction = false
+
+[A]
+api_key = key-a
+base_url = http://a.invalid/v1
+model = model-a
+"""
+
+CONTENT = "# 试验方案\n\n本研究为多中心随机双盲试验，试验药物XX-101。\n"
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path):
+    """单服务商、启用结果缓存的LLM服务，记录每次调用的schema名称"""
+    parser = configparser.ConfigParser()
+    parser.read_string(PROVIDER_ENV)
+    monkeypatch.setattr(config, 'config', parser)
+    monkeypatch.setattr(rate_limit, 'limiters', {})
+    monkeypatch.setattr(rate_limit, 'breakers', {})
+    monkeypatch.setenv('NOAHPHARM_DATA_DIR', str(tmp_path))
+
+    service = LLMService()
+    service.calls = []
+
+    def create(**request):
+        schema = request['response_format']['json_schema']
+        service.calls.append(schema['name'])
+        content = json.dumps({field: '未提及' for field in schema['schema']['properties']}, ensure_ascii=False)
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason='stop')], usage=None)
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    service.pool.primary.get_client = lambda: client
+    return service
+
+
+def _lookups(schema_name, result):
+    return metrics.CACHE_LOOKUPS.value(schema=schema_name, result=result)
+
+
+def test_partial_hit_extracts_only_missing_part(service):
+    schema_name = service.get_extraction_spec('CDE')[0]
+    service.extract_key_info(CONTENT, 'CDE')
+    assert service.calls == [schema_name]
+
+    before = {
+        key: _lookups(*key) for key in
+        ((schema_name, 'hit'), (schema_name, 'miss'), ('summary_extraction', 'hit'), ('summary_extraction', 'miss'))
+    }
+    cache_before = service.cache.stats()
+    extraction, summary = service.extract_with_summary(CONTENT, 'CDE')
+
+    assert service.calls == [schema_name, 'summary_extraction']
+    assert extraction['drug_name'] == '未提及'
+    # 两项缓存查询各计一次，缓存统计与指标一致
+    assert _lookups(schema_name, 'hit') - before[(schema_name, 'hit')] == 1
+    assert _lookups('summary_extraction', 'miss') - before[('summary_extraction', 'miss')] == 1
+    cache_after = service.cache.stats()
+    assert cache_after['hits'] - cache_before['hits'] == 1
+    assert cache_after['misses'] - cache_before['misses'] == 1
+
+    service.calls.clear()
+    assert service.extract_with_summary(CONTENT, 'CDE') == (extraction, summary)
+    assert service.calls == []
+
+
+def test_full_miss_uses_combined_call(service):
+    schema_name = service.get_extraction_spec('CDE')[0]
+    service.extract_with_summary(CONTENT, 'CDE')
+    assert service.calls == [f"{schema_name}_with_summary"]
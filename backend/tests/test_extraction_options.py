@@ -0,0 +1,37 @@
+import pytest
+
+import app
+
+
+@pytest.mark.parametrize('value, expected', [
+    (True, True), (False, False), (1, True), (0, False),
+    ('true', True), ('false', False), ('1', True), ('0', False), (' Yes ', True), ('off', False)
+])
+def test_bool_option(value, expected):
+    assert app.get_bool_option({'include_summary': value}, 'include_summary') is expected
+
+
+def test_bool_option_default_and_invalid():
+    assert app.get_bool_option({}, 'include_summary', True) is True
+    for value in ('maybe', 2, [], {}):
+        with pytest.raises(ValueError):
+            app.get_bool_option({'include_summary': value}, 'include_summary')
+
+
+def test_extract_info_parses_string_flags(monkeypatch):
+    calls = []
+    monkeypatch.setattr(app, 'get_llm_service', lambda: object())
+    monkeypatch.setattr(
+        app, 'process_literature_item',
+        lambda llm_service, item, use_cache, include_summary: calls.append((use_cache, include_summary)) or {'item': item}
+    )
+    client = app.app.test_client()
+
+    response = client.post('/api/extract-info', json={
+        'selected_items': ['a'], 'include_summary': 'false', 'bypass_cache': '0'
+    })
+    assert response.status_code == 200
+    assert calls == [(True, False)]
+
+    response = client.post('/api/extract-info', json={'selected_items': ['a'], 'include_summary': 'maybe'})
+    assert response.status_code == 400
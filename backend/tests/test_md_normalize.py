@@ -0,0 +1,103 @@
+from md_normalize import (
+    DEFAULT_NORMALIZE_STEPS, dedupe_headers, normalize_markdown, truncate_references
+)
+
+
+def _pages(bodies, header=None, numbers=True):
+    """按页拼接MD：每页正文后跟页眉和页码，各自前后空一行"""
+    parts = []
+    for page, body in enumerate(bodies, start=1):
+        parts.append(body)
+        if header:
+            parts.append(header)
+        if numbers:
+            parts.append(str(page))
+    return '\n\n'.join(parts) + '\n'
+
+
+def _body(page):
+    return '\n'.join(f"第{page}页正文第{line}行，描述试验设计" for line in range(12))
+
+
+def test_lone_sample_size_is_kept():
+    content = "## 样本量\n\n120\n\n## 试验分期\n\nII期\n"
+    assert dedupe_headers(content) == content
+
+
+def test_sample_size_next_to_page_numbers_is_kept():
+    content = _pages([_body(1), _body(2) + "\n\n样本量\n\n120", _body(3)])
+    result = dedupe_headers(content)
+    assert "\n120\n" in result
+    assert "\n\n1\n" not in result and "\n\n3\n" not in result
+
+
+def test_repeated_short_answers_are_kept():
+    content = "是否多中心\n\n否\n\n是否随机\n\n否\n\n是否盲法\n\n否\n\n是否安慰剂对照\n\n否\n"
+    assert dedupe_headers(content) == content
+
+
+def test_repeated_answers_in_lines_are_kept():
+    content = ''.join(f"问题{index}\n否\n" for index in range(5))
+    assert dedupe_headers(content) == content
+
+
+def test_page_headers_are_deduplicated():
+    header = "XX药业 临床试验方案 V1.0"
+    content = _pages([_body(page) for page in range(1, 5)], header=header)
+    result = dedupe_headers(content)
+    assert result.count(header) == 1
+    assert all(f"第{page}页正文第0行" in result for page in range(1, 5))
+
+
+def test_close_repeats_are_not_headers():
+    content = '\n\n'.join(["入组标准：年龄18-75岁"] * 4) + '\n'
+    assert dedupe_headers(content) == content
+
+
+def test_explicit_page_numbers_are_removed():
+    content = "正文一\n\n第 1 页\n\n正文二\n\nPage 2 of 10\n\n正文三\n"
+    assert dedupe_headers(content) == "正文一\n\n\n正文二\n\n\n正文三\n"
+
+
+def test_dedupe_headers_is_not_a_default_step():
+    assert 'dedupe_headers' not in DEFAULT_NORMALIZE_STEPS
+
+
+def test_references_are_truncated():
+    citations = ''.join(
+        f"[{index}] Zhang S, Li W, et al. Efficacy of drug {index}. Lancet Oncol. 2020;21(3):{index}-{index + 9}.\n"
+        for index in range(1, 21)
+    )
+    content = f"# 正文\n\n内容\n\n## 参考文献\n\n{citations}\n## 附录\n\n附录内容\n"
+    result = truncate_references(content)
+    assert "Zhang S" not in result
+    assert "参考文献共 20 条" in result
+    assert "## 附录\n\n附录内容\n" in result
+
+
+def test_short_reference_section_is_kept():
+    content = "# 正文\n\n## 参考文献\n\n[1] 见附件\n"
+    assert truncate_references(content) == content
+    _, stats = normalize_markdown(content, ['truncate_references'])
+    assert stats['reduction_ratio'] >= 0
+
+
+def test_non_citation_reference_section_is_kept():
+    content = "## 参考资料\n\n" + ''.join(f"本试验参照的指导原则说明第{index}段，请结合方案阅读\n" for index in range(10))
+    assert truncate_references(content) == content
+
+
+def test_non_citation_lines_survive_truncation():
+    citations = ''.join(f"{index}. 王五, 赵六. 某药物的II期临床研究[J]. 中华肿瘤杂志, 2019, 41(2): 100-105.\n" for index in range(1, 11))
+    content = f"## 参考文献\n\n{citations}\n注：以上文献由申办方提供\n"
+    result = truncate_references(content)
+    assert "王五" not in result
+    assert "注：以上文献由申办方提供" in result
+
+
+def test_normalize_stats():
+    content = "正文\n\n![图1](data:image/png;base64," + "A" * 200 + ")\n"
+    normalized, stats = normalize_markdown(content, list(DEFAULT_NORMALIZE_STEPS))
+    assert "base64" not in normalized
+    assert stats['original_bytes'] > stats['normalized_bytes']
+    assert [step['step'] for step in stats['steps']] == list(DEFAULT_NORMALIZE_STEPS)
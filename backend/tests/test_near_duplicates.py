@@ -0,0 +1,74 @@
+import os
+
+from catalog import LiteratureCatalog
+from near_duplicates import (
+    band_keys, minhash_signature, pack_signature, registry_ids, registry_key, signature_similarity,
+    unpack_signature
+)
+
+BASE_TEXT = ' '.join(
+    f"本研究为多中心随机双盲安慰剂对照试验，第{index}组受试者接受试验药物治疗并评估安全性和有效性。"
+    for index in range(40)
+)
+
+
+def test_registry_key_inside_chinese_text():
+    assert registry_key("本试验登记号CTR20201234，已完成入组") == 'CTR20201234'
+    assert registry_key("注册号：NCT01234567；ChiCTR2000012345") == 'CHICTR2000012345,NCT01234567'
+    assert registry_key("EudraCT Number: 2019-001234-56") == '2019-001234-56'
+
+
+def test_registry_key_rejects_partial_ids():
+    assert registry_key("ABCTR20201234 和 NCT012345678") == ''
+
+
+def test_registry_ids():
+    assert registry_ids('CTR20201234,NCT01234567') == {'CTR20201234', 'NCT01234567'}
+    assert registry_ids('') == set()
+
+
+def test_similar_documents_share_bands():
+    signature = minhash_signature(BASE_TEXT)
+    edited = minhash_signature(BASE_TEXT.replace("第3组", "第三组"))
+    unrelated = minhash_signature("Pharmacokinetics of a single oral dose in healthy volunteers. " * 30)
+
+    assert signature_similarity(signature, signature) == 1.0
+    assert signature_similarity(signature, edited) > 0.8
+    assert signature_similarity(signature, unrelated) < 0.2
+    assert set(band_keys(signature)) & set(band_keys(edited))
+    assert not set(band_keys(signature)) & set(band_keys(unrelated))
+
+
+def test_empty_document_has_no_bands():
+    assert band_keys(minhash_signature('')) == []
+
+
+def test_pack_roundtrip():
+    signature = minhash_signature(BASE_TEXT)
+    assert unpack_signature(pack_signature(signature)) == signature
+
+
+def _write_literature(root, name, content):
+    folder = os.path.join(root, name, 'auto')
+    os.makedirs(folder)
+    with open(os.path.join(folder, f'{name}.md'), 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+def test_catalog_matches_by_shared_registry_id(tmp_path):
+    section = tmp_path / 'cde'
+    _write_literature(str(section), 'a', "中文版方案，登记号CTR20201234。\n" + BASE_TEXT)
+    _write_literature(str(section), 'b', "English protocol CTR20201234 and NCT01234567. " + "Dose escalation study. " * 50)
+    _write_literature(str(section), 'c', "Unrelated study NCT07654321. " + "Healthy volunteers. " * 50)
+    catalog = LiteratureCatalog(str(tmp_path / 'catalog.db'), {'cde': str(section)})
+    catalog.refresh()
+
+    content = "中文版方案，登记号CTR20201234。\n" + BASE_TEXT
+    a_path = LiteratureCatalog.md_path_for(str(section / 'a'), 'a')
+    duplicates = catalog.find_duplicates(
+        minhash_signature(content), registry_key(content), 0.8, exclude=a_path
+    )
+    assert [(item['literature_name'], item['reason']) for item in duplicates] == [('b', 'registry_id')]
+
+    clusters = catalog.duplicate_clusters(0.8)
+    assert [sorted(member['literature_name'] for member in cluster['members']) for cluster in clusters] == [['a', 'b']]
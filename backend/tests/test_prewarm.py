@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+from llm_service import LLMService, measure_usage
+from prewarm import PrewarmWorker
+
+
+class FakeCatalog:
+    def refresh(self):
+        pass
+
+    def pending_extractions(self, section_name, schema_names):
+        return [{
+            'md_file_path': 'a.md', 'content_hash': 'h', 'indexed_at': 1, 'estimated_tokens': 1000,
+            'section_name': section_name, 'literature_name': 'a'
+        }]
+
+
+def _record(prompt_tokens, completion_tokens, usage=True):
+    """模拟一次LLM响应的用量记录"""
+    response_usage = SimpleNamespace(
+        prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+        total_tokens=prompt_tokens + completion_tokens
+    ) if usage else None
+    LLMService._record_usage(SimpleNamespace(model='model-a'), 'cde_extraction', response_usage)
+
+
+def _worker(process_item, token_budget=20000):
+    worker = PrewarmWorker(
+        FakeCatalog(), {'cde': ['cde_extraction']}, process_item, lambda: False, token_budget,
+        idle_seconds=0, completion_reserve=500, measure_usage=measure_usage
+    )
+    worker._scan()
+    return worker
+
+
+def test_budget_is_charged_with_actual_usage():
+    def process_item(item):
+        # 首次提取、级联和补充提取共三次调用
+        for prompt_tokens, completion_tokens in ((5000, 800), (3000, 400), (1000, 200)):
+            _record(prompt_tokens, completion_tokens)
+        return {}
+
+    worker = _worker(process_item)
+    assert worker._process_next()
+    assert worker.spent_tokens == 10400
+    assert worker.last_item['reserved_tokens'] == 1500
+    assert worker.last_item['tokens'] == 10400
+
+
+def test_overrun_blocks_next_item():
+    def process_item(item):
+        _record(15000, 3000)
+        return {}
+
+    worker = _worker(process_item, token_budget=19000)
+    assert worker._process_next()
+    worker._scan()
+    assert not worker._process_next()
+    assert worker.spent_tokens == 18000
+
+
+def test_cache_hit_costs_nothing():
+    worker = _worker(lambda item: {})
+    assert worker._process_next()
+    assert worker.spent_tokens == 0
+
+
+def test_unreported_usage_charges_reservation():
+    def process_item(item):
+        _record(0, 0, usage=False)
+        return {}
+
+    worker = _worker(process_item)
+    assert worker._process_next()
+    assert worker.spent_tokens == 1500
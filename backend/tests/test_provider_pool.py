@@ -0,0 +1,169 @@
+import configparser
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from config import config
+import rate_limit
+from provider_pool import ProviderPool
+
+PROVIDER_ENV = """
+[SERVICE]
+cache_enabled = false
+md_normalize_cache = false
+llm_providers = A,B
+llm_backoff_base = 0
+
+[A]
+api_key = key-a
+base_url = http://a.invalid/v1
+model = model-a
+
+[B]
+api_key = key-b
+base_url = http://b.invalid/v1
+model = model-b
+max_concurrency = 1
+"""
+
+
+@pytest.fixture(autouse=True)
+def provider_config(monkeypatch, tmp_path):
+    """使用测试服务商配置，限流器和熔断器每个测试重新创建"""
+    parser = configparser.ConfigParser()
+    parser.read_string(PROVIDER_ENV)
+    monkeypatch.setattr(config, 'config', parser)
+    monkeypatch.setattr(rate_limit, 'limiters', {})
+    monkeypatch.setattr(rate_limit, 'breakers', {})
+    monkeypatch.setenv('NOAHPHARM_DATA_DIR', str(tmp_path))
+
+
+def _pool():
+    return ProviderPool(['A', 'B'], 'default-model')
+
+
+def test_provider_settings():
+    a, b = _pool().providers
+    assert (a.model, a.max_concurrency) == ('model-a', 8)
+    assert (b.model, b.max_concurrency) == ('model-b', 1)
+
+
+def test_score_prefers_low_latency_and_error_rate():
+    pool = _pool()
+    a, b = pool.providers
+    a.ewma_latency, b.ewma_latency = 0.5, 2.0
+    assert a.score() > b.score()
+
+    b.ewma_latency = 0.5
+    b.ewma_error_rate = 0.3
+    assert a.score() > b.score()
+
+    a.in_flight = 4
+    b.ewma_error_rate = 0.0
+    assert b.score() > a.score()
+
+
+def test_release_updates_health():
+    pool = _pool()
+    provider = pool.acquire(exclude={'B'})
+    pool.release(provider, latency=1.0)
+    assert provider.ewma_latency == 1.0 and provider.ewma_error_rate == 0.0
+
+    provider = pool.acquire(exclude={'B'})
+    pool.release(provider, latency=30.0, success=False)
+    assert provider.ewma_latency == 1.0
+    assert provider.ewma_error_rate == pytest.approx(0.2)
+    assert (provider.requests, provider.failures, provider.in_flight) == (2, 1, 0)
+
+
+def test_release_without_record_only_frees_slot():
+    pool = _pool()
+    provider = pool.acquire(exclude={'B'})
+    pool.release(provider, latency=5.0, success=False, record=False)
+    assert (provider.requests, provider.in_flight, provider.ewma_latency) == (0, 0, None)
+
+
+def test_acquire_prefers_untried_providers():
+    pool = _pool()
+    for _ in range(20):
+        provider = pool.acquire(exclude={'A'})
+        assert provider.name == 'B'
+        pool.release(provider, record=False)
+    # 全部尝试过时仍可重新选择
+    provider = pool.acquire(exclude={'A', 'B'})
+    assert provider.name in ('A', 'B')
+
+
+def test_acquire_respects_concurrency_limit():
+    pool = _pool()
+    b = pool.acquire(exclude={'A'})
+    assert b.name == 'B'
+    assert pool.acquire(exclude={'A'}).name == 'A'
+    pool.providers[0].in_flight = pool.providers[0].max_concurrency
+    assert pool.acquire(block=False) is None
+
+
+def test_failover_when_circuit_open():
+    pool = _pool()
+    a, b = pool.providers
+    for _ in range(a.breaker.failure_threshold):
+        a.breaker.record_failure()
+    assert not a.accepting()
+    assert pool.has_alternative({'B'}) is False
+    assert pool.has_alternative({'A'}) is True
+    for _ in range(10):
+        provider = pool.acquire()
+        assert provider is b
+        pool.release(provider, record=False)
+
+    for _ in range(b.breaker.failure_threshold):
+        b.breaker.record_failure()
+    with pytest.raises(rate_limit.CircuitOpenError):
+        pool.acquire()
+
+
+def _connection_error():
+    error = openai.APIConnectionError.__new__(openai.APIConnectionError)
+    Exception.__init__(error, "connection refused")
+    return error
+
+
+def test_service_fails_over_to_next_provider():
+    from llm_service import LLMService
+
+    service = LLMService()
+    a, b = service.pool.providers
+    calls = []
+
+    def client(provider, outcome):
+        def create(**request):
+            calls.append((provider.name, request['model']))
+            if isinstance(outcome, Exception):
+                raise outcome
+            message = SimpleNamespace(content=outcome)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason='stop')], usage=None)
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    a.get_client = lambda: client(a, _connection_error())
+    b.get_client = lambda: client(b, '{"drug_name": "XX-101"}')
+    # A 评分远高于 B，保证首次选择 A
+    b.weight = 1e-9
+
+    request = {
+        'messages': [{'role': 'user', 'content': '文献内容'}],
+        'response_format': {'type': 'json_schema', 'json_schema': {'name': 'cde_extraction', 'schema': {}}}
+    }
+    models = set()
+    result = service._execute_request(request, models=models)
+
+    assert result == {'drug_name': 'XX-101'}
+    assert calls == [('A', 'model-a'), ('B', 'model-b')]
+    assert models == {'model-b'}
+    assert a.failures == 1 and a.ewma_error_rate > 0
+    assert a.in_flight == 0 and b.in_flight == 0
+
+
+def test_is_retryable():
+    assert rate_limit.is_retryable(_connection_error())
+    assert not rate_limit.is_retryable(ValueError("bad schema"))
@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+import openai
+
+from llm_service import LLMService
+from rate_limit import CircuitBreaker
+
+
+def _error(cls, status_code=None):
+    """构造openai异常（不经过HTTP响应）"""
+    error = cls.__new__(cls)
+    Exception.__init__(error, cls.__name__)
+    if status_code is not None:
+        error.status_code = status_code
+    return error
+
+
+class FakePool:
+    def release(self, provider, latency=None, success=True, record=True):
+        pass
+
+    def has_alternative(self, exclude):
+        return False
+
+
+def _service():
+    return SimpleNamespace(pool=FakePool(), max_retries=0, backoff_base=0, backoff_max=0)
+
+
+def _attempt(service, provider, error):
+    try:
+        LLMService._finish_attempt(service, provider, 'model-a', 'cde_extraction', 0.1, error, 0, set())
+    except openai.OpenAIError:
+        pass
+
+
+def test_client_errors_do_not_reset_failure_streak():
+    service = _service()
+    provider = SimpleNamespace(name='P', breaker=CircuitBreaker('P', failure_threshold=5, recovery_seconds=30))
+    for call in range(20):
+        if call % 4 == 3:
+            _attempt(service, provider, _error(openai.BadRequestError, 400))
+        else:
+            _attempt(service, provider, _error(openai.InternalServerError, 500))
+    assert provider.breaker.state == CircuitBreaker.OPEN
+
+
+def test_client_error_releases_half_open_trial():
+    service = _service()
+    breaker = CircuitBreaker('P', failure_threshold=1, recovery_seconds=0)
+    provider = SimpleNamespace(name='P', breaker=breaker)
+    breaker.record_failure()
+    breaker.before_call()
+    _attempt(service, provider, _error(openai.BadRequestError, 400))
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()
+
+
+def test_success_closes_breaker():
+    breaker = CircuitBreaker('P', failure_threshold=1, recovery_seconds=0)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.consecutive_failures == 0
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from schema_validation import close_truncated_json, repair_json, validate_result
+
+SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'drug_name': {'type': 'string'},
+        'phase': {'type': 'string'},
+        'design': {
+            'type': 'object',
+            'properties': {'randomized': {'type': 'string'}, 'blinding': {'type': 'string'}}
+        }
+    }
+}
+
+
+def test_code_fence_and_surrounding_text():
+    content = '以下是提取结果：\n```json\n{"drug_name": "XX-101", "phase": "II期"}\n```'
+    assert repair_json(content) == {'drug_name': 'XX-101', 'phase': 'II期'}
+
+
+def test_trailing_text_after_object():
+    assert repair_json('{"phase": "I期"} 如有疑问请告知') == {'phase': 'I期'}
+
+
+def test_truncated_value_is_dropped():
+    assert repair_json('{"drug_name": "XX-101", "phase": "II') == {'drug_name': 'XX-101'}
+
+
+def test_truncated_nested_object_is_closed():
+    content = '{"drug_name": "XX-101", "design": {"randomized": "是", "blinding": "双'
+    assert repair_json(content) == {'drug_name': 'XX-101', 'design': {'randomized': '是'}}
+
+
+def test_truncated_after_key_is_dropped():
+    assert repair_json('{"drug_name": "XX-101", "phase":') == {'drug_name': 'XX-101'}
+
+
+def test_trailing_comma_is_removed():
+    assert repair_json('{"drug_name": "XX-101",') == {'drug_name': 'XX-101'}
+
+
+def test_escaped_quotes_inside_strings():
+    assert repair_json('{"drug_name": "XX-\\"101\\"", "phase": "I') == {'drug_name': 'XX-"101"'}
+
+
+def test_no_object_raises():
+    with pytest.raises(json.JSONDecodeError):
+        repair_json('无法提取')
+
+
+def test_truncated_first_key_gives_empty_object():
+    assert repair_json('{"drug_na') == {}
+
+
+def test_unrepairable_raises():
+    with pytest.raises(json.JSONDecodeError):
+        close_truncated_json('"drug_na')
+
+
+def test_validate_result_marks_problems():
+    result, problems = validate_result(
+        {'drug_name': 'XX-101', 'phase': '', 'design': '随机', '_models': ['model-a'], 'extra': 1}, SCHEMA
+    )
+    assert result['drug_name'] == 'XX-101'
+    assert result['phase'] == '信息不明确'
+    assert result['design'] == {'randomized': '信息不明确', 'blinding': '信息不明确'}
+    assert result['_models'] == ['model-a']
+    assert 'extra' not in result
+    assert problems['phase'] == 'unclear'
+    assert set(problems) == {'phase', 'design.randomized', 'design.blinding'}
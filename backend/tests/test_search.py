@@ -0,0 +1,12 @@
+import app
+from catalog import LiteratureCatalog
+
+
+def test_search_without_fts5_returns_503(monkeypatch, tmp_path):
+    catalog = LiteratureCatalog(str(tmp_path / 'catalog.db'), {})
+    catalog.search_enabled = False
+    monkeypatch.setattr(app, 'get_catalog', lambda: catalog)
+
+    response = app.app.test_client().get('/api/search?q=高血压')
+    assert response.status_code == 503
+    assert '全文检索不可用' in response.get_json()['error']
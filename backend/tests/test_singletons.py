@@ -0,0 +1,31 @@
+import threading
+import time
+
+import app
+
+
+def test_job_manager_is_created_once(monkeypatch, tmp_path):
+    created = []
+
+    class FakeJobManager:
+        def __init__(self, store, process_item, max_workers):
+            # 放大并发创建的时间窗口
+            time.sleep(0.05)
+            created.append(self)
+
+        def start(self):
+            pass
+
+    monkeypatch.setattr(app, 'job_manager', None)
+    monkeypatch.setattr(app, 'JobStore', lambda path: None)
+    monkeypatch.setattr(app, 'JobManager', FakeJobManager)
+
+    managers = []
+    threads = [threading.Thread(target=lambda: managers.append(app.get_job_manager())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert all(manager is created[0] for manager in managers)
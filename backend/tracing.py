@@ -0,0 +1,206 @@
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# 当前请求的追踪和当前所在的阶段，随线程池/协程任务复制到子任务中
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+class Span:
+    """请求中的一个阶段：名称、父阶段、相对请求开始的起始时间、耗时和附加属性（如文档大小）"""
+
+    __slots__ = ('span_id', 'parent_id', 'name', 'start', 'end', 'thread', 'attrs', 'error')
+
+    def __init__(self, span_id, parent_id, name, attrs):
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.perf_counter()
+        self.end = None
+        self.thread = threading.current_thread().name
+        self.attrs = attrs
+        self.error = None
+
+    def set(self, **attrs):
+        """补充阶段属性，如读取完成后的字节数"""
+        self.attrs.update(attrs)
+
+    def to_dict(self, origin):
+        return {
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ms': round((self.start - origin) * 1000, 3),
+            'duration_ms': round((self.end - self.start) * 1000, 3) if self.end is not None else None,
+            'thread': self.thread,
+            'attrs': self.attrs,
+            'error': self.error
+        }
+
+class _NoopSpan:
+    """没有进行中的追踪时使用的空阶段"""
+
+    def set(self, **attrs):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+class Trace:
+    """一次请求的追踪记录"""
+
+    def __init__(self, request_id, method, path):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.duration_ms = None
+        self.status = None
+        self.spans = []
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def new_span(self, parent_id, name, attrs):
+        with self._lock:
+            self._next_id += 1
+            span = Span(self._next_id, parent_id, name, attrs)
+            self.spans.append(span)
+        return span
+
+    def stage_totals(self):
+        """按阶段名称汇总耗时和次数，按总耗时降序"""
+        totals = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            if span.end is None:
+                continue
+            total = totals.setdefault(span.name, {'count': 0, 'total_ms': 0.0})
+            total['count'] += 1
+            total['total_ms'] += (span.end - span.start) * 1000
+        return sorted(
+            ({'name': name, 'count': total['count'], 'total_ms': round(total['total_ms'], 1)}
+             for name, total in totals.items()),
+            key=lambda stage: -stage['total_ms']
+        )
+
+    def to_dict(self, include_spans=True):
+        with self._lock:
+            spans = list(self.spans)
+        trace = {
+            'request_id': self.request_id,
+            'method': self.method,
+            'path': self.path,
+            'started_at': self.started_at,
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'span_count': len(spans),
+            'stages': self.stage_totals()
+        }
+        if include_spans:
+            trace['spans'] = [span.to_dict(self.origin) for span in spans]
+        return trace
+
+class TraceRecorder:
+    """保存最近完成的请求追踪，耗时超过阈值的请求记录慢请求日志"""
+
+    def __init__(self, enabled=True, slow_request_ms=5000, buffer_size=200):
+        self.enabled = enabled
+        self.slow_request_ms = slow_request_ms
+        self._traces = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+
+    def start(self, method, path, request_id=None, record=True):
+        """开始追踪一个请求，返回 (追踪, 结束时用于恢复上下文的token)
+
+        未启用或 record 为假时追踪为None，同时清除线程中可能残留的上一个请求的追踪
+        """
+        trace = Trace(request_id or uuid.uuid4().hex[:16], method, path) if self.enabled and record else None
+        return trace, (_current_trace.set(trace), _current_span.set(None))
+
+    def finish(self, trace, tokens, status=None):
+        """结束追踪：保存到最近追踪列表，超过阈值时输出各阶段耗时"""
+        trace_token, span_token = tokens
+        with contextlib.suppress(ValueError):
+            # 在其他上下文中结束时（如流式响应）无法恢复，只记录结果
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+        if trace is None:
+            return
+        trace.duration_ms = round((time.perf_counter() - trace.origin) * 1000, 1)
+        trace.status = status
+        with self._lock:
+            self._traces.append(trace)
+
+        if self.slow_request_ms and trace.duration_ms >= self.slow_request_ms:
+            stages = '，'.join(
+                f"{stage['name']} {stage['total_ms']}ms×{stage['count']}" for stage in trace.stage_totals()[:8]
+            )
+            logger.warning(
+                f"慢请求 {trace.method} {trace.path} 耗时 {trace.duration_ms}ms "
+                f"(request_id={trace.request_id}): {stages or '无阶段记录'}"
+            )
+
+    def recent(self, limit=50, min_duration_ms=0, path=None, include_spans=True):
+        """按完成时间倒序返回最近的追踪"""
+        with self._lock:
+            traces = list(self._traces)
+        results = []
+        for trace in reversed(traces):
+            if trace.duration_ms < min_duration_ms or (path and trace.path != path):
+                continue
+            results.append(trace.to_dict(include_spans))
+            if len(results) >= limit:
+                break
+        return results
+
+    def get(self, request_id):
+        with self._lock:
+            for trace in reversed(self._traces):
+                if trace.request_id == request_id:
+                    return trace.to_dict()
+        return None
+
+def current_request_id():
+    """当前请求的request id，没有进行中的追踪时返回None"""
+    trace = _current_trace.get()
+    return trace.request_id if trace is not None else None
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """记录当前请求中的一个阶段，可嵌套；没有进行中的追踪时不记录
+
+    用法: with span('read_md_file', path=path) as s: ...; s.set(bytes=n)
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield NOOP_SPAN
+        return
+    parent = _current_span.get()
+    current = trace.new_span(parent.span_id if parent is not None else None, name, attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+
+def propagate(fn):
+    """让提交到线程池的函数在提交时的追踪上下文中执行，阶段记录到当前阶段之下
+
+    每次调用使用上下文的新副本，可被多个线程同时调用
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return run
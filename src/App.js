@@ -111,11 +111,20 @@ const App = () => {
       
       console.log('开始提取关键信息，选中的项目:', supportedItems);
       
-      const result = await FileSystemService.extractKeyInfo(supportedItems);
-      console.log('提取结果:', result);
+      // 流式接收结果，第一条结果返回后即展示结果页面
+      const orderedResults = [];
+      const summary = await FileSystemService.extractKeyInfoStream(supportedItems, (record) => {
+        if (record.type === 'result' || record.type === 'error') {
+          orderedResults[record.index] = record.result;
+          setExtractionResults(orderedResults.filter(Boolean));
+          setShowResults(true);
+        }
+      });
+      console.log('提取完成:', summary);
       
-      setExtractionResults(result.results);
-      setShowResults(true);
+      if (orderedResults.length === 0) {
+        setError('没有可提取的文献');
+      }
       
     } catch (err) {
       console.error('提取关键信息失败:', err);
@@ -1,5 +1,6 @@
 import React, { useState } from 'react';
 import './ExtractionResults.css';
+import FileSystemService from '../services/fileSystemService';
 
 const ExtractionResults = ({ results, onBack, onGenerateSummary, generatingSummary = false }) => {
   const [selectedLiterature, setSelectedLiterature] = useState(null);
@@ -63,11 +64,20 @@ const ExtractionResults = ({ results, onBack, onGenerateSummary, generatingSumma
     return acc;
   }, {});
 
+  // 导出链接：由后端从已保存的提取结果生成文件
+  const renderExportLinks = (sectionName) => (
+    <div className="export-links">
+      <a href={FileSystemService.getExtractionExportUrl(sectionName, 'xlsx')}>导出Excel</a>
+      <a href={FileSystemService.getExtractionExportUrl(sectionName, 'csv')}>导出CSV</a>
+    </div>
+  );
+
   // 渲染CDE表格
   const renderCDETable = (data) => {
     return (
       <div className="section-results">
         <h3>CDE同类品种-临床备案公示平台试验信息</h3>
+        {renderExportLinks('CDE同类品种-临床备案公示平台试验信息')}
         <div className="results-table-container">
           <table className="results-table">
             <thead>
@@ -115,6 +125,7 @@ const ExtractionResults = ({ results, onBack, onGenerateSummary, generatingSumma
     return (
       <div className="section-results">
         <h3>国外试验文献调研</h3>
+        {renderExportLinks('国外试验文献调研')}
         <div className="results-table-container">
           <table className="results-table">
             <thead>
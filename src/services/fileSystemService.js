@@ -123,6 +123,61 @@ class FileSystemService {
     }
   }
 
+  // 流式提取关键信息，每完成一篇文献即回调onRecord
+  static async extractKeyInfoStream(selectedItems, onRecord) {
+    try {
+      const response = await fetch(`${API_BASE_URL}/extract-info`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Accept': 'application/x-ndjson',
+        },
+        body: JSON.stringify({
+          selected_items: selectedItems,
+          stream: 'ndjson'
+        })
+      });
+      
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder('utf-8');
+      let buffer = '';
+      let summary = null;
+      
+      // 按行解析NDJSON记录
+      const handleLine = (line) => {
+        if (!line.trim()) {
+          return;
+        }
+        const record = JSON.parse(line);
+        if (record.type === 'summary') {
+          summary = record;
+        }
+        onRecord(record);
+      };
+      
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) {
+          break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.forEach(handleLine);
+      }
+      handleLine(buffer);
+      
+      return summary;
+    } catch (error) {
+      console.error('流式提取关键信息失败:', error);
+      throw error;
+    }
+  }
+
   // 生成方案摘要
   static async generateSummary(literatureInfo) {
     try {
@@ -153,6 +208,15 @@ class FileSystemService {
     }
   }
 
+  // 获取提取结果导出地址（服务端逐行流式生成，浏览器直接下载）
+  static getExtractionExportUrl(sectionName, format = 'xlsx', jobId = null) {
+    const params = new URLSearchParams({ section: sectionName, format });
+    if (jobId) {
+      params.append('job_id', jobId);
+    }
+    return `${API_BASE_URL}/export-extractions?${params.toString()}`;
+  }
+
   // 下载方案摘要Word文档
   static async downloadSummary(summaryData) {
     try {